@@ -0,0 +1,58 @@
+"""Compact callback codec vs aiogram CallbackData (pack, unpack and filter).
+
+Run from the repository root: python -m benchmarks.bench_callbacks
+"""
+import asyncio
+import timeit
+
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import CallbackQuery, User
+
+from utils import callbacks
+
+
+class LegacyUserActionCb(CallbackData, prefix="aua"):
+    action: str
+    user_id: int
+    page: int = 0
+
+
+def _query(data: str) -> CallbackQuery:
+    user = User(id=1, is_bot=False, first_name="Bench")
+    return CallbackQuery(id="1", from_user=user, chat_instance="c", data=data)
+
+
+def main() -> None:
+    number = 20000
+    legacy = LegacyUserActionCb(action="balance_set", user_id=7_000_000_000, page=12)
+    compact = callbacks.AdminUserActionCb(action="balance_set", user_id=7_000_000_000, page=12)
+    legacy_data, compact_data = legacy.pack(), compact.pack()
+
+    legacy_filter = LegacyUserActionCb.filter()
+    compact_filter = callbacks.AdminUserActionCb.filter()
+    legacy_query, compact_query = _query(legacy_data), _query(compact_data)
+    loop = asyncio.new_event_loop()
+
+    def uncached_decode() -> None:
+        callbacks.decode.__wrapped__(compact_data)
+
+    rows = [
+        ("pack", lambda: legacy.pack(), lambda: compact.pack()),
+        ("unpack", lambda: LegacyUserActionCb.unpack(legacy_data), uncached_decode),
+        (
+            "filter",
+            lambda: loop.run_until_complete(legacy_filter(legacy_query)),
+            lambda: loop.run_until_complete(compact_filter(compact_query)),
+        ),
+    ]
+    print(f"payload: legacy {len(legacy_data)} bytes {legacy_data!r}, compact {len(compact_data)} bytes {compact_data!r}")
+    print(f"{'op':<8}{'aiogram us':>12}{'compact us':>12}")
+    for name, old, new in rows:
+        t_old = timeit.timeit(old, number=number) / number * 1e6
+        t_new = timeit.timeit(new, number=number) / number * 1e6
+        print(f"{name:<8}{t_old:>12.2f}{t_new:>12.2f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
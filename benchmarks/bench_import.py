@@ -0,0 +1,55 @@
+"""Bulk CSV import of 50k products and the longest event loop stall while it runs.
+
+Run from the repository root: python -m benchmarks.bench_import
+"""
+import asyncio
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from db import Database
+from services.catalog_io import import_products
+
+ROWS = 50_000
+
+
+def _csv() -> bytes:
+    lines = ["title,description,price,content,category_id,is_active"]
+    lines += [
+        f"SKU {n},Description of item {n},{n % 500 + 1}.99,KEY-{n:08d},,1" for n in range(ROWS)
+    ]
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def _watch_lag(stop: asyncio.Event, interval: float = 0.005) -> float:
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - expected)
+    return worst
+
+
+async def main() -> None:
+    data = _csv()
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / "bench.db"))
+        await db.connect()
+        await db.init()
+        stop = asyncio.Event()
+        watcher = asyncio.create_task(_watch_lag(stop))
+        started = time.perf_counter()
+        report = await import_products(db, io.BytesIO(data), "csv")
+        elapsed = time.perf_counter() - started
+        stop.set()
+        worst_lag = await watcher
+        await db.close()
+    print(f"imported {report.imported} rows ({len(data) / 1e6:.1f} MB) in {elapsed:.2f}s")
+    print(f"rows per second: {report.imported / elapsed:,.0f}")
+    print(f"worst event loop stall: {worst_lag * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
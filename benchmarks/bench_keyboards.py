@@ -0,0 +1,50 @@
+"""Per-update cost of building keyboards: memoized vs rebuilt every call.
+
+Run from the repository root: python -m benchmarks.bench_keyboards
+"""
+import timeit
+import tracemalloc
+
+from keyboards import inline, reply
+from utils.i18n import locales
+
+i18n = locales.default
+
+CASES = [
+    ("profile_kb", inline.profile_kb, (i18n,)),
+    ("topup_amounts_kb", inline.topup_amounts_kb, (i18n, (5, 10, 20, 50, 100))),
+    ("admin_users_menu_kb", inline.admin_users_menu_kb, (i18n,)),
+    ("product_view_kb", inline.product_view_kb, (i18n, 42, 1)),
+    ("pay_methods_kb", inline.pay_methods_kb, (i18n, 42)),
+    ("main_menu", reply.main_menu, (i18n, True)),
+    ("admin_menu", reply.admin_menu, (i18n,)),
+    ("cancel_menu", reply.cancel_menu, (i18n,)),
+]
+
+
+def _allocated(fn, args, calls: int = 1000) -> int:
+    fn(*args)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = [fn(*args) for _ in range(calls)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del keep
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename")) // calls
+
+
+def main() -> None:
+    print(f"{'keyboard':<22}{'rebuilt us':>12}{'cached us':>12}{'rebuilt B':>12}{'cached B':>12}")
+    for name, cached, args in CASES:
+        rebuilt = cached.__wrapped__
+        number = 2000
+        t_rebuilt = timeit.timeit(lambda: rebuilt(*args), number=number) / number * 1e6
+        t_cached = timeit.timeit(lambda: cached(*args), number=number) / number * 1e6
+        print(
+            f"{name:<22}{t_rebuilt:>12.2f}{t_cached:>12.2f}"
+            f"{_allocated(rebuilt, args):>12}{_allocated(cached, args):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
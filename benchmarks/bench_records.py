@@ -0,0 +1,91 @@
+"""Memory held by 100k product rows and the time to fetch them: sqlite3.Row
+(what aiosqlite.Row is) vs dict vs the slotted Product record.
+
+Run from the repository root: python -m benchmarks.bench_records
+"""
+import asyncio
+import gc
+import operator
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from db import Database, _PRODUCT_COLUMNS
+from models import Product, row_factory
+from utils.formatters import render_product_card, render_product_label
+
+ROWS = 100_000
+
+
+def _dict_factory(cursor: sqlite3.Cursor, row: tuple) -> dict:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+# name -> (row factory, price getter)
+FACTORIES = {
+    "sqlite3.Row": (sqlite3.Row, operator.itemgetter("price_cents")),
+    "dict": (_dict_factory, operator.itemgetter("price_cents")),
+    "Product": (row_factory(Product), operator.attrgetter("price_cents")),
+}
+
+
+async def _fill(path: str) -> None:
+    db = Database(path)
+    await db.connect()
+    await db.init()
+    rows = []
+    for n in range(ROWS):
+        title, price = f"SKU {n}", n % 500 * 100 + 99
+        rows.append(
+            (
+                title,
+                f"Description of item {n}",
+                price,
+                f"KEY-{n:08d}",
+                1,
+                None,
+                render_product_card(title, f"Description of item {n}"),
+                render_product_label(title, price),
+            )
+        )
+    await db.insert_products(rows)
+    await db.close()
+
+
+def _measure(path: str, factory, price) -> tuple[int, float, float]:
+    conn = sqlite3.connect(path)
+    conn.row_factory = factory
+    sql = f"SELECT {_PRODUCT_COLUMNS} FROM products ORDER BY id"
+    started = time.perf_counter()
+    conn.execute(sql).fetchall()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    rows = conn.execute(sql).fetchall()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    started = time.perf_counter()
+    sum(map(price, rows))
+    access = time.perf_counter() - started
+    del rows
+    conn.close()
+    return held, elapsed, access
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "bench.db")
+        asyncio.run(_fill(path))
+        print(f"{ROWS} products")
+        for name, (factory, price) in FACTORIES.items():
+            held, elapsed, access = _measure(path, factory, price)
+            print(
+                f"{name:12} {held / 1e6:7.1f} MB held  {elapsed * 1000:6.0f} ms fetch  "
+                f"{access * 1000:5.1f} ms field access  {held / ROWS:5.0f} B/row"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Order and top-up write paths under each SQLite profile from config.SQLITE_PROFILES.
+
+Each write is its own transaction, as in the bot, so the fsync policy
+(synchronous) dominates. Run from the repository root:
+python -m benchmarks.bench_sqlite_profiles
+"""
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from config import SQLITE_PROFILES
+from db import Database
+
+USERS = 200
+ROUNDS = 1_000
+
+
+async def _bench(path: Path, pragmas: dict[str, object]) -> tuple[float, float]:
+    db = Database(str(path), pragmas=pragmas)
+    await db.connect()
+    await db.init()
+    for user_id in range(1, USERS + 1):
+        await db.add_or_update_user(user_id, f"user{user_id}", "User")
+    product_id = await db.create_product("Item", "Desc", 100, "secret")
+
+    started = time.perf_counter()
+    for n in range(ROUNDS):
+        user_id = n % USERS + 1
+        order_id = await db.create_order(user_id, product_id, 100, "crypto", f"o{n}", "url")
+        await db.set_order_paid(order_id)
+    orders = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for n in range(ROUNDS):
+        user_id = n % USERS + 1
+        topup_id = await db.create_topup(user_id, 500, f"t{n}", "url")
+        await db.settle_topup(topup_id)
+    topups = time.perf_counter() - started
+    await db.close()
+    return orders, topups
+
+
+async def main() -> None:
+    print(f"{ROUNDS} orders (create + pay) and {ROUNDS} top-ups (create + settle)")
+    print(f"{'profile':<10} {'orders/s':>10} {'topups/s':>10}")
+    for name, pragmas in SQLITE_PROFILES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            orders, topups = await _bench(Path(tmp) / "bench.db", pragmas)
+        print(f"{name:<10} {ROUNDS / orders:>10,.0f} {ROUNDS / topups:>10,.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
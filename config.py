@@ -1,7 +1,37 @@
 ﻿import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 
+# Per-connection SQLite settings. "durable" fsyncs every commit, "balanced"
+# fsyncs only at checkpoints (a power cut may lose the last commits, never
+# corrupts), "fast" leaves syncing to the OS.
+SQLITE_PROFILES: dict[str, dict[str, object]] = {
+    "durable": {
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+        "wal_autocheckpoint": 1000,
+    },
+    "balanced": {
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "wal_autocheckpoint": 4000,
+    },
+    "fast": {
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "wal_autocheckpoint": 16000,
+    },
+}
+
 
 @dataclass
 class Config:
@@ -11,6 +41,23 @@ class Config:
     crypto_asset: str
     admin_ids: set[int]
     db_path: str
+    shutdown_timeout: float = 30.0
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 0
+    send_global_rate: float = 25.0
+    send_chat_rate: float = 1.0
+    reservation_ttl: int = 900
+    checkpoint_interval: float = 300.0
+    checkpoint_wal_bytes: int = 4 * 1024 * 1024
+    archive_after_days: int = 90
+    backup_dir: str = "backups"
+    backup_interval: float = 86400.0
+    backup_keep: int = 7
+    backup_compress: bool = True
+    sqlite_profile: str = "balanced"
+    sqlite_pragmas: dict[str, object] = field(
+        default_factory=lambda: dict(SQLITE_PROFILES["balanced"])
+    )
 
     def is_admin(self, user_id: int) -> bool:
         return user_id in self.admin_ids
@@ -29,6 +76,45 @@ def _parse_admin_ids(value: str) -> set[int]:
     return ids
 
 
+def _parse_int(value: str, default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _parse_float(value: str, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _parse_bool(value: str, default: bool) -> bool:
+    value = (value or "").strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    return default
+
+
+def _parse_pragmas(profile: str, overrides: str) -> dict[str, object]:
+    """Profile settings updated with "name=value,..." overrides."""
+    if profile not in SQLITE_PROFILES:
+        raise RuntimeError(f"SQLITE_PROFILE must be one of: {', '.join(SQLITE_PROFILES)}")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for part in overrides.split(","):
+        if not part.strip():
+            continue
+        name, _, value = part.partition("=")
+        name, value = name.strip().lower(), value.strip()
+        if name not in pragmas or not value.lstrip("-").isalnum():
+            raise RuntimeError(f"Invalid SQLITE_PRAGMAS entry: {part.strip()}")
+        pragmas[name] = int(value) if value.lstrip("-").isdigit() else value.upper()
+    return pragmas
+
+
 def load_config() -> Config:
     load_dotenv()
 
@@ -38,6 +124,22 @@ def load_config() -> Config:
     crypto_asset = os.getenv("CRYPTO_ASSET", "USDT").strip()
     admin_ids = _parse_admin_ids(os.getenv("ADMIN_IDS", ""))
     db_path = os.getenv("DB_PATH", "bot.db").strip()
+    shutdown_timeout = _parse_float(os.getenv("SHUTDOWN_TIMEOUT", ""), 30.0)
+    metrics_host = os.getenv("METRICS_HOST", "127.0.0.1").strip()
+    metrics_port = _parse_int(os.getenv("METRICS_PORT", ""), 0)
+    # A zero or negative rate would make the token buckets divide by zero.
+    send_global_rate = max(0.1, _parse_float(os.getenv("SEND_GLOBAL_RATE", ""), 25.0))
+    send_chat_rate = max(0.1, _parse_float(os.getenv("SEND_CHAT_RATE", ""), 1.0))
+    reservation_ttl = max(60, _parse_int(os.getenv("RESERVATION_TTL", ""), 900))
+    checkpoint_interval = _parse_float(os.getenv("CHECKPOINT_INTERVAL", ""), 300.0)
+    checkpoint_wal_mb = max(1, _parse_int(os.getenv("CHECKPOINT_WAL_MB", ""), 4))
+    archive_after_days = max(0, _parse_int(os.getenv("ARCHIVE_AFTER_DAYS", ""), 90))
+    backup_dir = os.getenv("BACKUP_DIR", "backups").strip()
+    backup_interval = _parse_float(os.getenv("BACKUP_INTERVAL", ""), 86400.0)
+    backup_keep = max(1, _parse_int(os.getenv("BACKUP_KEEP", ""), 7))
+    backup_compress = _parse_bool(os.getenv("BACKUP_COMPRESS", ""), True)
+    sqlite_profile = os.getenv("SQLITE_PROFILE", "balanced").strip().lower()
+    sqlite_pragmas = _parse_pragmas(sqlite_profile, os.getenv("SQLITE_PRAGMAS", ""))
 
     if not bot_token:
         raise RuntimeError("BOT_TOKEN is required")
@@ -51,4 +153,19 @@ def load_config() -> Config:
         crypto_asset=crypto_asset,
         admin_ids=admin_ids,
         db_path=db_path,
+        shutdown_timeout=shutdown_timeout,
+        metrics_host=metrics_host,
+        metrics_port=metrics_port,
+        send_global_rate=send_global_rate,
+        send_chat_rate=send_chat_rate,
+        reservation_ttl=reservation_ttl,
+        checkpoint_interval=checkpoint_interval,
+        checkpoint_wal_bytes=checkpoint_wal_mb * 1024 * 1024,
+        archive_after_days=archive_after_days,
+        backup_dir=backup_dir,
+        backup_interval=backup_interval,
+        backup_keep=backup_keep,
+        backup_compress=backup_compress,
+        sqlite_profile=sqlite_profile,
+        sqlite_pragmas=sqlite_pragmas,
     )
@@ -33,7 +33,9 @@ class CryptoPayAPI:
             raise CryptoPayError(data)
         return data
 
-    async def create_invoice(self, amount: str, description: str, payload: str) -> dict[str, Any]:
+    async def create_invoice(
+        self, amount: str, description: str, payload: str, expires_in: Optional[int] = None
+    ) -> dict[str, Any]:
         payload_data = {
             "asset": self.asset,
             "amount": amount,
@@ -42,6 +44,8 @@ class CryptoPayAPI:
             "allow_comments": False,
             "allow_anonymous": False,
         }
+        if expires_in:
+            payload_data["expires_in"] = expires_in
         data = await self._request("POST", "createInvoice", json=payload_data)
         return data["result"]
 
@@ -1,29 +1,294 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import time
 import aiosqlite
-from datetime import datetime, timezone
-from typing import Optional
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterable, Optional
 
+from models import R, Checkout, Order, Product, Topup, User, columns, row_factory
+from utils.formatters import render_product_card, render_product_label
 
-def utc_now() -> str:
-    return datetime.now(timezone.utc).isoformat()
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def utc_today(days_ago: int = 0) -> str:
+    return (datetime.now(timezone.utc).date() - timedelta(days=days_ago)).isoformat()
+
+
+def after_ms(seconds: float) -> int:
+    return now_ms() + int(seconds * 1000)
+
+
+class OutOfStockError(Exception):
+    def __init__(self, product_id: int):
+        super().__init__(f"Product {product_id} is out of stock")
+        self.product_id = product_id
+
+
+def _fts_query(text: str) -> str:
+    return " ".join(f'"{token}"*' for token in re.findall(r"\w+", text.casefold()))
+
+
+def _render_product(title: str, description: str, price_cents: int) -> tuple[str, str]:
+    return (
+        render_product_card(title, description),
+        render_product_label(title, price_cents),
+    )
+
+
+# Columns that used to hold ISO-8601 text and now hold epoch milliseconds.
+_TIMESTAMP_COLUMNS = {
+    "users": ("created_at",),
+    "products": ("created_at",),
+    "product_units": ("created_at", "reserved_until"),
+    "categories": ("created_at",),
+    "orders": ("created_at", "paid_at"),
+    "checkouts": ("created_at", "paid_at"),
+    "cart_items": ("added_at",),
+    "topups": ("created_at", "paid_at"),
+    "broadcasts": ("created_at", "finished_at"),
+}
+
+
+def _iso_to_ms(column: str) -> str:
+    return (
+        f"CASE WHEN typeof({column}) = 'text' "
+        f"THEN CAST(ROUND((julianday({column}) - 2440587.5) * 86400000.0) AS INTEGER) "
+        f"ELSE {column} END"
+    )
+
+
+_MAX_ID = 2**63 - 1
+
+# Column lists shared by the hot tables, their archives and the *_all views, in
+# the field order of the record types so rows can be built positionally.
+_USER_COLUMNS = columns(User)
+_PRODUCT_COLUMNS = columns(Product)
+_ORDER_COLUMNS = columns(Order)
+_TOPUP_COLUMNS = columns(Topup)
+# Orders with their product title; ``{table}`` is orders, orders_archive or orders_all.
+_ORDERS_WITH_TITLE = (
+    f"SELECT {columns(Order, 'o')}, p.title FROM {{table}} o "
+    "JOIN products p ON p.id = o.product_id"
+)
+_RECORD_FACTORIES = {
+    record: row_factory(record) for record in (User, Product, Order, Topup, Checkout)
+}
+_UNIT_COLUMNS = "id, product_id, content, status, order_id, reserved_until, created_at"
+
+# Recomputes the rollups from scratch (archived rows included). Each INSERT ... SELECT carries a WHERE
+# clause so that SQLite does not parse the upsert's ON as a join constraint.
+_REBUILD_DAILY_STATS = (
+    "DELETE FROM daily_stats",
+    "DELETE FROM daily_product_stats",
+    """
+    INSERT INTO daily_stats (day, orders_created)
+    SELECT date(created_at / 1000, 'unixepoch'), COUNT(1) FROM orders_all
+    WHERE true GROUP BY 1
+    """,
+    """
+    INSERT INTO daily_stats (day, orders_paid, revenue_cents)
+    SELECT date(paid_at / 1000, 'unixepoch'), COUNT(1), SUM(amount_cents) FROM orders_all
+    WHERE status = 'paid' GROUP BY 1
+    ON CONFLICT(day) DO UPDATE SET
+        orders_paid = excluded.orders_paid, revenue_cents = excluded.revenue_cents
+    """,
+    """
+    INSERT INTO daily_stats (day, topups_created)
+    SELECT date(created_at / 1000, 'unixepoch'), COUNT(1) FROM topups_all
+    WHERE true GROUP BY 1
+    ON CONFLICT(day) DO UPDATE SET topups_created = excluded.topups_created
+    """,
+    """
+    INSERT INTO daily_stats (day, topups_paid, topup_cents)
+    SELECT date(paid_at / 1000, 'unixepoch'), COUNT(1), SUM(amount_cents) FROM topups_all
+    WHERE status = 'paid' GROUP BY 1
+    ON CONFLICT(day) DO UPDATE SET
+        topups_paid = excluded.topups_paid, topup_cents = excluded.topup_cents
+    """,
+    """
+    INSERT INTO daily_product_stats (day, product_id, sold, revenue_cents)
+    SELECT date(paid_at / 1000, 'unixepoch'), product_id, COUNT(1), SUM(amount_cents) FROM orders_all
+    WHERE status = 'paid' GROUP BY 1, 2
+    """,
+)
 
 
 class Database:
-    def __init__(self, path: str):
+    def __init__(self, path: str, pragmas: Optional[dict[str, object]] = None):
         self.path = path
+        # Applied to every connection this class opens, e.g. a Config.sqlite_pragmas profile.
+        self.pragmas = dict(pragmas or {})
         self.conn: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self.catalog_version = 0
+        self.last_write = time.monotonic()
+
+    async def _open_connection(
+        self, read_only: bool = False, **overrides: object
+    ) -> aiosqlite.Connection:
+        if read_only:
+            conn = await aiosqlite.connect(f"file:{self.path}?mode=ro", uri=True)
+        else:
+            conn = await aiosqlite.connect(self.path)
+        conn.row_factory = aiosqlite.Row
+        try:
+            for name, value in {**self.pragmas, **overrides}.items():
+                await conn.execute(f"PRAGMA {name} = {value}")
+        except BaseException:
+            await conn.close()
+            raise
+        return conn
 
     async def connect(self) -> None:
-        self.conn = await aiosqlite.connect(self.path)
-        self.conn.row_factory = aiosqlite.Row
+        self.conn = await self._open_connection()
         await self.conn.execute("PRAGMA foreign_keys = ON")
         await self.conn.execute("PRAGMA journal_mode = WAL")
 
+    async def pragma_report(self) -> dict[str, object]:
+        """Settings actually in effect on the shared connection."""
+        assert self.conn is not None
+        report: dict[str, object] = {}
+        for name in ("journal_mode", "foreign_keys", *self.pragmas):
+            cur = await self.conn.execute(f"PRAGMA {name}")
+            row = await cur.fetchone()
+            report[name] = row[0] if row else None
+        return report
+
     async def close(self) -> None:
         if self.conn:
+            await self.conn.execute("PRAGMA optimize")
             await self.conn.close()
 
+    @property
+    def idle_seconds(self) -> float:
+        """Seconds since the last write committed; 0 while a write is running."""
+        if self._write_lock.locked():
+            return 0.0
+        return time.monotonic() - self.last_write
+
+    def wal_size(self) -> int:
+        try:
+            return os.path.getsize(f"{self.path}-wal")
+        except OSError:
+            return 0
+
+    async def checkpoint(self, mode: str = "PASSIVE") -> tuple[int, int, int]:
+        """Run a WAL checkpoint; returns (busy, wal_pages, checkpointed_pages).
+
+        Runs on its own short-lived connection so the shared one stays free.
+        Anything stronger than PASSIVE waits for writers, so it holds the write
+        lock to queue them instead of failing with SQLITE_BUSY. It does not wait
+        for readers (busy_timeout 0): a busy result is simply retried later.
+        """
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"Unknown checkpoint mode: {mode}")
+        async with AsyncExitStack() as stack:
+            if mode != "PASSIVE":
+                await stack.enter_async_context(self._write_lock)
+            conn = await self._open_connection(busy_timeout=0)
+            stack.push_async_callback(conn.close)
+            cur = await conn.execute(f"PRAGMA wal_checkpoint({mode})")
+            busy, wal_pages, checkpointed = await cur.fetchone()
+        return int(busy), int(wal_pages), int(checkpointed)
+
+    async def backup(self, target: str, pages: int = 256, pause: float = 0.005) -> None:
+        """Copy the database into ``target`` with SQLite's online backup API.
+
+        Pages are copied ``pages`` at a time in a worker thread, pausing between
+        steps; the event loop and writers keep running meanwhile.
+        """
+        await asyncio.to_thread(self._backup, target, pages, pause)
+
+    def _backup(self, target: str, pages: int, pause: float) -> None:
+        source = sqlite3.connect(self.path)
+        try:
+            # Pin one WAL snapshot for the whole copy. Without an open read
+            # transaction every commit from the bot restarts the backup, and
+            # under steady traffic it never finishes.
+            source.execute("BEGIN")
+            source.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            dest = sqlite3.connect(target)
+            try:
+                source.backup(dest, pages=pages, sleep=pause)
+            finally:
+                dest.close()
+        finally:
+            source.close()
+
+    async def optimize(self) -> None:
+        async with self.transaction() as conn:
+            await conn.execute("PRAGMA optimize")
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        # A separate read-only connection with its own worker thread: long scans
+        # never queue behind (or in front of) the shared connection, and WAL
+        # keeps them from blocking writers.
+        conn = await self._open_connection(read_only=True)
+        try:
+            yield conn
+        finally:
+            await conn.close()
+
+    async def stream_rows(
+        self, sql: str, params: tuple = (), batch_size: int = 1000
+    ) -> AsyncIterator[aiosqlite.Row]:
+        async with self.reader() as conn:
+            async with conn.execute(sql, params) as cur:
+                while rows := await cur.fetchmany(batch_size):
+                    for row in rows:
+                        yield row
+
+    async def _fetch_records(
+        self, record: type[R], sql: str, params: tuple = ()
+    ) -> list[R]:
+        """Run a query selecting ``record``'s columns and build the records in the
+        worker thread, while the rows are fetched."""
+        assert self.conn is not None
+        cur = await self.conn.execute(sql, params)
+        cur.row_factory = _RECORD_FACTORIES[record]
+        return await cur.fetchall()
+
+    async def _fetch_record(
+        self, record: type[R], sql: str, params: tuple = ()
+    ) -> Optional[R]:
+        assert self.conn is not None
+        cur = await self.conn.execute(sql, params)
+        cur.row_factory = _RECORD_FACTORIES[record]
+        return await cur.fetchone()
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        # One shared connection: serialize writers so a commit from one handler
+        # never lands in the middle of another handler's transaction.
+        assert self.conn is not None
+        async with self._write_lock:
+            try:
+                yield self.conn
+            except BaseException:
+                await self.conn.rollback()
+                raise
+            await self.conn.commit()
+            self.last_write = time.monotonic()
+
     async def init(self) -> None:
         assert self.conn is not None
+        await self._migrate_timestamps()
+        cur = await self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_stats'"
+        )
+        stats_exist = await cur.fetchone() is not None
+        cur = await self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'balance_ledger'"
+        )
+        ledger_exists = await cur.fetchone() is not None
         await self.conn.executescript(
             """
             CREATE TABLE IF NOT EXISTS users (
@@ -31,7 +296,7 @@ class Database:
                 username TEXT,
                 full_name TEXT,
                 balance_cents INTEGER NOT NULL DEFAULT 0,
-                created_at TEXT NOT NULL
+                created_at INTEGER NOT NULL
             );
 
             CREATE TABLE IF NOT EXISTS products (
@@ -41,7 +306,31 @@ class Database:
                 price_cents INTEGER NOT NULL,
                 content TEXT NOT NULL,
                 is_active INTEGER NOT NULL DEFAULT 1,
-                created_at TEXT NOT NULL
+                created_at INTEGER NOT NULL,
+                card_html TEXT,
+                button_label TEXT,
+                category_id INTEGER REFERENCES categories(id),
+                stock INTEGER
+            );
+
+            CREATE TABLE IF NOT EXISTS product_units (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'available',
+                order_id INTEGER,
+                reserved_until INTEGER,
+                created_at INTEGER NOT NULL,
+                FOREIGN KEY(product_id) REFERENCES products(id),
+                FOREIGN KEY(order_id) REFERENCES orders(id)
+            );
+
+            CREATE TABLE IF NOT EXISTS categories (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                parent_id INTEGER,
+                title TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                FOREIGN KEY(parent_id) REFERENCES categories(id)
             );
 
             CREATE TABLE IF NOT EXISTS orders (
@@ -53,12 +342,55 @@ class Database:
                 payment_method TEXT NOT NULL,
                 crypto_invoice_id TEXT,
                 crypto_pay_url TEXT,
-                created_at TEXT NOT NULL,
-                paid_at TEXT,
+                created_at INTEGER NOT NULL,
+                paid_at INTEGER,
+                checkout_id INTEGER REFERENCES checkouts(id),
                 FOREIGN KEY(user_id) REFERENCES users(id),
                 FOREIGN KEY(product_id) REFERENCES products(id)
             );
 
+            CREATE TABLE IF NOT EXISTS checkouts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                amount_cents INTEGER NOT NULL,
+                item_count INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                payment_method TEXT NOT NULL,
+                crypto_invoice_id TEXT,
+                crypto_pay_url TEXT,
+                created_at INTEGER NOT NULL,
+                paid_at INTEGER,
+                FOREIGN KEY(user_id) REFERENCES users(id)
+            );
+
+            CREATE TABLE IF NOT EXISTS cart_items (
+                user_id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 1,
+                added_at INTEGER NOT NULL,
+                PRIMARY KEY (user_id, product_id),
+                FOREIGN KEY(user_id) REFERENCES users(id),
+                FOREIGN KEY(product_id) REFERENCES products(id)
+            );
+
+            CREATE TABLE IF NOT EXISTS daily_stats (
+                day TEXT PRIMARY KEY,
+                orders_created INTEGER NOT NULL DEFAULT 0,
+                orders_paid INTEGER NOT NULL DEFAULT 0,
+                revenue_cents INTEGER NOT NULL DEFAULT 0,
+                topups_created INTEGER NOT NULL DEFAULT 0,
+                topups_paid INTEGER NOT NULL DEFAULT 0,
+                topup_cents INTEGER NOT NULL DEFAULT 0
+            );
+
+            CREATE TABLE IF NOT EXISTS daily_product_stats (
+                day TEXT NOT NULL,
+                product_id INTEGER NOT NULL,
+                sold INTEGER NOT NULL DEFAULT 0,
+                revenue_cents INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, product_id)
+            ) WITHOUT ROWID;
+
             CREATE TABLE IF NOT EXISTS topups (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 user_id INTEGER NOT NULL,
@@ -66,11 +398,106 @@ class Database:
                 status TEXT NOT NULL,
                 crypto_invoice_id TEXT,
                 crypto_pay_url TEXT,
-                created_at TEXT NOT NULL,
-                paid_at TEXT,
+                created_at INTEGER NOT NULL,
+                paid_at INTEGER,
+                FOREIGN KEY(user_id) REFERENCES users(id)
+            );
+
+            CREATE TABLE IF NOT EXISTS balance_ledger (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                delta_cents INTEGER NOT NULL,
+                balance_after_cents INTEGER NOT NULL,
+                reason TEXT NOT NULL,
+                ref_id INTEGER,
+                actor_id INTEGER,
+                created_at INTEGER NOT NULL,
                 FOREIGN KEY(user_id) REFERENCES users(id)
             );
 
+            -- Verified balance per user as of ledger_state.last_ledger_id.
+            CREATE TABLE IF NOT EXISTS ledger_checkpoints (
+                user_id INTEGER PRIMARY KEY,
+                balance_cents INTEGER NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS ledger_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_ledger_id INTEGER NOT NULL DEFAULT 0,
+                verified_at INTEGER
+            );
+
+            CREATE TABLE IF NOT EXISTS admin_audit (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                admin_id INTEGER NOT NULL,
+                action TEXT NOT NULL,
+                target_type TEXT NOT NULL,
+                target_id INTEGER NOT NULL,
+                before_value TEXT,
+                after_value TEXT,
+                created_at INTEGER NOT NULL
+            );
+
+            -- Cold storage for settled rows; see archive_settled().
+            CREATE TABLE IF NOT EXISTS orders_archive (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                amount_cents INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                payment_method TEXT NOT NULL,
+                crypto_invoice_id TEXT,
+                crypto_pay_url TEXT,
+                created_at INTEGER NOT NULL,
+                paid_at INTEGER,
+                checkout_id INTEGER
+            );
+
+            CREATE TABLE IF NOT EXISTS topups_archive (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                amount_cents INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                crypto_invoice_id TEXT,
+                crypto_pay_url TEXT,
+                created_at INTEGER NOT NULL,
+                paid_at INTEGER
+            );
+
+            CREATE TABLE IF NOT EXISTS product_units_archive (
+                id INTEGER PRIMARY KEY,
+                product_id INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                status TEXT NOT NULL,
+                order_id INTEGER,
+                reserved_until INTEGER,
+                created_at INTEGER NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS broadcasts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                admin_id INTEGER NOT NULL,
+                chat_id INTEGER NOT NULL,
+                message_id INTEGER,
+                text TEXT NOT NULL,
+                status TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                last_user_id INTEGER NOT NULL DEFAULT 0,
+                sent_count INTEGER NOT NULL DEFAULT 0,
+                failed_count INTEGER NOT NULL DEFAULT 0,
+                blocked_count INTEGER NOT NULL DEFAULT 0,
+                created_at INTEGER NOT NULL,
+                finished_at INTEGER
+            );
+
+            CREATE TABLE IF NOT EXISTS broadcast_failures (
+                broadcast_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                reason TEXT NOT NULL,
+                PRIMARY KEY (broadcast_id, user_id),
+                FOREIGN KEY(broadcast_id) REFERENCES broadcasts(id)
+            );
+
             CREATE INDEX IF NOT EXISTS idx_products_active_id
                 ON products(is_active, id DESC);
             CREATE INDEX IF NOT EXISTS idx_orders_user_status_id
@@ -83,68 +510,450 @@ class Database:
                 ON topups(crypto_invoice_id);
             CREATE INDEX IF NOT EXISTS idx_users_username
                 ON users(username);
+            CREATE INDEX IF NOT EXISTS idx_broadcasts_status
+                ON broadcasts(status);
+            CREATE INDEX IF NOT EXISTS idx_categories_parent
+                ON categories(parent_id);
+            CREATE INDEX IF NOT EXISTS idx_checkouts_user_status_id
+                ON checkouts(user_id, status, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_orders_pending
+                ON orders(id) WHERE status = 'pending';
+            CREATE INDEX IF NOT EXISTS idx_orders_paid_at ON orders(paid_at);
+            CREATE INDEX IF NOT EXISTS idx_topups_paid_at ON topups(paid_at);
+            CREATE INDEX IF NOT EXISTS idx_product_units_available
+                ON product_units(product_id, id) WHERE status = 'available';
+            CREATE INDEX IF NOT EXISTS idx_product_units_order
+                ON product_units(order_id) WHERE order_id IS NOT NULL;
+            CREATE INDEX IF NOT EXISTS idx_product_units_reserved
+                ON product_units(reserved_until) WHERE status = 'reserved';
+            CREATE INDEX IF NOT EXISTS idx_balance_ledger_user_id
+                ON balance_ledger(user_id, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_orders_archive_user_id
+                ON orders_archive(user_id, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_orders_archive_paid_at ON orders_archive(paid_at);
+            CREATE INDEX IF NOT EXISTS idx_orders_archive_checkout
+                ON orders_archive(checkout_id);
+            CREATE INDEX IF NOT EXISTS idx_topups_archive_user_id
+                ON topups_archive(user_id, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_topups_archive_paid_at ON topups_archive(paid_at);
+            CREATE INDEX IF NOT EXISTS idx_product_units_archive_order
+                ON product_units_archive(order_id);
+            CREATE INDEX IF NOT EXISTS idx_admin_audit_admin_id
+                ON admin_audit(admin_id, id DESC);
+            CREATE INDEX IF NOT EXISTS idx_admin_audit_target_id
+                ON admin_audit(target_type, target_id, id DESC);
             """
         )
-        await self.conn.commit()
-
-    async def add_or_update_user(self, user_id: int, username: str, full_name: str) -> None:
-        assert self.conn is not None
-        row = await self.get_user(user_id)
-        if row:
+        await self._ensure_column("products", "card_html", "TEXT")
+        await self._ensure_column("products", "button_label", "TEXT")
+        await self._ensure_column(
+            "products", "category_id", "INTEGER REFERENCES categories(id)"
+        )
+        await self.conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_products_category_active_id
+                ON products(category_id, is_active, id DESC)
+            """
+        )
+        await self._ensure_products_fts()
+        await self._ensure_column("orders", "checkout_id", "INTEGER REFERENCES checkouts(id)")
+        await self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_orders_checkout ON orders(checkout_id)"
+        )
+        await self._ensure_column("products", "stock", "INTEGER")
+        await self._ensure_stock_triggers()
+        # Created after the columns they list exist on upgraded databases.
+        for view, table, columns in (
+            ("orders_all", "orders", _ORDER_COLUMNS),
+            ("topups_all", "topups", _TOPUP_COLUMNS),
+        ):
             await self.conn.execute(
+                f"""
+                CREATE VIEW IF NOT EXISTS {view} AS
+                SELECT {columns} FROM {table}
+                UNION ALL
+                SELECT {columns} FROM {table}_archive
                 """
-                UPDATE users
-                SET
-                    username = COALESCE(NULLIF(?, ''), username),
-                    full_name = COALESCE(NULLIF(?, ''), full_name)
-                WHERE id = ?
-                """,
-                (username, full_name, user_id),
             )
-        else:
+        await self._backfill_product_render()
+        if not stats_exist:
+            for statement in _REBUILD_DAILY_STATS:
+                await self.conn.execute(statement)
+        if not ledger_exists:
+            # Existing balances predate the ledger: open each one with a single entry.
             await self.conn.execute(
-                "INSERT INTO users (id, username, full_name, balance_cents, created_at) VALUES (?, ?, ?, 0, ?)",
-                (user_id, username, full_name, utc_now()),
+                """
+                INSERT INTO balance_ledger
+                (user_id, delta_cents, balance_after_cents, reason, created_at)
+                SELECT id, balance_cents, balance_cents, 'opening', ?
+                FROM users WHERE balance_cents != 0 ORDER BY id
+                """,
+                (now_ms(),),
             )
         await self.conn.commit()
 
-    async def get_user(self, user_id: int) -> Optional[aiosqlite.Row]:
+    async def _migrate_timestamps(self) -> None:
         assert self.conn is not None
-        cur = await self.conn.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-        return await cur.fetchone()
+        pending = []
+        for table, columns in _TIMESTAMP_COLUMNS.items():
+            cur = await self.conn.execute(f"PRAGMA table_info({table})")
+            types = {row["name"]: row["type"].upper() for row in await cur.fetchall()}
+            stale = [column for column in columns if types.get(column) == "TEXT"]
+            if stale:
+                pending.append((table, stale))
+        if not pending:
+            return
+
+        # Table rebuilds need foreign keys off and the pre-3.26 rename behaviour,
+        # otherwise renaming the copy trips over triggers that name the old table.
+        # Both pragmas are ignored inside a transaction, so settle it first.
+        await self.conn.commit()
+        await self.conn.execute("PRAGMA foreign_keys = OFF")
+        await self.conn.execute("PRAGMA legacy_alter_table = ON")
+        try:
+            async with self.transaction() as conn:
+                await conn.execute("BEGIN")
+                for table, columns in pending:
+                    await self._rebuild_table(
+                        conn,
+                        table,
+                        {column: "INTEGER" for column in columns},
+                        {column: _iso_to_ms(column) for column in columns},
+                    )
+                cur = await conn.execute("PRAGMA foreign_key_check")
+                if await cur.fetchone() is not None:
+                    raise RuntimeError("Foreign key check failed after timestamp migration")
+        finally:
+            await self.conn.execute("PRAGMA legacy_alter_table = OFF")
+            await self.conn.execute("PRAGMA foreign_keys = ON")
+
+    async def _rebuild_table(
+        self,
+        conn: aiosqlite.Connection,
+        table: str,
+        retype: dict[str, str],
+        convert: dict[str, str],
+    ) -> None:
+        # SQLite cannot change a column's type in place: copy into a table with the
+        # new declaration and swap it in. Indexes and triggers go with the old table;
+        # init() recreates them.
+        cur = await conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        )
+        sql = (await cur.fetchone())["sql"]
+        for column, ddl_type in retype.items():
+            sql = re.sub(rf"\b({column}\s+)\w+", rf"\g<1>{ddl_type}", sql, count=1)
+        temp = f"{table}__rebuild"
+        sql = re.sub(rf"^CREATE TABLE\s+\"?{table}\"?", f"CREATE TABLE {temp}", sql)
+
+        cur = await conn.execute(f"PRAGMA table_info({table})")
+        columns = [row["name"] for row in await cur.fetchall()]
+        cur = await conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+        sequence = await cur.fetchone()
+
+        await conn.execute(sql)
+        await conn.execute(
+            f"INSERT INTO {temp} ({', '.join(columns)}) "
+            f"SELECT {', '.join(convert.get(column, column) for column in columns)} FROM {table}"
+        )
+        await conn.execute(f"DROP TABLE {table}")
+        await conn.execute(f"ALTER TABLE {temp} RENAME TO {table}")
+        if sequence is not None:
+            await conn.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+            await conn.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, sequence["seq"])
+            )
 
-    async def update_balance(self, user_id: int, delta_cents: int) -> None:
+    async def _ensure_column(self, table: str, column: str, ddl: str) -> None:
         assert self.conn is not None
-        await self.conn.execute(
-            "UPDATE users SET balance_cents = balance_cents + ? WHERE id = ?",
-            (delta_cents, user_id),
+        cur = await self.conn.execute(f"PRAGMA table_info({table})")
+        columns = {row["name"] for row in await cur.fetchall()}
+        if column not in columns:
+            await self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+    async def _ensure_products_fts(self) -> None:
+        assert self.conn is not None
+        cur = await self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
         )
-        await self.conn.commit()
+        exists = await cur.fetchone() is not None
+        await self.conn.executescript(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                title, description,
+                content='products', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
 
-    async def set_balance(self, user_id: int, new_balance_cents: int) -> None:
+            CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+                INSERT INTO products_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+                INSERT INTO products_fts(products_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS products_fts_update
+            AFTER UPDATE OF title, description ON products BEGIN
+                INSERT INTO products_fts(products_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO products_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END;
+            """
+        )
+        if not exists:
+            await self.conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+    async def _ensure_stock_triggers(self) -> None:
+        # products.stock mirrors the number of available units so the catalog
+        # never has to count them; NULL means the product has no units and
+        # delivers its static content.
         assert self.conn is not None
-        await self.conn.execute(
-            "UPDATE users SET balance_cents = ? WHERE id = ?",
-            (new_balance_cents, user_id),
+        await self.conn.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS product_units_stock_insert
+            AFTER INSERT ON product_units BEGIN
+                UPDATE products SET stock = COALESCE(stock, 0) + (new.status = 'available')
+                WHERE id = new.product_id;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS product_units_stock_update
+            AFTER UPDATE OF status ON product_units
+            WHEN (old.status = 'available') != (new.status = 'available') BEGIN
+                UPDATE products
+                SET stock = stock + (new.status = 'available') - (old.status = 'available')
+                WHERE id = new.product_id;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS product_units_stock_delete
+            AFTER DELETE ON product_units WHEN old.status = 'available' BEGIN
+                UPDATE products SET stock = stock - 1 WHERE id = old.product_id;
+            END;
+            """
         )
-        await self.conn.commit()
 
-    async def list_active_products(self) -> list[aiosqlite.Row]:
+    async def _backfill_product_render(self) -> None:
         assert self.conn is not None
         cur = await self.conn.execute(
-            "SELECT * FROM products WHERE is_active = 1 ORDER BY id DESC"
+            """
+            SELECT id, title, description, price_cents FROM products
+            WHERE card_html IS NULL OR button_label IS NULL OR card_html LIKE ?
+            """,
+            # Cards stored before the price line moved to render time; escaped
+            # titles and descriptions can never contain a literal "<b>".
+            ("%💎 Цена: <b>%",),
+        )
+        params = []
+        for row in await cur.fetchall():
+            card_html, button_label = _render_product(
+                row["title"], row["description"], int(row["price_cents"])
+            )
+            params.append((card_html, button_label, row["id"]))
+        if params:
+            await self.conn.executemany(
+                "UPDATE products SET card_html = ?, button_label = ? WHERE id = ?", params
+            )
+
+    async def add_or_update_user(self, user_id: int, username: str, full_name: str) -> None:
+        async with self.transaction() as conn:
+            row = await self.get_user(user_id)
+            if row:
+                await conn.execute(
+                    """
+                    UPDATE users
+                    SET
+                        username = COALESCE(NULLIF(?, ''), username),
+                        full_name = COALESCE(NULLIF(?, ''), full_name)
+                    WHERE id = ?
+                    """,
+                    (username, full_name, user_id),
+                )
+            else:
+                await conn.execute(
+                    "INSERT INTO users (id, username, full_name, balance_cents, created_at) VALUES (?, ?, ?, 0, ?)",
+                    (user_id, username, full_name, now_ms()),
+                )
+
+    async def get_user(self, user_id: int) -> Optional[User]:
+        return await self._fetch_record(
+            User, f"SELECT {_USER_COLUMNS} FROM users WHERE id = ?", (user_id,)
+        )
+
+    async def _ledger(
+        self,
+        conn: aiosqlite.Connection,
+        user_id: int,
+        delta_cents: int,
+        balance_after_cents: int,
+        reason: str,
+        ref_id: Optional[int] = None,
+        actor_id: Optional[int] = None,
+    ) -> None:
+        await conn.execute(
+            """
+            INSERT INTO balance_ledger
+            (user_id, delta_cents, balance_after_cents, reason, ref_id, actor_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (user_id, delta_cents, balance_after_cents, reason, ref_id, actor_id, now_ms()),
+        )
+
+    async def update_balance(
+        self,
+        user_id: int,
+        delta_cents: int,
+        reason: str = "adjustment",
+        actor_id: Optional[int] = None,
+    ) -> Optional[int]:
+        """Returns the new balance, or None if the user does not exist."""
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                """
+                UPDATE users SET balance_cents = balance_cents + ?
+                WHERE id = ?
+                RETURNING balance_cents
+                """,
+                (delta_cents, user_id),
+            )
+            row = await cur.fetchone()
+            if row is not None and delta_cents:
+                await self._ledger(
+                    conn, user_id, delta_cents, row["balance_cents"], reason, actor_id=actor_id
+                )
+        return int(row["balance_cents"]) if row else None
+
+    async def set_balance(
+        self, user_id: int, new_balance_cents: int, actor_id: Optional[int] = None
+    ) -> Optional[int]:
+        """Returns the previous balance, or None if the user does not exist."""
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                "SELECT balance_cents FROM users WHERE id = ?", (user_id,)
+            )
+            row = await cur.fetchone()
+            if row is None:
+                return None
+            await conn.execute(
+                "UPDATE users SET balance_cents = ? WHERE id = ?",
+                (new_balance_cents, user_id),
+            )
+            await self._ledger(
+                conn,
+                user_id,
+                new_balance_cents - row["balance_cents"],
+                new_balance_cents,
+                "admin_set",
+                actor_id=actor_id,
+            )
+        return int(row["balance_cents"])
+
+    async def list_balance_ledger(self, user_id: int, limit: int = 20) -> list[aiosqlite.Row]:
+        assert self.conn is not None
+        cur = await self.conn.execute(
+            """
+            SELECT * FROM balance_ledger
+            WHERE user_id = ?
+            ORDER BY id DESC
+            LIMIT ?
+            """,
+            (user_id, limit),
         )
         return await cur.fetchall()
 
+    async def verify_balance_ledger(self, full: bool = False) -> list[tuple[int, int, int]]:
+        """Compare cached balances with the ledger; returns (user_id, expected, actual).
+
+        The periodic pass only sums entries past the last checkpoint, for the
+        users they touch, so each run costs the number of new entries rather
+        than the whole history. ``full`` compares every balance with its whole
+        ledger instead, which also catches writes that bypassed the ledger; it
+        runs on a read-only connection and leaves the checkpoints alone.
+        """
+        if full:
+            async with self.reader() as conn:
+                cur = await conn.execute(
+                    """
+                    SELECT u.id AS user_id,
+                           COALESCE(l.total, 0) AS expected,
+                           u.balance_cents AS actual
+                    FROM users u
+                    LEFT JOIN (
+                        SELECT user_id, SUM(delta_cents) AS total
+                        FROM balance_ledger
+                        GROUP BY user_id
+                    ) l ON l.user_id = u.id
+                    WHERE u.balance_cents != COALESCE(l.total, 0)
+                    ORDER BY u.id
+                    """
+                )
+                return [
+                    (int(row["user_id"]), int(row["expected"]), int(row["actual"]))
+                    for row in await cur.fetchall()
+                ]
+        async with self.transaction() as conn:
+            cur = await conn.execute("SELECT last_ledger_id FROM ledger_state WHERE id = 1")
+            row = await cur.fetchone()
+            last_id = int(row["last_ledger_id"]) if row else 0
+            cur = await conn.execute("SELECT COALESCE(MAX(id), 0) AS id FROM balance_ledger")
+            head_id = int((await cur.fetchone())["id"])
+            cur = await conn.execute(
+                """
+                SELECT l.user_id,
+                       COALESCE(c.balance_cents, 0) + SUM(l.delta_cents) AS expected,
+                       COALESCE(u.balance_cents, 0) AS actual
+                FROM balance_ledger l
+                LEFT JOIN ledger_checkpoints c ON c.user_id = l.user_id
+                LEFT JOIN users u ON u.id = l.user_id
+                WHERE l.id > ? AND l.id <= ?
+                GROUP BY l.user_id
+                """,
+                (last_id, head_id),
+            )
+            touched = await cur.fetchall()
+            mismatches = [
+                (int(row["user_id"]), int(row["expected"]), int(row["actual"]))
+                for row in touched
+                if row["expected"] != row["actual"]
+            ]
+            await conn.executemany(
+                """
+                INSERT INTO ledger_checkpoints (user_id, balance_cents) VALUES (?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET balance_cents = excluded.balance_cents
+                """,
+                [(int(row["user_id"]), int(row["expected"])) for row in touched],
+            )
+            await conn.execute(
+                """
+                INSERT INTO ledger_state (id, last_ledger_id, verified_at) VALUES (1, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    last_ledger_id = excluded.last_ledger_id,
+                    verified_at = excluded.verified_at
+                """,
+                (head_id, now_ms()),
+            )
+        return sorted(mismatches)
+
+    async def list_active_products(self) -> list[Product]:
+        return await self._fetch_records(
+            Product,
+            f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE is_active = 1 ORDER BY id DESC",
+        )
+
     async def list_active_products_paged(
         self, limit: int = 10, offset: int = 0
-    ) -> list[aiosqlite.Row]:
-        assert self.conn is not None
-        cur = await self.conn.execute(
-            "SELECT * FROM products WHERE is_active = 1 ORDER BY id DESC LIMIT ? OFFSET ?",
+    ) -> list[Product]:
+        return await self._fetch_records(
+            Product,
+            f"""
+            SELECT {_PRODUCT_COLUMNS} FROM products
+            WHERE is_active = 1
+            ORDER BY id DESC LIMIT ? OFFSET ?
+            """,
             (limit, offset),
         )
-        return await cur.fetchall()
 
     async def count_active_products(self) -> int:
         assert self.conn is not None
@@ -154,18 +963,84 @@ class Database:
         row = await cur.fetchone()
         return int(row["cnt"]) if row else 0
 
-    async def list_all_products(self) -> list[aiosqlite.Row]:
+    async def list_category_products(
+        self, category_id: Optional[int], limit: int = 10, offset: int = 0
+    ) -> list[Product]:
+        return await self._fetch_records(
+            Product,
+            f"""
+            SELECT {_PRODUCT_COLUMNS} FROM products
+            WHERE category_id IS ? AND is_active = 1
+            ORDER BY id DESC LIMIT ? OFFSET ?
+            """,
+            (category_id, limit, offset),
+        )
+
+    async def count_active_products_by_category(self) -> dict[Optional[int], int]:
         assert self.conn is not None
-        cur = await self.conn.execute("SELECT * FROM products ORDER BY id DESC")
+        cur = await self.conn.execute(
+            """
+            SELECT category_id, COUNT(1) AS cnt FROM products
+            WHERE is_active = 1
+            GROUP BY category_id
+            """
+        )
+        return {row["category_id"]: int(row["cnt"]) for row in await cur.fetchall()}
+
+    async def search_products(self, query: str, limit: int = 20) -> list[Product]:
+        match = _fts_query(query)
+        if not match:
+            return await self.list_active_products_paged(limit=limit)
+        return await self._fetch_records(
+            Product,
+            f"""
+            SELECT {columns(Product, "p")} FROM products_fts f
+            JOIN products p ON p.id = f.rowid
+            WHERE products_fts MATCH ? AND p.is_active = 1
+            ORDER BY f.rank
+            LIMIT ?
+            """,
+            (match, limit),
+        )
+
+    async def list_categories(self) -> list[aiosqlite.Row]:
+        assert self.conn is not None
+        cur = await self.conn.execute("SELECT * FROM categories ORDER BY title, id")
         return await cur.fetchall()
 
-    async def list_users(self, limit: int = 10, offset: int = 0) -> list[aiosqlite.Row]:
+    async def get_category(self, category_id: int) -> Optional[aiosqlite.Row]:
         assert self.conn is not None
-        cur = await self.conn.execute(
-            "SELECT * FROM users ORDER BY id DESC LIMIT ? OFFSET ?",
+        cur = await self.conn.execute("SELECT * FROM categories WHERE id = ?", (category_id,))
+        return await cur.fetchone()
+
+    async def create_category(self, title: str, parent_id: Optional[int] = None) -> int:
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                "INSERT INTO categories (parent_id, title, created_at) VALUES (?, ?, ?)",
+                (parent_id, title, now_ms()),
+            )
+        self.catalog_version += 1
+        return int(cur.lastrowid)
+
+    async def set_product_category(self, product_id: int, category_id: Optional[int]) -> bool:
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                "UPDATE products SET category_id = ? WHERE id = ?", (category_id, product_id)
+            )
+        self.catalog_version += 1
+        return cur.rowcount == 1
+
+    async def list_all_products(self) -> list[Product]:
+        return await self._fetch_records(
+            Product, f"SELECT {_PRODUCT_COLUMNS} FROM products ORDER BY id DESC"
+        )
+
+    async def list_users(self, limit: int = 10, offset: int = 0) -> list[User]:
+        return await self._fetch_records(
+            User,
+            f"SELECT {_USER_COLUMNS} FROM users ORDER BY id DESC LIMIT ? OFFSET ?",
             (limit, offset),
         )
-        return await cur.fetchall()
 
     async def count_users(self) -> int:
         assert self.conn is not None
@@ -173,43 +1048,78 @@ class Database:
         row = await cur.fetchone()
         return int(row["cnt"]) if row else 0
 
-    async def search_users(self, query: str, limit: int = 10) -> list[aiosqlite.Row]:
-        assert self.conn is not None
+    async def search_users(self, query: str, limit: int = 10) -> list[User]:
         like = f"%{query}%"
-        cur = await self.conn.execute(
-            """
-            SELECT * FROM users
+        return await self._fetch_records(
+            User,
+            f"""
+            SELECT {_USER_COLUMNS} FROM users
             WHERE username LIKE ? OR full_name LIKE ?
             ORDER BY id DESC
             LIMIT ?
             """,
             (like, like, limit),
         )
-        return await cur.fetchall()
 
-    async def get_product(self, product_id: int) -> Optional[aiosqlite.Row]:
-        assert self.conn is not None
-        cur = await self.conn.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-        return await cur.fetchone()
+    async def get_product(self, product_id: int) -> Optional[Product]:
+        return await self._fetch_record(
+            Product, f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE id = ?", (product_id,)
+        )
 
     async def create_product(
         self, title: str, description: str, price_cents: int, content: str
     ) -> int:
-        assert self.conn is not None
-        cur = await self.conn.execute(
-            "INSERT INTO products (title, description, price_cents, content, is_active, created_at) VALUES (?, ?, ?, ?, 1, ?)",
-            (title, description, price_cents, content, utc_now()),
-        )
-        await self.conn.commit()
+        card_html, button_label = _render_product(title, description, price_cents)
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                """
+                INSERT INTO products
+                (title, description, price_cents, content, is_active, created_at, card_html, button_label)
+                VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+                """,
+                (title, description, price_cents, content, now_ms(), card_html, button_label),
+            )
+        self.catalog_version += 1
         return int(cur.lastrowid)
 
+    async def insert_products(self, rows: Iterable[tuple]) -> int:
+        # rows: (title, description, price_cents, content, is_active, category_id,
+        #        card_html, button_label), already validated and rendered.
+        now = now_ms()
+        async with self.transaction() as conn:
+            cur = await conn.executemany(
+                """
+                INSERT INTO products
+                (title, description, price_cents, content, is_active, category_id,
+                 card_html, button_label, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [(*row, now) for row in rows],
+            )
+        self.catalog_version += 1
+        return cur.rowcount
+
+    async def iter_products(self, batch_size: int = 500) -> AsyncIterator[Product]:
+        last_id = 0
+        while True:
+            rows = await self._fetch_records(
+                Product,
+                f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            )
+            if not rows:
+                return
+            for row in rows:
+                yield row
+            last_id = rows[-1].id
+
     async def toggle_product(self, product_id: int, is_active: bool) -> None:
-        assert self.conn is not None
-        await self.conn.execute(
-            "UPDATE products SET is_active = ? WHERE id = ?",
-            (1 if is_active else 0, product_id),
-        )
-        await self.conn.commit()
+        async with self.transaction() as conn:
+            await conn.execute(
+                "UPDATE products SET is_active = ? WHERE id = ?",
+                (1 if is_active else 0, product_id),
+            )
+        self.catalog_version += 1
 
     async def create_order(
         self,
@@ -219,116 +1129,969 @@ class Database:
         payment_method: str,
         crypto_invoice_id: Optional[str] = None,
         crypto_pay_url: Optional[str] = None,
+        reservation_ttl: float = 0,
     ) -> int:
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                """
+                INSERT INTO orders
+                (user_id, product_id, amount_cents, status, payment_method, crypto_invoice_id, crypto_pay_url, created_at)
+                VALUES (?, ?, ?, 'pending', ?, ?, ?, ?)
+                """,
+                (user_id, product_id, amount_cents, payment_method, crypto_invoice_id, crypto_pay_url, now_ms()),
+            )
+            order_id = int(cur.lastrowid)
+            claimed = await self._claim_unit(
+                conn, product_id, order_id, "reserved", after_ms(reservation_ttl)
+            )
+            await self._bump_daily(conn, orders_created=1)
+        if claimed:
+            self.catalog_version += 1
+        return order_id
+
+    async def _bump_daily(self, conn: aiosqlite.Connection, **deltas: int) -> None:
+        columns = ", ".join(deltas)
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in deltas)
+        await conn.execute(
+            f"""
+            INSERT INTO daily_stats (day, {columns}) VALUES (?{", ?" * len(deltas)})
+            ON CONFLICT(day) DO UPDATE SET {updates}
+            """,
+            (utc_today(), *deltas.values()),
+        )
+
+    async def _record_sales(
+        self, conn: aiosqlite.Connection, sales: list[tuple[int, int]]
+    ) -> None:
+        # sales: (product_id, amount_cents) for every order that just became paid.
+        if not sales:
+            return
+        await self._bump_daily(
+            conn, orders_paid=len(sales), revenue_cents=sum(amount for _, amount in sales)
+        )
+        day = utc_today()
+        await conn.executemany(
+            """
+            INSERT INTO daily_product_stats (day, product_id, sold, revenue_cents)
+            VALUES (?, ?, 1, ?)
+            ON CONFLICT(day, product_id) DO UPDATE SET
+                sold = sold + 1, revenue_cents = revenue_cents + excluded.revenue_cents
+            """,
+            [(day, product_id, amount) for product_id, amount in sales],
+        )
+
+    async def _claim_unit(
+        self,
+        conn: aiosqlite.Connection,
+        product_id: int,
+        order_id: int,
+        status: str,
+        reserved_until: Optional[int] = None,
+    ) -> bool:
+        # Picking and taking the unit is one statement, so two buyers can never
+        # end up with the same row no matter how many connections race for it.
+        cur = await conn.execute(
+            """
+            UPDATE product_units SET status = ?, order_id = ?, reserved_until = ?
+            WHERE id = (
+                SELECT id FROM product_units
+                WHERE product_id = ? AND status = 'available'
+                ORDER BY id LIMIT 1
+            )
+            RETURNING id
+            """,
+            (status, order_id, reserved_until if status == "reserved" else None, product_id),
+        )
+        if await cur.fetchone() is not None:
+            return True
+        cur = await conn.execute("SELECT stock FROM products WHERE id = ?", (product_id,))
+        row = await cur.fetchone()
+        if row is not None and row["stock"] is not None:
+            raise OutOfStockError(product_id)
+        return False
+
+    async def add_product_units(self, product_id: int, contents: list[str]) -> int:
+        now = now_ms()
+        async with self.transaction() as conn:
+            await conn.executemany(
+                "INSERT INTO product_units (product_id, content, created_at) VALUES (?, ?, ?)",
+                [(product_id, content, now) for content in contents],
+            )
+        self.catalog_version += 1
+        return len(contents)
+
+    async def release_expired_reservations(self) -> int:
+        now = now_ms()
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                """
+                UPDATE orders SET status = 'expired'
+                WHERE status = 'pending' AND id IN (
+                    SELECT order_id FROM product_units
+                    WHERE status = 'reserved' AND reserved_until <= ?
+                )
+                RETURNING checkout_id
+                """,
+                (now,),
+            )
+            checkout_ids = [
+                (row["checkout_id"],)
+                for row in await cur.fetchall()
+                if row["checkout_id"] is not None
+            ]
+            if checkout_ids:
+                await conn.executemany(
+                    "UPDATE checkouts SET status = 'expired' WHERE id = ? AND status = 'pending'",
+                    checkout_ids,
+                )
+                await conn.executemany(
+                    """
+                    UPDATE orders SET status = 'expired'
+                    WHERE checkout_id = ? AND status = 'pending'
+                    """,
+                    checkout_ids,
+                )
+            cur = await conn.execute(
+                """
+                UPDATE product_units SET status = 'available', order_id = NULL, reserved_until = NULL
+                WHERE status = 'reserved' AND (
+                    reserved_until <= ?
+                    OR EXISTS (
+                        SELECT 1 FROM orders o
+                        WHERE o.id = product_units.order_id AND o.status = 'expired'
+                    )
+                )
+                """,
+                (now,),
+            )
+            released = cur.rowcount
+        if released:
+            self.catalog_version += 1
+        return released
+
+    async def _settle_expired(
+        self,
+        conn: aiosqlite.Connection,
+        orders: list[aiosqlite.Row],
+        refund_reason: str,
+        ref_id: int,
+    ) -> tuple[int, bool]:
+        """Settle orders the reaper expired although their invoice got paid.
+
+        Each order takes a fresh unit; one whose product has sold out in the
+        meantime is marked 'refunded' and its amount goes to the buyer's
+        balance. Returns (refunded cents, whether any unit was claimed).
+        """
+        now = now_ms()
+        statuses, sales, refund, claimed = [], [], 0, False
+        for order in orders:
+            try:
+                claimed |= await self._claim_unit(conn, order["product_id"], order["id"], "sold")
+            except OutOfStockError:
+                statuses.append(("refunded", order["id"]))
+                refund += order["amount_cents"]
+                continue
+            statuses.append(("paid", order["id"]))
+            sales.append((order["product_id"], order["amount_cents"]))
+        await conn.executemany(
+            "UPDATE orders SET status = ?, paid_at = ? WHERE id = ?",
+            [(status, now, order_id) for status, order_id in statuses],
+        )
+        await self._record_sales(conn, sales)
+        if refund:
+            user_id = orders[0]["user_id"]
+            cur = await conn.execute(
+                """
+                UPDATE users SET balance_cents = balance_cents + ?
+                WHERE id = ?
+                RETURNING balance_cents
+                """,
+                (refund, user_id),
+            )
+            row = await cur.fetchone()
+            if row is not None:
+                await self._ledger(
+                    conn, user_id, refund, row["balance_cents"], refund_reason, ref_id
+                )
+        return refund, claimed
+
+    async def settle_expired_order(self, order_id: int) -> Optional[str]:
+        """Settle a paid order whose reservation already expired.
+
+        Returns the new status ('paid' or 'refunded'), or None if the order is
+        not expired (it was never reaped or has been settled already).
+        """
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                """
+                SELECT id, user_id, product_id, amount_cents FROM orders
+                WHERE id = ? AND status = 'expired'
+                """,
+                (order_id,),
+            )
+            order = await cur.fetchone()
+            if order is None:
+                return None
+            refund, claimed = await self._settle_expired(conn, [order], "refund", order_id)
+        if claimed:
+            self.catalog_version += 1
+        return "refunded" if refund else "paid"
+
+    async def settle_expired_checkout(self, checkout_id: int) -> Optional[int]:
+        """Settle a paid checkout whose reservations already expired.
+
+        Returns the refunded amount (0 if every item got a unit), or None if the
+        checkout is not expired.
+        """
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                "UPDATE checkouts SET status = 'paid', paid_at = ? WHERE id = ? AND status = 'expired'",
+                (now_ms(), checkout_id),
+            )
+            if cur.rowcount != 1:
+                return None
+            cur = await conn.execute(
+                """
+                SELECT id, user_id, product_id, amount_cents FROM orders
+                WHERE checkout_id = ? AND status = 'expired'
+                ORDER BY id
+                """,
+                (checkout_id,),
+            )
+            orders = list(await cur.fetchall())
+            if not orders:
+                return 0
+            refund, claimed = await self._settle_expired(
+                conn, orders, "checkout_refund", checkout_id
+            )
+        if claimed:
+            self.catalog_version += 1
+        return refund
+
+    async def get_order_content(self, order_id: int) -> Optional[str]:
         assert self.conn is not None
         cur = await self.conn.execute(
             """
-            INSERT INTO orders
-            (user_id, product_id, amount_cents, status, payment_method, crypto_invoice_id, crypto_pay_url, created_at)
-            VALUES (?, ?, ?, 'pending', ?, ?, ?, ?)
+            SELECT COALESCE(u.content, ua.content, p.content) AS content
+            FROM orders_all o
+            JOIN products p ON p.id = o.product_id
+            LEFT JOIN product_units u ON u.order_id = o.id
+            LEFT JOIN product_units_archive ua ON ua.order_id = o.id
+            WHERE o.id = ?
             """,
-            (user_id, product_id, amount_cents, payment_method, crypto_invoice_id, crypto_pay_url, utc_now()),
+            (order_id,),
         )
-        await self.conn.commit()
-        return int(cur.lastrowid)
+        row = await cur.fetchone()
+        return row["content"] if row else None
 
-    async def get_order(self, order_id: int) -> Optional[aiosqlite.Row]:
-        assert self.conn is not None
-        cur = await self.conn.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
-        return await cur.fetchone()
+    async def get_order(self, order_id: int) -> Optional[Order]:
+        return await self._fetch_record(
+            Order, f"SELECT {_ORDER_COLUMNS} FROM orders_all WHERE id = ?", (order_id,)
+        )
+
+    async def get_order_by_invoice(self, invoice_id: str) -> Optional[Order]:
+        return await self._fetch_record(
+            Order,
+            f"SELECT {_ORDER_COLUMNS} FROM orders WHERE crypto_invoice_id = ?",
+            (invoice_id,),
+        )
+
+    async def set_order_paid(self, order_id: int) -> bool:
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                """
+                UPDATE orders SET status = 'paid', paid_at = ?
+                WHERE id = ? AND status = 'pending'
+                RETURNING product_id, amount_cents
+                """,
+                (now_ms(), order_id),
+            )
+            sale = await cur.fetchone()
+            if sale is None:
+                return False
+            await self._record_sales(conn, [(sale["product_id"], sale["amount_cents"])])
+            await conn.execute(
+                """
+                UPDATE product_units SET status = 'sold', reserved_until = NULL
+                WHERE order_id = ? AND status = 'reserved'
+                """,
+                (order_id,),
+            )
+        return True
+
+    async def purchase_with_balance(
+        self, user_id: int, product_id: int, price_cents: int
+    ) -> Optional[int]:
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                """
+                UPDATE users SET balance_cents = balance_cents - ?
+                WHERE id = ? AND balance_cents >= ?
+                RETURNING balance_cents
+                """,
+                (price_cents, user_id, price_cents),
+            )
+            balance = await cur.fetchone()
+            if balance is None:
+                return None
+            now = now_ms()
+            cur = await conn.execute(
+                """
+                INSERT INTO orders
+                (user_id, product_id, amount_cents, status, payment_method, created_at, paid_at)
+                VALUES (?, ?, ?, 'paid', 'balance', ?, ?)
+                """,
+                (user_id, product_id, price_cents, now, now),
+            )
+            order_id = int(cur.lastrowid)
+            await self._ledger(
+                conn, user_id, -price_cents, balance["balance_cents"], "purchase", order_id
+            )
+            claimed = await self._claim_unit(conn, product_id, order_id, "sold")
+            await self._bump_daily(conn, orders_created=1)
+            await self._record_sales(conn, [(product_id, price_cents)])
+        if claimed:
+            self.catalog_version += 1
+        return order_id
+
+    async def add_to_cart(self, user_id: int, product_id: int, max_quantity: int) -> Optional[int]:
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                """
+                INSERT INTO cart_items (user_id, product_id, quantity, added_at)
+                VALUES (?, ?, 1, ?)
+                ON CONFLICT(user_id, product_id) DO UPDATE SET quantity = quantity + 1
+                WHERE quantity < ?
+                RETURNING quantity
+                """,
+                (user_id, product_id, now_ms(), max_quantity),
+            )
+            row = await cur.fetchone()
+        return int(row["quantity"]) if row else None
+
+    async def remove_from_cart(self, user_id: int, product_id: int) -> None:
+        async with self.transaction() as conn:
+            await conn.execute(
+                "DELETE FROM cart_items WHERE user_id = ? AND product_id = ?",
+                (user_id, product_id),
+            )
+
+    async def clear_cart(self, user_id: int) -> None:
+        async with self.transaction() as conn:
+            await conn.execute("DELETE FROM cart_items WHERE user_id = ?", (user_id,))
 
-    async def get_order_by_invoice(self, invoice_id: str) -> Optional[aiosqlite.Row]:
+    async def get_cart(self, user_id: int) -> list[aiosqlite.Row]:
         assert self.conn is not None
         cur = await self.conn.execute(
-            "SELECT * FROM orders WHERE crypto_invoice_id = ?", (invoice_id,)
+            """
+            SELECT c.product_id, c.quantity, p.title, p.price_cents, p.is_active, p.stock
+            FROM cart_items c
+            JOIN products p ON p.id = c.product_id
+            WHERE c.user_id = ?
+            ORDER BY c.added_at, c.product_id
+            """,
+            (user_id,),
         )
-        return await cur.fetchone()
+        return await cur.fetchall()
 
-    async def set_order_paid(self, order_id: int) -> None:
-        assert self.conn is not None
-        await self.conn.execute(
-            "UPDATE orders SET status = 'paid', paid_at = ? WHERE id = ?",
-            (utc_now(), order_id),
+    async def _insert_checkout(
+        self,
+        conn: aiosqlite.Connection,
+        user_id: int,
+        items: list[tuple[int, int]],
+        status: str,
+        payment_method: str,
+        crypto_invoice_id: Optional[str] = None,
+        crypto_pay_url: Optional[str] = None,
+        reserved_until: Optional[int] = None,
+    ) -> tuple[int, bool]:
+        now = now_ms()
+        paid_at = now if status == "paid" else None
+        cur = await conn.execute(
+            """
+            INSERT INTO checkouts
+            (user_id, amount_cents, item_count, status, payment_method,
+             crypto_invoice_id, crypto_pay_url, created_at, paid_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                user_id,
+                sum(price for _, price in items),
+                len(items),
+                status,
+                payment_method,
+                crypto_invoice_id,
+                crypto_pay_url,
+                now,
+                paid_at,
+            ),
         )
-        await self.conn.commit()
+        checkout_id = int(cur.lastrowid)
+        await conn.executemany(
+            """
+            INSERT INTO orders
+            (user_id, product_id, amount_cents, status, payment_method,
+             crypto_invoice_id, crypto_pay_url, created_at, paid_at, checkout_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    user_id,
+                    product_id,
+                    price,
+                    status,
+                    payment_method,
+                    crypto_invoice_id,
+                    crypto_pay_url,
+                    now,
+                    paid_at,
+                    checkout_id,
+                )
+                for product_id, price in items
+            ],
+        )
+        await conn.executemany(
+            "DELETE FROM cart_items WHERE user_id = ? AND product_id = ?",
+            [(user_id, product_id) for product_id in {product_id for product_id, _ in items}],
+        )
+        cur = await conn.execute(
+            "SELECT id, product_id FROM orders WHERE checkout_id = ? ORDER BY id", (checkout_id,)
+        )
+        await self._bump_daily(conn, orders_created=len(items))
+        if status == "paid":
+            await self._record_sales(conn, items)
+        unit_status = "sold" if status == "paid" else "reserved"
+        claimed = False
+        for row in await cur.fetchall():
+            if await self._claim_unit(
+                conn, row["product_id"], row["id"], unit_status, reserved_until
+            ):
+                claimed = True
+        return checkout_id, claimed
+
+    async def create_checkout(
+        self,
+        user_id: int,
+        items: list[tuple[int, int]],
+        crypto_invoice_id: str,
+        crypto_pay_url: str,
+        reservation_ttl: float = 0,
+    ) -> int:
+        async with self.transaction() as conn:
+            checkout_id, claimed = await self._insert_checkout(
+                conn,
+                user_id,
+                items,
+                "pending",
+                "crypto",
+                crypto_invoice_id,
+                crypto_pay_url,
+                after_ms(reservation_ttl),
+            )
+        if claimed:
+            self.catalog_version += 1
+        return checkout_id
 
-    async def list_user_orders(self, user_id: int, limit: int = 10) -> list[aiosqlite.Row]:
+    async def checkout_with_balance(
+        self, user_id: int, items: list[tuple[int, int]]
+    ) -> Optional[int]:
+        total = sum(price for _, price in items)
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                """
+                UPDATE users SET balance_cents = balance_cents - ?
+                WHERE id = ? AND balance_cents >= ?
+                RETURNING balance_cents
+                """,
+                (total, user_id, total),
+            )
+            balance = await cur.fetchone()
+            if balance is None:
+                return None
+            checkout_id, claimed = await self._insert_checkout(
+                conn, user_id, items, "paid", "balance"
+            )
+            await self._ledger(
+                conn, user_id, -total, balance["balance_cents"], "checkout", checkout_id
+            )
+        if claimed:
+            self.catalog_version += 1
+        return checkout_id
+
+    async def get_checkout(self, checkout_id: int) -> Optional[Checkout]:
+        return await self._fetch_record(
+            Checkout, f"SELECT {columns(Checkout)} FROM checkouts WHERE id = ?", (checkout_id,)
+        )
+
+    async def settle_checkout(self, checkout_id: int) -> bool:
+        now = now_ms()
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                "UPDATE checkouts SET status = 'paid', paid_at = ? WHERE id = ? AND status = 'pending'",
+                (now, checkout_id),
+            )
+            if cur.rowcount != 1:
+                return False
+            cur = await conn.execute(
+                """
+                UPDATE orders SET status = 'paid', paid_at = ?
+                WHERE checkout_id = ? AND status = 'pending'
+                RETURNING product_id, amount_cents
+                """,
+                (now, checkout_id),
+            )
+            await self._record_sales(
+                conn, [(row["product_id"], row["amount_cents"]) for row in await cur.fetchall()]
+            )
+            await conn.execute(
+                """
+                UPDATE product_units SET status = 'sold', reserved_until = NULL
+                WHERE status = 'reserved'
+                  AND order_id IN (SELECT id FROM orders WHERE checkout_id = ?)
+                """,
+                (checkout_id,),
+            )
+        return True
+
+    async def list_checkout_items(self, checkout_id: int) -> list[aiosqlite.Row]:
         assert self.conn is not None
         cur = await self.conn.execute(
             """
-            SELECT o.*, p.title
-            FROM orders o
+            SELECT o.id, o.product_id, o.amount_cents, p.title,
+                   COALESCE(u.content, ua.content, p.content) AS content
+            FROM orders_all o
             JOIN products p ON p.id = o.product_id
-            WHERE o.user_id = ?
+            LEFT JOIN product_units u ON u.order_id = o.id
+            LEFT JOIN product_units_archive ua ON ua.order_id = o.id
+            WHERE o.checkout_id = ? AND o.status = 'paid'
+            ORDER BY o.id
+            """,
+            (checkout_id,),
+        )
+        return await cur.fetchall()
+
+    async def _newest_first(
+        self, record: type[R], sql: str, table: str, params: tuple, limit: int
+    ) -> list[R]:
+        """One newest-first page from a hot table and, only if it may hold newer
+        rows than the page's tail, from its archive.
+
+        ``sql`` names the table as ``{table}`` and takes the limit as its last
+        parameter.
+        """
+        assert self.conn is not None
+        rows = await self._fetch_records(record, sql.format(table=table), (*params, limit))
+        if len(rows) == limit:
+            cur = await self.conn.execute(f"SELECT MAX(id) AS id FROM {table}_archive")
+            newest = (await cur.fetchone())["id"]
+            if newest is None or newest < rows[-1].id:
+                return rows
+        rows += await self._fetch_records(
+            record, sql.format(table=f"{table}_archive"), (*params, limit)
+        )
+        rows.sort(key=lambda row: row.id, reverse=True)
+        return rows[:limit]
+
+    async def list_user_orders(
+        self, user_id: int, limit: int = 10, before_id: Optional[int] = None
+    ) -> list[Order]:
+        return await self._newest_first(
+            Order,
+            _ORDERS_WITH_TITLE
+            + """
+            WHERE o.user_id = ? AND o.id < ?
             ORDER BY o.id DESC
             LIMIT ?
             """,
-            (user_id, limit),
+            "orders",
+            (user_id, before_id or _MAX_ID),
+            limit,
+        )
+
+    async def list_recent_orders(self, limit: int = 20) -> list[Order]:
+        return await self._newest_first(
+            Order,
+            _ORDERS_WITH_TITLE
+            + """
+            ORDER BY o.id DESC
+            LIMIT ?
+            """,
+            "orders",
+            (),
+            limit,
+        )
+
+    async def list_orders_paid_between(
+        self, start_ms: int, end_ms: int, limit: int = 100
+    ) -> list[Order]:
+        return await self._fetch_records(
+            Order,
+            _ORDERS_WITH_TITLE.format(table="orders_all")
+            + """
+            WHERE o.paid_at >= ? AND o.paid_at < ?
+            ORDER BY o.paid_at
+            LIMIT ?
+            """,
+            (start_ms, end_ms, limit),
         )
-        return await cur.fetchall()
 
-    async def list_recent_orders(self, limit: int = 20) -> list[aiosqlite.Row]:
+    async def sum_orders_paid_between(self, start_ms: int, end_ms: int) -> tuple[int, int]:
         assert self.conn is not None
         cur = await self.conn.execute(
             """
-            SELECT o.*, p.title
-            FROM orders o
-            JOIN products p ON p.id = o.product_id
-            ORDER BY o.id DESC
-            LIMIT ?
+            SELECT COUNT(1) AS cnt, COALESCE(SUM(amount_cents), 0) AS total
+            FROM orders_all
+            WHERE paid_at >= ? AND paid_at < ?
             """,
-            (limit,),
+            (start_ms, end_ms),
         )
-        return await cur.fetchall()
+        row = await cur.fetchone()
+        return int(row["cnt"]), int(row["total"])
 
     async def create_topup(
         self, user_id: int, amount_cents: int, crypto_invoice_id: str, crypto_pay_url: str
     ) -> int:
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                """
+                INSERT INTO topups
+                (user_id, amount_cents, status, crypto_invoice_id, crypto_pay_url, created_at)
+                VALUES (?, ?, 'pending', ?, ?, ?)
+                """,
+                (user_id, amount_cents, crypto_invoice_id, crypto_pay_url, now_ms()),
+            )
+            await self._bump_daily(conn, topups_created=1)
+        return int(cur.lastrowid)
+
+    async def get_topup(self, topup_id: int) -> Optional[Topup]:
+        return await self._fetch_record(
+            Topup, f"SELECT {_TOPUP_COLUMNS} FROM topups_all WHERE id = ?", (topup_id,)
+        )
+
+    async def get_topup_by_invoice(self, invoice_id: str) -> Optional[Topup]:
+        return await self._fetch_record(
+            Topup,
+            f"SELECT {_TOPUP_COLUMNS} FROM topups WHERE crypto_invoice_id = ?",
+            (invoice_id,),
+        )
+
+    async def _mark_topup_paid(self, conn: aiosqlite.Connection, topup_id: int) -> bool:
+        cur = await conn.execute(
+            """
+            UPDATE topups SET status = 'paid', paid_at = ?
+            WHERE id = ? AND status = 'pending'
+            RETURNING amount_cents
+            """,
+            (now_ms(), topup_id),
+        )
+        row = await cur.fetchone()
+        if row is None:
+            return False
+        await self._bump_daily(conn, topups_paid=1, topup_cents=row["amount_cents"])
+        return True
+
+    async def set_topup_paid(self, topup_id: int) -> bool:
+        async with self.transaction() as conn:
+            return await self._mark_topup_paid(conn, topup_id)
+
+    async def settle_topup(self, topup_id: int) -> bool:
+        async with self.transaction() as conn:
+            if not await self._mark_topup_paid(conn, topup_id):
+                return False
+            cur = await conn.execute(
+                "SELECT user_id, amount_cents FROM topups WHERE id = ?", (topup_id,)
+            )
+            topup = await cur.fetchone()
+            cur = await conn.execute(
+                """
+                UPDATE users SET balance_cents = balance_cents + ?
+                WHERE id = ?
+                RETURNING balance_cents
+                """,
+                (topup["amount_cents"], topup["user_id"]),
+            )
+            row = await cur.fetchone()
+            if row is not None:
+                await self._ledger(
+                    conn,
+                    topup["user_id"],
+                    topup["amount_cents"],
+                    row["balance_cents"],
+                    "topup",
+                    topup_id,
+                )
+        return True
+
+    async def list_user_topups(
+        self, user_id: int, limit: int = 10, before_id: Optional[int] = None
+    ) -> list[Topup]:
+        return await self._newest_first(
+            Topup,
+            f"SELECT {_TOPUP_COLUMNS} FROM {{table}} "
+            "WHERE user_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            "topups",
+            (user_id, before_id or _MAX_ID),
+            limit,
+        )
+
+    async def list_topups_paid_between(
+        self, start_ms: int, end_ms: int, limit: int = 100
+    ) -> list[Topup]:
+        return await self._fetch_records(
+            Topup,
+            f"""
+            SELECT {_TOPUP_COLUMNS} FROM topups_all
+            WHERE paid_at >= ? AND paid_at < ?
+            ORDER BY paid_at
+            LIMIT ?
+            """,
+            (start_ms, end_ms, limit),
+        )
+
+    async def sum_topups_paid_between(self, start_ms: int, end_ms: int) -> tuple[int, int]:
         assert self.conn is not None
         cur = await self.conn.execute(
             """
-            INSERT INTO topups
-            (user_id, amount_cents, status, crypto_invoice_id, crypto_pay_url, created_at)
-            VALUES (?, ?, 'pending', ?, ?, ?)
+            SELECT COUNT(1) AS cnt, COALESCE(SUM(amount_cents), 0) AS total
+            FROM topups_all
+            WHERE paid_at >= ? AND paid_at < ?
             """,
-            (user_id, amount_cents, crypto_invoice_id, crypto_pay_url, utc_now()),
+            (start_ms, end_ms),
         )
-        await self.conn.commit()
+        row = await cur.fetchone()
+        return int(row["cnt"]), int(row["total"])
+
+    async def count_orders(self, user_id: int) -> int:
+        assert self.conn is not None
+        cur = await self.conn.execute(
+            """
+            SELECT (SELECT COUNT(1) FROM orders WHERE user_id = ? AND status = 'paid')
+                 + (SELECT COUNT(1) FROM orders_archive WHERE user_id = ? AND status = 'paid')
+                 AS cnt
+            """,
+            (user_id, user_id),
+        )
+        row = await cur.fetchone()
+        return int(row["cnt"]) if row else 0
+
+    async def list_user_ids_after(self, after_id: int, limit: int = 100) -> list[int]:
+        assert self.conn is not None
+        cur = await self.conn.execute(
+            "SELECT id FROM users WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit),
+        )
+        rows = await cur.fetchall()
+        return [int(row["id"]) for row in rows]
+
+    async def create_broadcast(self, admin_id: int, chat_id: int, text: str, total: int) -> int:
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                """
+                INSERT INTO broadcasts (admin_id, chat_id, text, status, total, created_at)
+                VALUES (?, ?, ?, 'running', ?, ?)
+                """,
+                (admin_id, chat_id, text, total, now_ms()),
+            )
         return int(cur.lastrowid)
 
-    async def get_topup(self, topup_id: int) -> Optional[aiosqlite.Row]:
+    async def set_broadcast_message(self, broadcast_id: int, message_id: int) -> None:
+        async with self.transaction() as conn:
+            await conn.execute(
+                "UPDATE broadcasts SET message_id = ? WHERE id = ?",
+                (message_id, broadcast_id),
+            )
+
+    async def get_broadcast(self, broadcast_id: int) -> Optional[aiosqlite.Row]:
         assert self.conn is not None
-        cur = await self.conn.execute("SELECT * FROM topups WHERE id = ?", (topup_id,))
+        cur = await self.conn.execute("SELECT * FROM broadcasts WHERE id = ?", (broadcast_id,))
         return await cur.fetchone()
 
-    async def get_topup_by_invoice(self, invoice_id: str) -> Optional[aiosqlite.Row]:
+    async def list_running_broadcasts(self) -> list[aiosqlite.Row]:
         assert self.conn is not None
         cur = await self.conn.execute(
-            "SELECT * FROM topups WHERE crypto_invoice_id = ?", (invoice_id,)
+            "SELECT * FROM broadcasts WHERE status = 'running' ORDER BY id"
         )
-        return await cur.fetchone()
+        return await cur.fetchall()
+
+    async def save_broadcast_progress(
+        self,
+        broadcast_id: int,
+        last_user_id: int,
+        sent: int,
+        failed: int,
+        blocked: int,
+        failures: list[tuple[int, str]],
+    ) -> None:
+        async with self.transaction() as conn:
+            if failures:
+                await conn.executemany(
+                    "INSERT OR REPLACE INTO broadcast_failures (broadcast_id, user_id, reason) VALUES (?, ?, ?)",
+                    [(broadcast_id, user_id, reason) for user_id, reason in failures],
+                )
+            await conn.execute(
+                """
+                UPDATE broadcasts
+                SET last_user_id = ?, sent_count = ?, failed_count = ?, blocked_count = ?
+                WHERE id = ?
+                """,
+                (last_user_id, sent, failed, blocked, broadcast_id),
+            )
+
+    async def finish_broadcast(self, broadcast_id: int, status: str) -> None:
+        async with self.transaction() as conn:
+            await conn.execute(
+                "UPDATE broadcasts SET status = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+                (status, now_ms(), broadcast_id),
+            )
+
+    async def archive_settled(self, before_ms: int, batch_size: int = 500) -> tuple[int, int]:
+        """Move settled orders and top-ups created before ``before_ms`` to the archive.
 
-    async def set_topup_paid(self, topup_id: int) -> None:
+        Each batch is its own short transaction. Returns (orders, topups) moved.
+        """
+        orders = topups = 0
+        while True:
+            moved = await self._archive_batch("orders", before_ms, batch_size)
+            orders += moved
+            if moved < batch_size:
+                break
+        while True:
+            moved = await self._archive_batch("topups", before_ms, batch_size)
+            topups += moved
+            if moved < batch_size:
+                break
+        return orders, topups
+
+    async def _archive_batch(self, table: str, before_ms: int, batch_size: int) -> int:
+        # Ids grow with created_at, so the scan stops at the first young row
+        # instead of walking the whole table on every run. Orders whose unit is
+        # still reserved wait for the reaper to release it.
+        held = (
+            """
+            AND NOT EXISTS (
+                SELECT 1 FROM product_units u
+                WHERE u.order_id = t.id AND u.status != 'sold'
+            )
+            """
+            if table == "orders"
+            else ""
+        )
+        columns = _ORDER_COLUMNS if table == "orders" else _TOPUP_COLUMNS
+        async with self.transaction() as conn:
+            cur = await conn.execute(
+                f"""
+                SELECT t.id FROM {table} t
+                WHERE t.id < COALESCE(
+                    (SELECT id FROM {table} WHERE created_at >= ? ORDER BY id LIMIT 1), ?
+                )
+                AND t.status IN ('paid', 'expired', 'refunded')
+                {held}
+                ORDER BY t.id
+                LIMIT ?
+                """,
+                (before_ms, _MAX_ID, batch_size),
+            )
+            ids = json.dumps([row["id"] for row in await cur.fetchall()])
+            selected = "SELECT value FROM json_each(?)"
+            await conn.execute(
+                f"""
+                INSERT INTO {table}_archive ({columns})
+                SELECT {columns} FROM {table} WHERE id IN ({selected})
+                """,
+                (ids,),
+            )
+            if table == "orders":
+                await conn.execute(
+                    f"""
+                    INSERT INTO product_units_archive ({_UNIT_COLUMNS})
+                    SELECT {_UNIT_COLUMNS} FROM product_units WHERE order_id IN ({selected})
+                    """,
+                    (ids,),
+                )
+                await conn.execute(
+                    f"DELETE FROM product_units WHERE order_id IN ({selected})", (ids,)
+                )
+            cur = await conn.execute(f"DELETE FROM {table} WHERE id IN ({selected})", (ids,))
+            return cur.rowcount
+
+    async def insert_audit_entries(self, rows: list[tuple]) -> int:
+        """rows: (admin_id, action, target_type, target_id, before_value, after_value, created_at)."""
+        async with self.transaction() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO admin_audit
+                (admin_id, action, target_type, target_id, before_value, after_value, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+        return len(rows)
+
+    async def list_audit(
+        self,
+        admin_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        limit: int = 20,
+    ) -> list[aiosqlite.Row]:
         assert self.conn is not None
-        await self.conn.execute(
-            "UPDATE topups SET status = 'paid', paid_at = ? WHERE id = ?",
-            (utc_now(), topup_id),
+        if admin_id is not None:
+            where, params = "admin_id = ?", (admin_id,)
+        elif user_id is not None:
+            where, params = "target_type = 'user' AND target_id = ?", (user_id,)
+        else:
+            where, params = "1", ()
+        cur = await self.conn.execute(
+            f"SELECT * FROM admin_audit WHERE {where} ORDER BY id DESC LIMIT ?",
+            (*params, limit),
         )
-        await self.conn.commit()
+        return await cur.fetchall()
 
-    async def list_user_topups(self, user_id: int, limit: int = 10) -> list[aiosqlite.Row]:
+    async def sum_daily_stats(self, since_day: str) -> aiosqlite.Row:
         assert self.conn is not None
         cur = await self.conn.execute(
-            "SELECT * FROM topups WHERE user_id = ? ORDER BY id DESC LIMIT ?",
-            (user_id, limit),
+            """
+            SELECT
+                COALESCE(SUM(orders_created), 0) AS orders_created,
+                COALESCE(SUM(orders_paid), 0) AS orders_paid,
+                COALESCE(SUM(revenue_cents), 0) AS revenue_cents,
+                COALESCE(SUM(topups_created), 0) AS topups_created,
+                COALESCE(SUM(topups_paid), 0) AS topups_paid,
+                COALESCE(SUM(topup_cents), 0) AS topup_cents
+            FROM daily_stats
+            WHERE day >= ?
+            """,
+            (since_day,),
+        )
+        return await cur.fetchone()
+
+    async def top_products(self, since_day: str, limit: int = 5) -> list[aiosqlite.Row]:
+        assert self.conn is not None
+        cur = await self.conn.execute(
+            """
+            SELECT s.product_id, p.title, SUM(s.sold) AS sold, SUM(s.revenue_cents) AS revenue_cents
+            FROM daily_product_stats s
+            JOIN products p ON p.id = s.product_id
+            WHERE s.day >= ?
+            GROUP BY s.product_id
+            ORDER BY revenue_cents DESC, sold DESC
+            LIMIT ?
+            """,
+            (since_day, limit),
         )
         return await cur.fetchall()
 
-    async def count_orders(self, user_id: int) -> int:
+    async def count_pending_orders(self) -> int:
         assert self.conn is not None
         cur = await self.conn.execute(
-            "SELECT COUNT(1) AS cnt FROM orders WHERE user_id = ? AND status = 'paid'",
-            (user_id,),
+            "SELECT COUNT(1) AS cnt FROM orders WHERE status = 'pending'"
         )
         row = await cur.fetchone()
         return int(row["cnt"]) if row else 0
+
+    async def rebuild_daily_stats(self) -> int:
+        async with self.transaction() as conn:
+            for statement in _REBUILD_DAILY_STATS:
+                await conn.execute(statement)
+            cur = await conn.execute("SELECT COUNT(1) AS cnt FROM daily_stats")
+            row = await cur.fetchone()
+        return int(row["cnt"])
@@ -1,3 +1,3 @@
-﻿from . import common, user, admin
+﻿from . import common, user, cart, admin, inline
 
-__all__ = ["common", "user", "admin"]
+__all__ = ["common", "user", "cart", "admin", "inline"]
@@ -1,11 +1,16 @@
-from aiogram import Router, F
+import logging
+from tempfile import SpooledTemporaryFile
+
+from aiogram import Bot, Router, F
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
 from aiogram.exceptions import TelegramBadRequest
 
 from config import Config
-from db import Database
+from db import Database, utc_today
+from models import Product
 from keyboards.reply import admin_menu, cancel_menu
 from keyboards.inline import (
     admin_product_kb,
@@ -15,12 +20,27 @@ from keyboards.inline import (
     admin_user_search_results_kb,
     admin_user_orders_kb,
 )
-from utils.formatters import parse_amount_to_cents, format_product, cents_to_amount
-from utils.callbacks import AdminProductCb, AdminUserPageCb, AdminUserActionCb
+from utils.formatters import parse_amount_to_cents, format_product, cents_to_amount, escape
+from utils.categories import CategoryTree
+from utils.callbacks import AdminProductCb, AdminUserPageCb, AdminUserActionCb, BroadcastCb
+from utils.i18n import MenuButton, Translator
 from utils import texts
+from services.audit import AuditLog
+from services.backup import Backups
+from services.broadcast import Broadcaster
+from services.catalog_io import export_products, import_format, import_products
+from services.exports import EXPORTS, SPOOL_SIZE, SpooledInputFile, export_table
+from services.sender import bulk_sends
+
+logger = logging.getLogger(__name__)
 
 router = Router()
 
+# Bot API refuses to hand out files larger than this.
+MAX_IMPORT_SIZE = 20 * 1024 * 1024
+# (period, first day as days before today) for the statistics screen.
+STATS_PERIODS = (("today", 0), ("week", 6), ("month", 29))
+
 
 class AddProduct(StatesGroup):
     title = State()
@@ -42,11 +62,27 @@ class AdminUserBalance(StatesGroup):
     amount = State()
 
 
+class AdminBroadcast(StatesGroup):
+    text = State()
+
+
+class ImportProducts(StatesGroup):
+    file = State()
+
+
 def _is_admin(message: Message, config: Config) -> bool:
     user = message.from_user
     return bool(user and config.is_admin(user.id))
 
 
+def _admin_product_text(i18n: Translator, product: Product, is_active: bool) -> str:
+    status = i18n("admin.product.active" if is_active else "admin.product.inactive")
+    text = format_product(product, i18n) + "\n" + i18n("admin.product.status", status=status)
+    if product.stock is not None:
+        text += "\n" + i18n("admin.product.stock", count=product.stock)
+    return text
+
+
 async def _edit_or_send(message: Message, text: str, reply_markup=None) -> None:
     try:
         await message.edit_text(text, reply_markup=reply_markup)
@@ -54,60 +90,72 @@ async def _edit_or_send(message: Message, text: str, reply_markup=None) -> None:
         await message.answer(text, reply_markup=reply_markup)
 
 
-@router.message(F.text.in_(["✖️ Отмена", "Отмена"]))
-async def admin_cancel(message: Message, state: FSMContext, config: Config) -> None:
+@router.message(MenuButton("cancel"))
+async def admin_cancel(
+    message: Message, state: FSMContext, config: Config, i18n: Translator
+) -> None:
     if not _is_admin(message, config):
-        await message.answer("⛔ Доступ запрещен")
+        await message.answer(i18n("admin.access_denied"))
         return
     await state.clear()
-    await message.answer("✅ Действие отменено.", reply_markup=admin_menu())
+    await message.answer(i18n("admin.cancelled"), reply_markup=admin_menu(i18n))
 
 
-@router.message(F.text.in_(["🛠️ Админ панель", "Админ панель"]))
-async def admin_panel(message: Message, config: Config) -> None:
+@router.message(MenuButton("admin"))
+async def admin_panel(message: Message, config: Config, i18n: Translator) -> None:
     if not _is_admin(message, config):
-        await message.answer("Доступ запрещен")
+        await message.answer(i18n("admin.access_denied"))
         return
-    await message.answer(texts.admin_menu_text(), reply_markup=admin_menu())
+    await message.answer(texts.admin_menu_text(i18n), reply_markup=admin_menu(i18n))
 
 
-@router.message(F.text.in_(["➕ Добавить товар", "Добавить товар"]))
-async def add_product_start(message: Message, state: FSMContext, config: Config) -> None:
+@router.message(MenuButton("add_product"))
+async def add_product_start(
+    message: Message, state: FSMContext, config: Config, i18n: Translator
+) -> None:
     if not _is_admin(message, config):
-        await message.answer("Доступ запрещен")
+        await message.answer(i18n("admin.access_denied"))
         return
     await state.set_state(AddProduct.title)
-    await message.answer("Введите название товара:", reply_markup=cancel_menu())
+    await message.answer(i18n("admin.product.title_prompt"), reply_markup=cancel_menu(i18n))
 
 
 @router.message(AddProduct.title)
-async def add_product_title(message: Message, state: FSMContext) -> None:
+async def add_product_title(message: Message, state: FSMContext, i18n: Translator) -> None:
     await state.update_data(title=message.text.strip())
     await state.set_state(AddProduct.description)
-    await message.answer("Введите описание товара:", reply_markup=cancel_menu())
+    await message.answer(
+        i18n("admin.product.description_prompt"), reply_markup=cancel_menu(i18n)
+    )
 
 
 @router.message(AddProduct.description)
-async def add_product_description(message: Message, state: FSMContext) -> None:
+async def add_product_description(
+    message: Message, state: FSMContext, i18n: Translator
+) -> None:
     await state.update_data(description=message.text.strip())
     await state.set_state(AddProduct.price)
-    await message.answer("Введите цену (например 9.99):", reply_markup=cancel_menu())
+    await message.answer(i18n("admin.product.price_prompt"), reply_markup=cancel_menu(i18n))
 
 
 @router.message(AddProduct.price)
-async def add_product_price(message: Message, state: FSMContext) -> None:
+async def add_product_price(message: Message, state: FSMContext, i18n: Translator) -> None:
     try:
         price_cents = parse_amount_to_cents(message.text)
     except ValueError:
-        await message.answer("Не понял цену. Пример: 9.99")
+        await message.answer(i18n("admin.product.bad_price"))
         return
     await state.update_data(price_cents=price_cents)
     await state.set_state(AddProduct.content)
-    await message.answer("Введите контент товара (что получит покупатель):", reply_markup=cancel_menu())
+    await message.answer(
+        i18n("admin.product.content_prompt"), reply_markup=cancel_menu(i18n)
+    )
 
 
 @router.message(AddProduct.content)
-async def add_product_content(message: Message, state: FSMContext, db: Database) -> None:
+async def add_product_content(
+    message: Message, state: FSMContext, db: Database, i18n: Translator
+) -> None:
     data = await state.get_data()
     title = data.get("title", "")
     description = data.get("description", "")
@@ -117,141 +165,172 @@ async def add_product_content(message: Message, state: FSMContext, db: Database)
     await db.create_product(title, description, price_cents, content)
     await state.clear()
     await message.answer(
-        f"Товар добавлен. Цена: {cents_to_amount(price_cents)} USDT",
-        reply_markup=admin_menu(),
+        i18n("admin.product.created", price=cents_to_amount(price_cents)),
+        reply_markup=admin_menu(i18n),
     )
 
 
-@router.message(F.text.in_(["📦 Товары", "Товары"]))
-async def admin_products(message: Message, db: Database, config: Config) -> None:
+@router.message(MenuButton("products"))
+async def admin_products(
+    message: Message, db: Database, config: Config, i18n: Translator
+) -> None:
     if not _is_admin(message, config):
-        await message.answer("Доступ запрещен")
+        await message.answer(i18n("admin.access_denied"))
         return
     products = await db.list_all_products()
     if not products:
-        await message.answer("Товаров пока нет.")
+        await message.answer(i18n("admin.product.empty"))
         return
-    await message.answer("<b>Товары</b>")
-    for product in products:
-        status = "активен" if product["is_active"] else "выключен"
-        text = format_product(product) + f"\nСтатус: <b>{status}</b>"
-        await message.answer(text, reply_markup=admin_product_kb(product["id"], bool(product["is_active"])))
+    await message.answer(i18n("admin.product.list_title"))
+    with bulk_sends():
+        for product in products:
+            is_active = product.is_active
+            await message.answer(
+                _admin_product_text(i18n, product, is_active),
+                reply_markup=admin_product_kb(i18n, product.id, is_active),
+            )
 
 
 @router.callback_query(AdminProductCb.filter())
 async def admin_product_toggle(
-    callback: CallbackQuery, callback_data: AdminProductCb, db: Database, config: Config
+    callback: CallbackQuery,
+    callback_data: AdminProductCb,
+    db: Database,
+    config: Config,
+    audit: AuditLog,
+    i18n: Translator,
 ) -> None:
     if not config.is_admin(callback.from_user.id):
-        await callback.answer("Доступ запрещен", show_alert=True)
+        await callback.answer(i18n("admin.access_denied"), show_alert=True)
         return
     product = await db.get_product(callback_data.product_id)
     if not product:
-        await callback.answer("Товар не найден", show_alert=True)
+        await callback.answer(i18n("admin.product.not_found"), show_alert=True)
         return
-    new_active = not bool(product["is_active"])
-    await db.toggle_product(product["id"], new_active)
-    status = "активен" if new_active else "выключен"
-    text = format_product(product) + f"\nСтатус: <b>{status}</b>"
+    new_active = not product.is_active
+    await db.toggle_product(product.id, new_active)
+    audit.record(
+        callback.from_user.id,
+        "product_toggle",
+        "product",
+        product.id,
+        {"is_active": product.is_active},
+        {"is_active": new_active},
+    )
     await callback.message.edit_text(
-        text, reply_markup=admin_product_kb(product["id"], new_active)
+        _admin_product_text(i18n, product, new_active),
+        reply_markup=admin_product_kb(i18n, product.id, new_active),
     )
-    await callback.answer("Готово")
+    await callback.answer(i18n("common.done"))
 
 
-@router.message(F.text.in_(["🧾 Заказы", "Заказы"]))
-async def admin_orders(message: Message, db: Database, config: Config) -> None:
+@router.message(MenuButton("orders"))
+async def admin_orders(message: Message, db: Database, config: Config, i18n: Translator) -> None:
     if not _is_admin(message, config):
-        await message.answer("Доступ запрещен")
+        await message.answer(i18n("admin.access_denied"))
         return
     orders = await db.list_recent_orders(limit=20)
     if not orders:
-        await message.answer("Заказов пока нет.")
+        await message.answer(i18n("admin.orders.empty"))
         return
-    lines = ["<b>Последние заказы</b>"]
-    for order in orders:
-        status = "оплачено" if order["status"] == "paid" else "ожидает"
-        amount = cents_to_amount(int(order["amount_cents"]))
-        lines.append(
-            f"#{order['id']} - {order['title']} - {amount} USDT - {status} (user {order['user_id']})"
-        )
+    lines = [i18n("admin.orders.title")]
+    lines.extend(texts.admin_order_line_text(i18n, order, with_user=True) for order in orders)
     await message.answer("\n".join(lines))
 
 
-@router.message(F.text.in_(["💰 Начислить баланс", "Начислить баланс"]))
-async def admin_topup_start(message: Message, state: FSMContext, config: Config) -> None:
+@router.message(MenuButton("topup"))
+async def admin_topup_start(
+    message: Message, state: FSMContext, config: Config, i18n: Translator
+) -> None:
     if not _is_admin(message, config):
-        await message.answer("Доступ запрещен")
+        await message.answer(i18n("admin.access_denied"))
         return
     await state.set_state(AdminTopup.user_id)
-    await message.answer("Введите ID пользователя:", reply_markup=cancel_menu())
+    await message.answer(i18n("admin.topup.user_prompt"), reply_markup=cancel_menu(i18n))
 
 
 @router.message(AdminTopup.user_id)
-async def admin_topup_user(message: Message, state: FSMContext) -> None:
+async def admin_topup_user(message: Message, state: FSMContext, i18n: Translator) -> None:
     try:
         user_id = int(message.text.strip())
     except ValueError:
-        await message.answer("ID должен быть числом.")
+        await message.answer(i18n("admin.topup.bad_user_id"))
         return
     await state.update_data(user_id=user_id)
     await state.set_state(AdminTopup.amount)
-    await message.answer("Введите сумму (например 5 или 12.5):", reply_markup=cancel_menu())
+    await message.answer(i18n("admin.topup.amount_prompt"), reply_markup=cancel_menu(i18n))
 
 
 @router.message(AdminTopup.amount)
-async def admin_topup_amount(message: Message, state: FSMContext, db: Database) -> None:
+async def admin_topup_amount(
+    message: Message, state: FSMContext, db: Database, audit: AuditLog, i18n: Translator
+) -> None:
     try:
         amount_cents = parse_amount_to_cents(message.text)
     except ValueError:
-        await message.answer("Не понял сумму. Пример: 10 или 10.50")
+        await message.answer(i18n("admin.topup.bad_amount"))
         return
     data = await state.get_data()
     user_id = int(data.get("user_id"))
     await db.add_or_update_user(user_id, "", "")
-    await db.update_balance(user_id, amount_cents)
+    balance = await db.update_balance(
+        user_id, amount_cents, "admin_add", actor_id=message.from_user.id
+    )
+    audit.record(
+        message.from_user.id, "topup_manual", "user", user_id, balance - amount_cents, balance
+    )
     await state.clear()
     await message.answer(
-        f"Баланс пользователя {user_id} пополнен на {cents_to_amount(amount_cents)} USDT.",
-        reply_markup=admin_menu(),
+        i18n("admin.topup.done", user_id=user_id, amount=cents_to_amount(amount_cents)),
+        reply_markup=admin_menu(i18n),
     )
 
 
-@router.message(F.text.in_(["👥 Пользователи", "Пользователи"]))
-async def admin_users_menu(message: Message, db: Database, config: Config) -> None:
+@router.message(MenuButton("users"))
+async def admin_users_menu(
+    message: Message, db: Database, config: Config, i18n: Translator
+) -> None:
     if not _is_admin(message, config):
-        await message.answer("Доступ запрещен")
+        await message.answer(i18n("admin.access_denied"))
         return
     total = await db.count_users()
-    await message.answer(texts.admin_users_menu_text(total), reply_markup=admin_users_menu_kb())
+    await message.answer(
+        texts.admin_users_menu_text(i18n, total), reply_markup=admin_users_menu_kb(i18n)
+    )
 
 
 @router.callback_query(F.data == "admin_users_back")
-async def admin_users_back(callback: CallbackQuery, config: Config) -> None:
+async def admin_users_back(callback: CallbackQuery, config: Config, i18n: Translator) -> None:
     if not config.is_admin(callback.from_user.id):
-        await callback.answer("Доступ запрещен", show_alert=True)
+        await callback.answer(i18n("admin.access_denied"), show_alert=True)
         return
-    await callback.message.answer(texts.admin_menu_text(), reply_markup=admin_menu())
+    await callback.message.answer(texts.admin_menu_text(i18n), reply_markup=admin_menu(i18n))
     await callback.answer()
 
 
 @router.callback_query(F.data == "admin_users_search")
-async def admin_users_search(callback: CallbackQuery, state: FSMContext, config: Config) -> None:
+async def admin_users_search(
+    callback: CallbackQuery, state: FSMContext, config: Config, i18n: Translator
+) -> None:
     if not config.is_admin(callback.from_user.id):
-        await callback.answer("Доступ запрещен", show_alert=True)
+        await callback.answer(i18n("admin.access_denied"), show_alert=True)
         return
     await state.set_state(AdminUserSearch.query)
-    await callback.message.answer("Введите ID или @username:", reply_markup=cancel_menu())
+    await callback.message.answer(
+        i18n("admin.users.search_prompt"), reply_markup=cancel_menu(i18n)
+    )
     await callback.answer()
 
 
 @router.message(AdminUserSearch.query)
-async def admin_users_search_query(message: Message, state: FSMContext, db: Database) -> None:
+async def admin_users_search_query(
+    message: Message, state: FSMContext, db: Database, i18n: Translator
+) -> None:
     query = (message.text or "").strip()
     await state.clear()
 
     if not query:
-        await message.answer("Пустой запрос.", reply_markup=admin_menu())
+        await message.answer(i18n("admin.users.empty_query"), reply_markup=admin_menu(i18n))
         return
 
     if query.startswith("@"):
@@ -259,35 +338,39 @@ async def admin_users_search_query(message: Message, state: FSMContext, db: Data
 
     if query.isdigit():
         user = await db.get_user(int(query))
-        await message.answer("Готово.", reply_markup=admin_menu())
+        await message.answer(i18n("admin.done"), reply_markup=admin_menu(i18n))
         if not user:
-            await message.answer("Пользователь не найден.")
+            await message.answer(i18n("admin.users.not_found"))
             return
-        order_count = await db.count_orders(user["id"])
+        order_count = await db.count_orders(user.id)
         await message.answer(
-            texts.admin_user_card_text(user, order_count),
-            reply_markup=admin_user_card_kb(int(user["id"]), 0),
+            texts.admin_user_card_text(i18n, user, order_count),
+            reply_markup=admin_user_card_kb(i18n, user.id, 0),
         )
         return
 
     users = await db.search_users(query, limit=10)
-    await message.answer("Готово.", reply_markup=admin_menu())
+    await message.answer(i18n("admin.done"), reply_markup=admin_menu(i18n))
     if not users:
-        await message.answer("Пользователи не найдены.")
+        await message.answer(i18n("admin.users.none_found"))
         return
 
     await message.answer(
-        f"Найдено: {len(users)}",
-        reply_markup=admin_user_search_results_kb(users),
+        i18n("admin.users.found", count=len(users)),
+        reply_markup=admin_user_search_results_kb(i18n, users),
     )
 
 
 @router.callback_query(AdminUserPageCb.filter())
 async def admin_users_list(
-    callback: CallbackQuery, callback_data: AdminUserPageCb, db: Database, config: Config
+    callback: CallbackQuery,
+    callback_data: AdminUserPageCb,
+    db: Database,
+    config: Config,
+    i18n: Translator,
 ) -> None:
     if not config.is_admin(callback.from_user.id):
-        await callback.answer("Доступ запрещен", show_alert=True)
+        await callback.answer(i18n("admin.access_denied"), show_alert=True)
         return
     page = max(0, int(callback_data.page))
     limit = 8
@@ -298,38 +381,37 @@ async def admin_users_list(
     total = await db.count_users()
 
     if not users:
-        await _edit_or_send(callback.message, "Пользователей пока нет.")
+        await _edit_or_send(callback.message, i18n("admin.users.empty"))
         await callback.answer()
         return
 
-    text = (
-        "<b>Пользователи</b>\n"
-        f"Всего: <b>{total}</b>\n"
-        f"Страница: <b>{page + 1}</b>\n"
-        "Выберите пользователя:"
-    )
+    text = i18n("admin.users.page", total=total, page=page + 1)
     await _edit_or_send(
-        callback.message, text, reply_markup=admin_users_list_kb(users, page, has_more)
+        callback.message, text, reply_markup=admin_users_list_kb(i18n, users, page, has_more)
     )
     await callback.answer()
 
 
 @router.callback_query(AdminUserActionCb.filter(F.action == "view"))
 async def admin_user_view(
-    callback: CallbackQuery, callback_data: AdminUserActionCb, db: Database, config: Config
+    callback: CallbackQuery,
+    callback_data: AdminUserActionCb,
+    db: Database,
+    config: Config,
+    i18n: Translator,
 ) -> None:
     if not config.is_admin(callback.from_user.id):
-        await callback.answer("Доступ запрещен", show_alert=True)
+        await callback.answer(i18n("admin.access_denied"), show_alert=True)
         return
     user = await db.get_user(callback_data.user_id)
     if not user:
-        await callback.answer("Пользователь не найден", show_alert=True)
+        await callback.answer(i18n("admin.users.user_not_found"), show_alert=True)
         return
-    order_count = await db.count_orders(user["id"])
+    order_count = await db.count_orders(user.id)
     await _edit_or_send(
         callback.message,
-        texts.admin_user_card_text(user, order_count),
-        reply_markup=admin_user_card_kb(int(user["id"]), int(callback_data.page)),
+        texts.admin_user_card_text(i18n, user, order_count),
+        reply_markup=admin_user_card_kb(i18n, user.id, int(callback_data.page)),
     )
     await callback.answer()
 
@@ -340,34 +422,40 @@ async def admin_user_view(
     )
 )
 async def admin_user_balance_start(
-    callback: CallbackQuery, callback_data: AdminUserActionCb, state: FSMContext, config: Config
+    callback: CallbackQuery,
+    callback_data: AdminUserActionCb,
+    state: FSMContext,
+    config: Config,
+    i18n: Translator,
 ) -> None:
     if not config.is_admin(callback.from_user.id):
-        await callback.answer("Доступ запрещен", show_alert=True)
+        await callback.answer(i18n("admin.access_denied"), show_alert=True)
         return
     await state.set_state(AdminUserBalance.amount)
     await state.update_data(
         user_id=callback_data.user_id, mode=callback_data.action, page=callback_data.page
     )
     if callback_data.action == "balance_add":
-        prompt = "Введите сумму пополнения:"
+        prompt = i18n("admin.balance.add_prompt")
     elif callback_data.action == "balance_sub":
-        prompt = "Введите сумму списания:"
+        prompt = i18n("admin.balance.sub_prompt")
     else:
-        prompt = "Введите сумму баланса, которую нужно установить:"
-    await callback.message.answer(prompt, reply_markup=cancel_menu())
+        prompt = i18n("admin.balance.set_prompt")
+    await callback.message.answer(prompt, reply_markup=cancel_menu(i18n))
     await callback.answer()
 
 
 @router.message(AdminUserBalance.amount)
-async def admin_user_balance_apply(message: Message, state: FSMContext, db: Database) -> None:
+async def admin_user_balance_apply(
+    message: Message, state: FSMContext, db: Database, audit: AuditLog, i18n: Translator
+) -> None:
     data = await state.get_data()
     await state.clear()
 
     try:
         amount_cents = parse_amount_to_cents(message.text or "")
     except ValueError:
-        await message.answer("Не понял сумму. Пример: 10 или 10.50", reply_markup=admin_menu())
+        await message.answer(i18n("admin.topup.bad_amount"), reply_markup=admin_menu(i18n))
         return
 
     user_id = int(data.get("user_id", 0))
@@ -379,59 +467,357 @@ async def admin_user_balance_apply(message: Message, state: FSMContext, db: Data
         await db.add_or_update_user(user_id, "", "")
         user = await db.get_user(user_id)
         if not user:
-            await message.answer("Пользователь не найден.", reply_markup=admin_menu())
+            await message.answer(i18n("admin.users.not_found"), reply_markup=admin_menu(i18n))
             return
 
+    admin_id = message.from_user.id
     if mode == "balance_add":
-        await db.update_balance(user_id, amount_cents)
-        result_text = f"Баланс пополнен на {cents_to_amount(amount_cents)} USDT."
+        after = await db.update_balance(user_id, amount_cents, "admin_add", actor_id=admin_id)
+        before = after - amount_cents
+        result_text = i18n("admin.balance.added", amount=cents_to_amount(amount_cents))
     elif mode == "balance_sub":
-        await db.update_balance(user_id, -amount_cents)
-        result_text = f"С баланса списано {cents_to_amount(amount_cents)} USDT."
+        after = await db.update_balance(user_id, -amount_cents, "admin_sub", actor_id=admin_id)
+        before = after + amount_cents
+        result_text = i18n("admin.balance.subtracted", amount=cents_to_amount(amount_cents))
     elif mode == "balance_set":
-        await db.set_balance(user_id, amount_cents)
-        result_text = f"Баланс установлен: {cents_to_amount(amount_cents)} USDT."
+        before = await db.set_balance(user_id, amount_cents, actor_id=admin_id)
+        after = amount_cents
+        result_text = i18n("admin.balance.set", amount=cents_to_amount(amount_cents))
     else:
-        await message.answer("Неизвестная операция.", reply_markup=admin_menu())
+        await message.answer(i18n("admin.balance.unknown"), reply_markup=admin_menu(i18n))
         return
+    audit.record(admin_id, mode, "user", user_id, before, after)
 
-    await message.answer(result_text, reply_markup=admin_menu())
+    await message.answer(result_text, reply_markup=admin_menu(i18n))
     user = await db.get_user(user_id)
     order_count = await db.count_orders(user_id)
     await message.answer(
-        texts.admin_user_card_text(user, order_count),
-        reply_markup=admin_user_card_kb(user_id, page),
+        texts.admin_user_card_text(i18n, user, order_count),
+        reply_markup=admin_user_card_kb(i18n, user_id, page),
     )
 
 
 @router.callback_query(AdminUserActionCb.filter(F.action == "orders"))
 async def admin_user_orders(
-    callback: CallbackQuery, callback_data: AdminUserActionCb, db: Database, config: Config
+    callback: CallbackQuery,
+    callback_data: AdminUserActionCb,
+    db: Database,
+    config: Config,
+    i18n: Translator,
 ) -> None:
     if not config.is_admin(callback.from_user.id):
-        await callback.answer("Доступ запрещен", show_alert=True)
+        await callback.answer(i18n("admin.access_denied"), show_alert=True)
         return
     orders = await db.list_user_orders(callback_data.user_id, limit=10)
+    markup = admin_user_orders_kb(i18n, callback_data.user_id, callback_data.page)
     if not orders:
-        await _edit_or_send(
-            callback.message,
-            "У пользователя пока нет покупок.",
-            reply_markup=admin_user_orders_kb(callback_data.user_id, callback_data.page),
-        )
+        await _edit_or_send(callback.message, i18n("admin.orders.user_empty"), reply_markup=markup)
         await callback.answer()
         return
 
-    lines = ["<b>Покупки пользователя</b>"]
-    for order in orders:
-        status = "оплачено" if order["status"] == "paid" else "ожидает"
-        amount = cents_to_amount(int(order["amount_cents"]))
-        lines.append(f"#{order['id']} - {order['title']} - {amount} USDT - {status}")
+    lines = [i18n("admin.orders.user_title")]
+    lines.extend(texts.admin_order_line_text(i18n, order) for order in orders)
+    await _edit_or_send(callback.message, "\n".join(lines), reply_markup=markup)
+    await callback.answer()
 
-    await _edit_or_send(
-        callback.message,
-        "\n".join(lines),
-        reply_markup=admin_user_orders_kb(callback_data.user_id, callback_data.page),
+
+@router.message(MenuButton("broadcast"))
+async def admin_broadcast_start(
+    message: Message, state: FSMContext, config: Config, i18n: Translator
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    await state.set_state(AdminBroadcast.text)
+    await message.answer(i18n("broadcast.prompt"), reply_markup=cancel_menu(i18n))
+
+
+@router.message(AdminBroadcast.text)
+async def admin_broadcast_text(
+    message: Message, state: FSMContext, broadcaster: Broadcaster, i18n: Translator
+) -> None:
+    if not message.text:
+        await message.answer(i18n("broadcast.need_text"))
+        return
+    await state.clear()
+    await message.answer(i18n("broadcast.started"), reply_markup=admin_menu(i18n))
+    await broadcaster.start(message.from_user.id, message.chat.id, message.html_text)
+
+
+@router.callback_query(BroadcastCb.filter(F.action == "cancel"))
+async def admin_broadcast_cancel(
+    callback: CallbackQuery,
+    callback_data: BroadcastCb,
+    config: Config,
+    broadcaster: Broadcaster,
+    i18n: Translator,
+) -> None:
+    if not config.is_admin(callback.from_user.id):
+        await callback.answer(i18n("admin.access_denied"), show_alert=True)
+        return
+    await broadcaster.cancel(callback_data.broadcast_id)
+    await callback.answer(i18n("broadcast.stopping"))
+
+
+@router.message(Command("categories"))
+async def admin_categories(
+    message: Message, db: Database, config: Config, i18n: Translator
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    tree = CategoryTree(await db.list_categories(), await db.count_active_products_by_category())
+    if not tree.categories:
+        await message.answer(i18n("admin.categories.empty"))
+        return
+    lines = [i18n("admin.categories.list_title")]
+    for depth, category_id in tree.walk():
+        lines.append(
+            i18n(
+                "admin.categories.line",
+                indent="  " * depth,
+                id=category_id,
+                title=escape(tree.title(category_id)),
+                count=tree.totals[category_id],
+            )
+        )
+    await message.answer("\n".join(lines))
+
+
+@router.message(Command("category_add"))
+async def admin_category_add(
+    message: Message, command: CommandObject, db: Database, config: Config, i18n: Translator
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    args = (command.args or "").strip()
+    parent_id = None
+    head, _, rest = args.partition(" ")
+    if head.isdigit() and rest.strip():
+        parent_id, args = int(head), rest.strip()
+    if not args:
+        await message.answer(i18n("admin.categories.add_usage"))
+        return
+    if parent_id is not None and not await db.get_category(parent_id):
+        await message.answer(i18n("admin.categories.parent_not_found", id=parent_id))
+        return
+    category_id = await db.create_category(args, parent_id)
+    await message.answer(i18n("admin.categories.created", id=category_id, title=escape(args)))
+
+
+@router.message(Command("product_category"))
+async def admin_product_category(
+    message: Message, command: CommandObject, db: Database, config: Config, i18n: Translator
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    parts = (command.args or "").split()
+    if len(parts) != 2 or not all(part.isdigit() for part in parts):
+        await message.answer(i18n("admin.categories.assign_usage"))
+        return
+    product_id, category_id = int(parts[0]), int(parts[1])
+    if not await db.get_product(product_id):
+        await message.answer(i18n("admin.categories.product_not_found", id=product_id))
+        return
+    if category_id and not await db.get_category(category_id):
+        await message.answer(i18n("admin.categories.not_found", id=category_id))
+        return
+    await db.set_product_category(product_id, category_id or None)
+    if category_id:
+        text = i18n("admin.categories.assigned", product_id=product_id, category_id=category_id)
+    else:
+        text = i18n("admin.categories.unassigned", product_id=product_id)
+    await message.answer(text)
+
+
+@router.message(Command("units_add"))
+async def admin_units_add(
+    message: Message, command: CommandObject, db: Database, config: Config, i18n: Translator
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    head, _, body = (command.args or "").partition("\n")
+    contents = [line.strip() for line in body.splitlines() if line.strip()]
+    if not head.strip().isdigit() or not contents:
+        await message.answer(i18n("admin.units.usage"))
+        return
+    product_id = int(head)
+    if not await db.get_product(product_id):
+        await message.answer(i18n("admin.units.product_not_found", id=product_id))
+        return
+    count = await db.add_product_units(product_id, contents)
+    product = await db.get_product(product_id)
+    await message.answer(
+        i18n("admin.units.added", id=product_id, count=count, stock=product.stock)
     )
-    await callback.answer()
 
 
+@router.message(Command("import_products"))
+async def admin_import_start(
+    message: Message, state: FSMContext, config: Config, i18n: Translator
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    await state.set_state(ImportProducts.file)
+    await message.answer(i18n("admin.import.prompt"), reply_markup=cancel_menu(i18n))
+
+
+@router.message(ImportProducts.file)
+async def admin_import_file(
+    message: Message, state: FSMContext, bot: Bot, db: Database, i18n: Translator
+) -> None:
+    document = message.document
+    fmt = import_format(document.file_name) if document else None
+    if fmt is None:
+        await message.answer(i18n("admin.import.need_file"))
+        return
+    if (document.file_size or 0) > MAX_IMPORT_SIZE:
+        await message.answer(i18n("admin.import.too_large"))
+        return
+    await state.clear()
+    await message.answer(i18n("admin.import.started"), reply_markup=admin_menu(i18n))
+
+    with SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+        await bot.download(document, destination=spool)
+        report = await import_products(db, spool, fmt)
+
+    lines = [i18n("admin.import.done", imported=report.imported, failed=report.failed)]
+    lines += [
+        i18n("admin.import.error_line", line=line, error=i18n(f"admin.import.errors.{code}"))
+        for line, code in report.errors
+    ]
+    if report.failed > len(report.errors):
+        lines.append(i18n("admin.import.more_errors", count=report.failed - len(report.errors)))
+    await message.answer("\n".join(lines))
+
+
+@router.message(Command("export_products"))
+async def admin_export_products(
+    message: Message, db: Database, config: Config, i18n: Translator
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    file, count = await export_products(db)
+    with file:
+        await message.answer_document(
+            SpooledInputFile(file, "products.csv"),
+            caption=i18n("admin.export.products", count=count),
+        )
+
+
+@router.message(Command("export"))
+async def admin_export(
+    message: Message, command: CommandObject, db: Database, config: Config, i18n: Translator
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    name = (command.args or "").strip().lower()
+    if name not in EXPORTS:
+        await message.answer(i18n("admin.export.usage"))
+        return
+    await message.answer(i18n("admin.export.started"))
+    file, count = await export_table(db, name)
+    with file:
+        await message.answer_document(
+            SpooledInputFile(file, f"{name}.csv"),
+            caption=i18n("admin.export.done", name=name, count=count),
+        )
+
+
+@router.message(MenuButton("stats"))
+async def admin_stats(message: Message, db: Database, config: Config, i18n: Translator) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    windows = [
+        (period, await db.sum_daily_stats(utc_today(days_ago)))
+        for period, days_ago in STATS_PERIODS
+    ]
+    top = await db.top_products(utc_today(STATS_PERIODS[-1][1]))
+    pending = await db.count_pending_orders()
+    await message.answer(texts.admin_stats_text(i18n, windows, pending, top))
+
+
+@router.message(Command("stats_rebuild"))
+async def admin_stats_rebuild(
+    message: Message, db: Database, config: Config, i18n: Translator
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    days = await db.rebuild_daily_stats()
+    await message.answer(i18n("admin.stats.rebuilt", days=days))
+
+
+@router.message(Command("ledger"))
+async def admin_ledger(
+    message: Message, command: CommandObject, db: Database, config: Config, i18n: Translator
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    raw = (command.args or "").strip()
+    if not raw.isdigit():
+        await message.answer(i18n("admin.ledger.usage"))
+        return
+    user_id = int(raw)
+    entries = await db.list_balance_ledger(user_id)
+    await message.answer(texts.admin_ledger_text(i18n, user_id, entries))
+
+
+@router.message(Command("audit"))
+async def admin_audit(
+    message: Message,
+    command: CommandObject,
+    db: Database,
+    config: Config,
+    audit: AuditLog,
+    i18n: Translator,
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    scope, _, raw_id = (command.args or "").strip().partition(" ")
+    raw_id = raw_id.strip()
+    if scope and (scope not in ("admin", "user") or not raw_id.isdigit()):
+        await message.answer(i18n("admin.audit.usage"))
+        return
+    # Show what this admin just did even if the writer has not flushed yet.
+    await audit.flush()
+    if scope == "admin":
+        entries = await db.list_audit(admin_id=int(raw_id))
+    elif scope == "user":
+        entries = await db.list_audit(user_id=int(raw_id))
+    else:
+        entries = await db.list_audit()
+    await message.answer(texts.admin_audit_text(i18n, entries))
+
+
+@router.message(Command("backup"))
+async def admin_backup(
+    message: Message, config: Config, backups: Backups, i18n: Translator
+) -> None:
+    if not _is_admin(message, config):
+        await message.answer(i18n("admin.access_denied"))
+        return
+    await message.answer(i18n("admin.backup.started"))
+    try:
+        result = await backups.create()
+    except Exception:
+        logger.exception("Backup requested by %d failed", message.from_user.id)
+        await message.answer(i18n("admin.backup.failed"))
+        return
+    await message.answer(
+        i18n(
+            "admin.backup.done",
+            name=result.path.name,
+            size=f"{result.size / (1024 * 1024):.1f}",
+            seconds=f"{result.seconds:.1f}",
+        )
+    )
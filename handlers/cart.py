@@ -0,0 +1,185 @@
+from aiogram import Router, F
+from aiogram.types import Message, CallbackQuery
+from aiogram.exceptions import TelegramBadRequest
+
+from config import Config
+from db import Database, OutOfStockError
+from crypto_pay import CryptoPayAPI, CryptoPayError
+from keyboards.inline import cart_kb, invoice_kb
+from services.inventory import RESERVATION_GRACE
+from utils.callbacks import CartCb
+from utils.formatters import cents_to_amount
+from utils.i18n import MenuButton, Translator
+from utils import texts
+
+router = Router()
+
+MAX_CART_QUANTITY = 10
+
+
+async def _render_cart(
+    message: Message, user_id: int, db: Database, i18n: Translator, edit: bool = False
+) -> None:
+    items = [item for item in await db.get_cart(user_id) if item["is_active"]]
+    if items:
+        text = texts.cart_text(i18n, items)
+        markup = cart_kb(i18n, [(int(item["product_id"]), item["title"]) for item in items])
+    else:
+        text, markup = i18n("cart.empty"), None
+    if edit:
+        try:
+            await message.edit_text(text, reply_markup=markup)
+            return
+        except TelegramBadRequest as exc:
+            if "message is not modified" in str(exc):
+                return
+    await message.answer(text, reply_markup=markup)
+
+
+async def _checkout_items(db: Database, user_id: int) -> tuple[list[tuple[int, int]], bool]:
+    cart = [item for item in await db.get_cart(user_id) if item["is_active"]]
+    items = [
+        (int(item["product_id"]), int(item["price_cents"]))
+        for item in cart
+        for _ in range(int(item["quantity"]))
+    ]
+    return items, any(item["stock"] is not None for item in cart)
+
+
+@router.message(MenuButton("cart"))
+async def show_cart(message: Message, db: Database, i18n: Translator) -> None:
+    await _render_cart(message, message.from_user.id, db, i18n)
+
+
+@router.callback_query(CartCb.filter(F.action == "view"))
+async def view_cart(callback: CallbackQuery, db: Database, i18n: Translator) -> None:
+    await _render_cart(callback.message, callback.from_user.id, db, i18n, edit=True)
+    await callback.answer()
+
+
+@router.callback_query(CartCb.filter(F.action == "add"))
+async def add_to_cart(
+    callback: CallbackQuery, callback_data: CartCb, db: Database, i18n: Translator
+) -> None:
+    product = await db.get_product(callback_data.product_id)
+    if not product or not product.is_active:
+        await callback.answer(i18n("catalog.unavailable"), show_alert=True)
+        return
+    limit = MAX_CART_QUANTITY
+    if product.stock is not None:
+        if product.stock <= 0:
+            await callback.answer(i18n("catalog.sold_out"), show_alert=True)
+            return
+        limit = min(limit, product.stock)
+    quantity = await db.add_to_cart(callback.from_user.id, product.id, limit)
+    if quantity is None:
+        await callback.answer(i18n("cart.limit", limit=limit), show_alert=True)
+        return
+    await callback.answer(i18n("cart.added", quantity=quantity))
+
+
+@router.callback_query(CartCb.filter(F.action == "remove"))
+async def remove_from_cart(
+    callback: CallbackQuery, callback_data: CartCb, db: Database, i18n: Translator
+) -> None:
+    await db.remove_from_cart(callback.from_user.id, callback_data.product_id)
+    await _render_cart(callback.message, callback.from_user.id, db, i18n, edit=True)
+    await callback.answer(i18n("cart.removed"))
+
+
+@router.callback_query(CartCb.filter(F.action == "clear"))
+async def clear_cart(callback: CallbackQuery, db: Database, i18n: Translator) -> None:
+    await db.clear_cart(callback.from_user.id)
+    await _render_cart(callback.message, callback.from_user.id, db, i18n, edit=True)
+    await callback.answer(i18n("cart.cleared"))
+
+
+@router.callback_query(CartCb.filter(F.action == "pay_crypto"), flags={"action_lock": "pay"})
+async def pay_cart_crypto(
+    callback: CallbackQuery,
+    db: Database,
+    config: Config,
+    crypto: CryptoPayAPI,
+    i18n: Translator,
+) -> None:
+    user_id = callback.from_user.id
+    items, tracked = await _checkout_items(db, user_id)
+    if not items:
+        await callback.answer(i18n("cart.empty"), show_alert=True)
+        return
+
+    total = sum(price for _, price in items)
+    description = i18n("payment.checkout_description", count=len(items))
+    try:
+        invoice = await crypto.create_invoice(
+            cents_to_amount(total),
+            description,
+            f"u{user_id}-cart",
+            config.reservation_ttl if tracked else None,
+        )
+    except CryptoPayError:
+        await callback.answer(i18n("payment.invoice_failed"), show_alert=True)
+        return
+
+    pay_url = invoice["pay_url"]
+    try:
+        checkout_id = await db.create_checkout(
+            user_id,
+            items,
+            str(invoice["invoice_id"]),
+            pay_url,
+            reservation_ttl=config.reservation_ttl + RESERVATION_GRACE,
+        )
+    except OutOfStockError:
+        await callback.answer(i18n("cart.out_of_stock"), show_alert=True)
+        return
+
+    text = i18n("payment.checkout_created", count=len(items), amount=cents_to_amount(total))
+    markup = invoice_kb(i18n, pay_url, "checkout", checkout_id)
+    try:
+        await callback.message.edit_text(text, reply_markup=markup)
+    except TelegramBadRequest:
+        await callback.message.answer(text, reply_markup=markup)
+    await callback.answer()
+
+
+@router.callback_query(CartCb.filter(F.action == "pay_balance"), flags={"action_lock": "pay"})
+async def pay_cart_balance(callback: CallbackQuery, db: Database, i18n: Translator) -> None:
+    user_id = callback.from_user.id
+    items, _ = await _checkout_items(db, user_id)
+    if not items:
+        await callback.answer(i18n("cart.empty"), show_alert=True)
+        return
+
+    user = await db.get_user(user_id)
+    if not user:
+        await callback.answer(i18n("payment.user_not_found"), show_alert=True)
+        return
+
+    total = sum(price for _, price in items)
+    try:
+        checkout_id = await db.checkout_with_balance(user_id, items)
+    except OutOfStockError:
+        await callback.answer(i18n("cart.out_of_stock"), show_alert=True)
+        return
+    if checkout_id is None:
+        user = await db.get_user(user_id)
+        await callback.message.answer(
+            texts.not_enough_balance_text(i18n, total, user.balance_cents)
+        )
+        await callback.answer()
+        return
+
+    user = await db.get_user(user_id)
+    header = i18n(
+        "payment.checkout_balance_paid", balance=cents_to_amount(user.balance_cents)
+    )
+    for chunk in texts.checkout_delivery_texts(
+        i18n, header, await db.list_checkout_items(checkout_id)
+    ):
+        await callback.message.answer(chunk)
+    try:
+        await callback.message.edit_reply_markup(reply_markup=None)
+    except TelegramBadRequest:
+        pass
+    await callback.answer(i18n("payment.paid"))
@@ -1,4 +1,4 @@
-from aiogram import Router, F
+from aiogram import Router
 from aiogram.filters import CommandStart, Command
 from aiogram.types import Message
 
@@ -6,30 +6,34 @@ from config import Config
 from db import Database
 from keyboards.reply import main_menu
 from utils import texts
+from utils.i18n import MenuButton, Translator
 
 router = Router()
 
 
 @router.message(CommandStart())
-async def cmd_start(message: Message, db: Database, config: Config) -> None:
+async def cmd_start(message: Message, db: Database, config: Config, i18n: Translator) -> None:
     user = message.from_user
     if not user:
         return
     await db.add_or_update_user(user.id, user.username or "", user.full_name)
     await message.answer(
-        texts.welcome_text(user.full_name), reply_markup=main_menu(config.is_admin(user.id))
+        texts.welcome_text(i18n, user.full_name),
+        reply_markup=main_menu(i18n, config.is_admin(user.id)),
     )
 
 
 @router.message(Command("help"))
-@router.message(F.text.in_(["ℹ️ Помощь", "Помощь"]))
-async def cmd_help(message: Message) -> None:
-    await message.answer(texts.help_text())
+@router.message(MenuButton("help"))
+async def cmd_help(message: Message, i18n: Translator) -> None:
+    await message.answer(texts.help_text(i18n))
 
 
-@router.message(F.text.in_(["⬅️ Назад", "Назад"]))
-async def back_to_main(message: Message, config: Config) -> None:
+@router.message(MenuButton("back"))
+async def back_to_main(message: Message, config: Config, i18n: Translator) -> None:
     user = message.from_user
     if not user:
         return
-    await message.answer("🏠 Главное меню", reply_markup=main_menu(config.is_admin(user.id)))
+    await message.answer(
+        i18n("common.main_menu"), reply_markup=main_menu(i18n, config.is_admin(user.id))
+    )
@@ -0,0 +1,95 @@
+from aiogram import Bot, Router, F
+from aiogram.filters import CommandStart, CommandObject
+from aiogram.types import (
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+    Message,
+)
+
+from config import Config
+from db import Database
+from models import Product
+from handlers.user import product_card
+from keyboards.inline import pay_methods_kb, product_link_kb
+from keyboards.reply import main_menu
+from utils.formatters import cents_to_amount, format_product
+from utils.i18n import Translator
+from utils.render_cache import RenderCache
+from utils import texts
+
+router = Router()
+
+INLINE_LIMIT = 20
+INLINE_CACHE_TIME = 120
+MAX_QUERY_LENGTH = 64
+PRODUCT_LINK = r"^p(\d+)$"
+
+inline_cache = RenderCache(maxsize=2048)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())[:MAX_QUERY_LENGTH]
+
+
+def _article(i18n: Translator, product: Product, bot_username: str) -> InlineQueryResultArticle:
+    url = f"https://t.me/{bot_username}?start=p{product.id}"
+    return InlineQueryResultArticle(
+        id=str(product.id),
+        title=product.title[:100],
+        description=i18n(
+            "inline.description",
+            price=cents_to_amount(product.price_cents),
+            description=product.description[:100],
+        ),
+        input_message_content=InputTextMessageContent(message_text=format_product(product, i18n)),
+        reply_markup=product_link_kb(i18n, url),
+    )
+
+
+async def inline_results(
+    db: Database, i18n: Translator, bot_username: str, query: str
+) -> list[InlineQueryResultArticle]:
+    version = db.catalog_version
+    key = (i18n.locale, normalize_query(query))
+    results = inline_cache.get(key, version)
+    if results is None:
+        products = await db.search_products(key[1], limit=INLINE_LIMIT)
+        results = [_article(i18n, product, bot_username) for product in products]
+        inline_cache.put(key, version, results)
+    return results
+
+
+@router.inline_query()
+async def inline_search(
+    inline_query: InlineQuery, bot: Bot, db: Database, i18n: Translator
+) -> None:
+    me = await bot.me()
+    results = await inline_results(db, i18n, me.username, inline_query.query)
+    await inline_query.answer(results, cache_time=INLINE_CACHE_TIME, is_personal=True)
+
+
+@router.message(CommandStart(deep_link=True, magic=F.args.regexp(PRODUCT_LINK)))
+async def start_product_link(
+    message: Message, command: CommandObject, db: Database, config: Config, i18n: Translator
+) -> None:
+    user = message.from_user
+    if not user:
+        return
+    is_new = await db.get_user(user.id) is None
+    await db.add_or_update_user(user.id, user.username or "", user.full_name)
+    if is_new:
+        await message.answer(
+            texts.welcome_text(i18n, user.full_name),
+            reply_markup=main_menu(i18n, config.is_admin(user.id)),
+        )
+
+    product_id = int(command.args[1:])
+    card = await product_card(db, i18n, product_id)
+    if card is None:
+        await message.answer(i18n("catalog.unavailable"))
+        return
+    await message.answer(
+        card + "\n\n" + i18n("catalog.choose_payment"),
+        reply_markup=pay_methods_kb(i18n, product_id),
+    )
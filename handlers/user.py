@@ -1,11 +1,15 @@
+from typing import Optional
+
 from aiogram import Router, F
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 
-from db import Database
+from config import Config
+from db import Database, OutOfStockError
 from crypto_pay import CryptoPayAPI, CryptoPayError
+from models import Product
 from keyboards.reply import cancel_menu
 from keyboards.inline import (
     product_buy_kb,
@@ -14,6 +18,7 @@ from keyboards.inline import (
     pay_methods_kb,
     invoice_kb,
     profile_kb,
+    my_orders_kb,
     topup_amounts_kb,
 )
 from utils.callbacks import (
@@ -23,16 +28,23 @@ from utils.callbacks import (
     PayCb,
     CheckCb,
     TopupCb,
+    OrdersPageCb,
 )
-from utils.formatters import format_product, cents_to_amount, parse_amount_to_cents
+from services.inventory import RESERVATION_GRACE
+from utils.formatters import format_product, cents_to_amount, escape, parse_amount_to_cents
+from utils.categories import ROOT, CategoryTree
+from utils.render_cache import RenderCache
+from utils.i18n import MenuButton, Translator
 from utils import texts
 
 router = Router()
 
-TOPUP_AMOUNTS = [5, 10, 20, 50, 100]
+TOPUP_AMOUNTS = (5, 10, 20, 50, 100)
 MIN_TOPUP_CENTS = 5
 CATALOG_PAGE_SIZE = 8
 
+catalog_cache = RenderCache(maxsize=1024)
+
 
 class TopupInput(StatesGroup):
     amount = State()
@@ -47,216 +59,312 @@ async def _safe_edit(message: Message, text: str, reply_markup=None) -> None:
         raise
 
 
+ORDERS_PAGE_SIZE = 10
+
+
 async def _render_my_orders(
-    message: Message, user_id: int, db: Database, edit: bool = False
+    message: Message,
+    user_id: int,
+    db: Database,
+    i18n: Translator,
+    edit: bool = False,
+    before_id: Optional[int] = None,
 ) -> None:
-    orders = await db.list_user_orders(user_id, limit=10)
+    # Keyset pages: older pages come from orders_archive once the hot table runs out.
+    orders = await db.list_user_orders(user_id, limit=ORDERS_PAGE_SIZE, before_id=before_id)
     if not orders:
-        text = "🧾 Покупок пока нет."
-        if edit:
-            await _safe_edit(message, text, reply_markup=profile_kb())
-        else:
-            await message.answer(text, reply_markup=profile_kb())
-        return
-
-    lines = ["🧾 <b>Мои покупки</b>"]
-    for order in orders:
-        status = "✅ оплачено" if order["status"] == "paid" else "⏳ ожидает"
-        amount = cents_to_amount(int(order["amount_cents"]))
-        lines.append(f"#{order['id']} - {order['title']} - {amount} USDT - {status}")
+        text = i18n("orders.empty")
+    else:
+        lines = [i18n("orders.title")]
+        lines.extend(texts.order_line_text(i18n, order) for order in orders)
+        text = "\n".join(lines)
+    older_than = orders[-1].id if len(orders) == ORDERS_PAGE_SIZE else None
+    markup = my_orders_kb(i18n, older_than)
 
-    text = "\n".join(lines)
     if edit:
-        await _safe_edit(message, text, reply_markup=profile_kb())
+        await _safe_edit(message, text, reply_markup=markup)
     else:
-        await message.answer(text, reply_markup=profile_kb())
+        await message.answer(text, reply_markup=markup)
 
 
-async def _show_catalog_page(
-    message: Message, db: Database, page: int, edit: bool = False
-) -> None:
-    page = max(0, page)
+async def _category_tree(db: Database) -> CategoryTree:
+    version = db.catalog_version
+    tree = catalog_cache.get(("tree",), version)
+    if tree is None:
+        tree = CategoryTree(
+            await db.list_categories(), await db.count_active_products_by_category()
+        )
+        catalog_cache.put(("tree",), version, tree)
+    return tree
+
+
+async def _render_catalog_page(
+    db: Database, i18n: Translator, page: int, category_id: int = ROOT
+) -> tuple[str, Optional[InlineKeyboardMarkup]]:
+    version = db.catalog_version
+    key = ("page", i18n.locale, category_id, page)
+    rendered = catalog_cache.get(key, version)
+    if rendered is not None:
+        return rendered
+
+    tree = await _category_tree(db)
+    if category_id not in tree:
+        category_id = ROOT
+    subcategories = tree.visible_children(category_id) if page == 0 else ()
+    parent_id = tree.parent(category_id)
+
     limit = CATALOG_PAGE_SIZE
     offset = page * limit
-    products = await db.list_active_products_paged(limit=limit + 1, offset=offset)
+    products = await db.list_category_products(
+        category_id or None, limit=limit + 1, offset=offset
+    )
     has_more = len(products) > limit
     products = products[:limit]
-    total = await db.count_active_products()
-
-    if not products:
-        text = "🛍️ Пока нет активных товаров."
-        if edit:
-            await _safe_edit(message, text)
-        else:
-            await message.answer(text)
-        return
 
-    text = (
-        "🛍️ <b>Каталог</b>\n"
-        f"Всего: <b>{total}</b>\n"
-        f"Страница: <b>{page + 1}</b>\n"
-        "Выберите товар:"
+    markup = catalog_list_kb(
+        i18n, products, page, has_more, category_id, subcategories, parent_id
     )
+    if not products and not subcategories:
+        rendered = (i18n("catalog.empty"), markup if parent_id is not None else None)
+    elif category_id == ROOT:
+        rendered = (i18n("catalog.page", total=tree.totals[ROOT], page=page + 1), markup)
+    else:
+        text = i18n(
+            "catalog.category_page",
+            title=escape(tree.title(category_id)),
+            total=tree.totals[category_id],
+            page=page + 1,
+        )
+        rendered = (text, markup)
+    catalog_cache.put(key, version, rendered)
+    return rendered
+
+
+async def product_card(db: Database, i18n: Translator, product_id: int) -> Optional[str]:
+    version = db.catalog_version
+    key = ("card", i18n.locale, product_id)
+    card = catalog_cache.get(key, version)
+    if card is None:
+        product = await db.get_product(product_id)
+        card = ""
+        if product and product.is_active:
+            card = format_product(product, i18n)
+            if product.stock is not None:
+                card += "\n" + _stock_line(i18n, product.stock)
+        catalog_cache.put(key, version, card)
+    return card or None
+
+
+def _stock_line(i18n: Translator, stock: int) -> str:
+    return i18n("catalog.stock", count=stock) if stock > 0 else i18n("catalog.sold_out")
 
+
+def _sold_out(product: Product) -> bool:
+    return product.stock is not None and product.stock <= 0
+
+
+async def _show_catalog_page(
+    message: Message,
+    db: Database,
+    i18n: Translator,
+    page: int,
+    category_id: int = ROOT,
+    edit: bool = False,
+) -> None:
+    text, markup = await _render_catalog_page(db, i18n, max(0, page), category_id)
     if edit:
-        await _safe_edit(message, text, reply_markup=catalog_list_kb(products, page, has_more))
+        await _safe_edit(message, text, reply_markup=markup)
     else:
-        await message.answer(text, reply_markup=catalog_list_kb(products, page, has_more))
+        await message.answer(text, reply_markup=markup)
 
 
-@router.message(F.text.in_(["🛍️ Каталог", "Каталог"]))
-async def show_catalog(message: Message, db: Database) -> None:
-    await _show_catalog_page(message, db, page=0, edit=False)
+@router.message(MenuButton("catalog"))
+async def show_catalog(message: Message, db: Database, i18n: Translator) -> None:
+    await _show_catalog_page(message, db, i18n, page=0, edit=False)
 
 
 @router.callback_query(CatalogPageCb.filter())
-async def catalog_page(callback: CallbackQuery, callback_data: CatalogPageCb, db: Database) -> None:
-    await _show_catalog_page(callback.message, db, page=callback_data.page, edit=True)
+async def catalog_page(
+    callback: CallbackQuery, callback_data: CatalogPageCb, db: Database, i18n: Translator
+) -> None:
+    await _show_catalog_page(
+        callback.message,
+        db,
+        i18n,
+        page=callback_data.page,
+        category_id=callback_data.category_id,
+        edit=True,
+    )
     await callback.answer()
 
 
 @router.callback_query(CatalogItemCb.filter())
 async def catalog_item_view(
-    callback: CallbackQuery, callback_data: CatalogItemCb, db: Database
+    callback: CallbackQuery, callback_data: CatalogItemCb, db: Database, i18n: Translator
 ) -> None:
-    product = await db.get_product(callback_data.product_id)
-    if not product or not product["is_active"]:
-        await callback.answer("⚠️ Товар недоступен", show_alert=True)
+    card = await product_card(db, i18n, callback_data.product_id)
+    if card is None:
+        await callback.answer(i18n("catalog.unavailable"), show_alert=True)
         return
 
-    text = format_product(product) + "\n\n📦 Выберите действие:"
+    text = card + "\n\n" + i18n("catalog.choose_action")
+    markup = product_view_kb(
+        i18n, callback_data.product_id, callback_data.page, callback_data.category_id
+    )
     try:
-        await _safe_edit(
-            callback.message, text, reply_markup=product_view_kb(product["id"], callback_data.page)
-        )
+        await _safe_edit(callback.message, text, reply_markup=markup)
     except TelegramBadRequest:
-        await callback.message.answer(
-            text, reply_markup=product_view_kb(product["id"], callback_data.page)
-        )
+        await callback.message.answer(text, reply_markup=markup)
     await callback.answer()
 
 
 @router.callback_query(ProductCb.filter(F.action == "buy"))
-async def product_buy(callback: CallbackQuery, callback_data: ProductCb, db: Database) -> None:
-    product = await db.get_product(callback_data.product_id)
-    if not product or not product["is_active"]:
-        await callback.answer("⚠️ Товар недоступен", show_alert=True)
+async def product_buy(
+    callback: CallbackQuery, callback_data: ProductCb, db: Database, i18n: Translator
+) -> None:
+    card = await product_card(db, i18n, callback_data.product_id)
+    if card is None:
+        await callback.answer(i18n("catalog.unavailable"), show_alert=True)
         return
 
-    text = format_product(product) + "\n\n💳 Выберите способ оплаты:"
+    text = card + "\n\n" + i18n("catalog.choose_payment")
+    markup = pay_methods_kb(i18n, callback_data.product_id)
     try:
-        await _safe_edit(callback.message, text, reply_markup=pay_methods_kb(product["id"]))
+        await _safe_edit(callback.message, text, reply_markup=markup)
     except TelegramBadRequest:
-        await callback.message.answer(text, reply_markup=pay_methods_kb(product["id"]))
+        await callback.message.answer(text, reply_markup=markup)
     await callback.answer()
 
 
-@router.callback_query(PayCb.filter(F.method == "crypto"))
+@router.callback_query(PayCb.filter(F.method == "crypto"), flags={"action_lock": "pay"})
 async def pay_crypto(
     callback: CallbackQuery,
     callback_data: PayCb,
     db: Database,
+    config: Config,
     crypto: CryptoPayAPI,
+    i18n: Translator,
 ) -> None:
     product = await db.get_product(callback_data.product_id)
-    if not product or not product["is_active"]:
-        await callback.answer("⚠️ Товар недоступен", show_alert=True)
+    if not product or not product.is_active:
+        await callback.answer(i18n("catalog.unavailable"), show_alert=True)
+        return
+    if _sold_out(product):
+        await callback.answer(i18n("catalog.sold_out"), show_alert=True)
         return
 
-    amount_str = cents_to_amount(int(product["price_cents"]))
-    description = f"Оплата товара #{product['id']}"
-    payload = f"u{callback.from_user.id}-p{product['id']}"
+    amount_str = cents_to_amount(product.price_cents)
+    description = i18n("payment.order_description", id=product.id)
+    payload = f"u{callback.from_user.id}-p{product.id}"
+    expires_in = config.reservation_ttl if product.stock is not None else None
 
     try:
-        invoice = await crypto.create_invoice(amount_str, description, payload)
+        invoice = await crypto.create_invoice(amount_str, description, payload, expires_in)
     except CryptoPayError:
-        await callback.answer("Не удалось создать счет", show_alert=True)
+        await callback.answer(i18n("payment.invoice_failed"), show_alert=True)
         return
 
     invoice_id = str(invoice["invoice_id"])
     pay_url = invoice["pay_url"]
-    order_id = await db.create_order(
-        user_id=callback.from_user.id,
-        product_id=product["id"],
-        amount_cents=int(product["price_cents"]),
-        payment_method="crypto",
-        crypto_invoice_id=invoice_id,
-        crypto_pay_url=pay_url,
-    )
-
-    text = texts.order_created_text(product["title"], int(product["price_cents"]))
     try:
-        await callback.message.edit_text(
-            text, reply_markup=invoice_kb(pay_url, "order", invoice_id, order_id)
+        order_id = await db.create_order(
+            user_id=callback.from_user.id,
+            product_id=product.id,
+            amount_cents=product.price_cents,
+            payment_method="crypto",
+            crypto_invoice_id=invoice_id,
+            crypto_pay_url=pay_url,
+            reservation_ttl=config.reservation_ttl + RESERVATION_GRACE,
         )
+    except OutOfStockError:
+        await callback.answer(i18n("catalog.sold_out"), show_alert=True)
+        return
+
+    text = texts.order_created_text(i18n, product.title, product.price_cents)
+    markup = invoice_kb(i18n, pay_url, "order", order_id)
+    try:
+        await callback.message.edit_text(text, reply_markup=markup)
     except TelegramBadRequest:
-        await callback.message.answer(
-            text, reply_markup=invoice_kb(pay_url, "order", invoice_id, order_id)
-        )
+        await callback.message.answer(text, reply_markup=markup)
     await callback.answer()
 
 
-@router.callback_query(PayCb.filter(F.method == "balance"))
-async def pay_balance(callback: CallbackQuery, callback_data: PayCb, db: Database) -> None:
+@router.callback_query(PayCb.filter(F.method == "balance"), flags={"action_lock": "pay"})
+async def pay_balance(
+    callback: CallbackQuery, callback_data: PayCb, db: Database, i18n: Translator
+) -> None:
     product = await db.get_product(callback_data.product_id)
-    if not product or not product["is_active"]:
-        await callback.answer("⚠️ Товар недоступен", show_alert=True)
+    if not product or not product.is_active:
+        await callback.answer(i18n("catalog.unavailable"), show_alert=True)
+        return
+    if _sold_out(product):
+        await callback.answer(i18n("catalog.sold_out"), show_alert=True)
         return
 
     user = await db.get_user(callback.from_user.id)
     if not user:
-        await callback.answer("❌ Пользователь не найден", show_alert=True)
+        await callback.answer(i18n("payment.user_not_found"), show_alert=True)
         return
 
-    price_cents = int(product["price_cents"])
-    balance_cents = int(user["balance_cents"])
+    price_cents = product.price_cents
+    balance_cents = user.balance_cents
 
     if balance_cents < price_cents:
-        await callback.message.answer(texts.not_enough_balance_text(price_cents, balance_cents))
+        await callback.message.answer(
+            texts.not_enough_balance_text(i18n, price_cents, balance_cents)
+        )
         await callback.answer()
         return
 
-    await db.update_balance(callback.from_user.id, -price_cents)
-    order_id = await db.create_order(
-        user_id=callback.from_user.id,
-        product_id=product["id"],
-        amount_cents=price_cents,
-        payment_method="balance",
-    )
-    await db.set_order_paid(order_id)
+    try:
+        order_id = await db.purchase_with_balance(
+            callback.from_user.id, product.id, price_cents
+        )
+    except OutOfStockError:
+        await callback.answer(i18n("catalog.sold_out"), show_alert=True)
+        return
+    if order_id is None:
+        await callback.message.answer(
+            texts.not_enough_balance_text(i18n, price_cents, balance_cents)
+        )
+        await callback.answer()
+        return
 
     new_balance = balance_cents - price_cents
-    text = texts.balance_payment_text(product["title"], product["content"], new_balance)
+    content = await db.get_order_content(order_id)
+    text = texts.balance_payment_text(i18n, product.title, content, new_balance)
     await callback.message.answer(text)
-    await callback.answer("✅ Оплачено")
+    await callback.answer(i18n("payment.paid"))
 
 
-@router.message(F.text.in_(["👤 Личный кабинет", "Личный кабинет"]))
-async def profile(message: Message, db: Database) -> None:
+@router.message(MenuButton("profile"))
+async def profile(message: Message, db: Database, i18n: Translator) -> None:
     user = message.from_user
     if not user:
         return
     await db.add_or_update_user(user.id, user.username or "", user.full_name)
     user_row = await db.get_user(user.id)
     order_count = await db.count_orders(user.id)
-    await message.answer(texts.profile_text(user_row, order_count), reply_markup=profile_kb())
+    await message.answer(
+        texts.profile_text(i18n, user_row, order_count), reply_markup=profile_kb(i18n)
+    )
 
 
 @router.callback_query(F.data == "topup_menu")
-async def topup_menu(callback: CallbackQuery) -> None:
+async def topup_menu(callback: CallbackQuery, i18n: Translator) -> None:
     await _safe_edit(
         callback.message,
-        "💳 Выберите сумму пополнения:",
-        reply_markup=topup_amounts_kb(TOPUP_AMOUNTS),
+        i18n("profile.topup_choose"),
+        reply_markup=topup_amounts_kb(i18n, TOPUP_AMOUNTS),
     )
     await callback.answer()
 
 
 async def _create_topup_invoice(
-    user_id: int, amount_cents: int, db: Database, crypto: CryptoPayAPI
+    user_id: int, amount_cents: int, db: Database, crypto: CryptoPayAPI, i18n: Translator
 ) -> tuple[str, object]:
     amount_str = cents_to_amount(amount_cents)
-    description = "Пополнение баланса"
+    description = i18n("payment.topup_description")
     payload = f"topup:u{user_id}"
 
     invoice = await crypto.create_invoice(amount_str, description, payload)
@@ -269,23 +377,29 @@ async def _create_topup_invoice(
         crypto_pay_url=pay_url,
     )
 
-    text = texts.topup_created_text(amount_cents)
-    return text, invoice_kb(pay_url, "topup", invoice_id, topup_id)
+    text = texts.topup_created_text(i18n, amount_cents)
+    return text, invoice_kb(i18n, pay_url, "topup", topup_id)
 
 
-@router.callback_query(TopupCb.filter())
+@router.callback_query(TopupCb.filter(), flags={"action_lock": "topup"})
 async def topup_create(
-    callback: CallbackQuery, callback_data: TopupCb, db: Database, crypto: CryptoPayAPI
+    callback: CallbackQuery,
+    callback_data: TopupCb,
+    db: Database,
+    crypto: CryptoPayAPI,
+    i18n: Translator,
 ) -> None:
     amount_cents = int(callback_data.amount) * 100
     if amount_cents < MIN_TOPUP_CENTS:
-        await callback.answer("⚠️ Минимум 0.05 USDT", show_alert=True)
+        await callback.answer(i18n("profile.topup_minimum"), show_alert=True)
         return
 
     try:
-        text, kb = await _create_topup_invoice(callback.from_user.id, amount_cents, db, crypto)
+        text, kb = await _create_topup_invoice(
+            callback.from_user.id, amount_cents, db, crypto, i18n
+        )
     except CryptoPayError:
-        await callback.answer("❌ Не удалось создать счет", show_alert=True)
+        await callback.answer(i18n("payment.invoice_failed"), show_alert=True)
         return
 
     await _safe_edit(callback.message, text, reply_markup=kb)
@@ -293,16 +407,16 @@ async def topup_create(
 
 
 @router.callback_query(F.data == "topup_custom")
-async def topup_custom_start(callback: CallbackQuery, state: FSMContext) -> None:
+async def topup_custom_start(callback: CallbackQuery, state: FSMContext, i18n: Translator) -> None:
     await state.set_state(TopupInput.amount)
-    await callback.message.answer(
-        "Введите сумму пополнения (минимум 0.05 USDT):", reply_markup=cancel_menu()
-    )
+    await callback.message.answer(i18n("profile.topup_prompt"), reply_markup=cancel_menu(i18n))
     await callback.answer()
 
 
-@router.message(TopupInput.amount, F.text.in_(["✖️ Отмена", "Отмена"]))
-async def topup_custom_cancel(message: Message, state: FSMContext, db: Database) -> None:
+@router.message(TopupInput.amount, MenuButton("cancel"))
+async def topup_custom_cancel(
+    message: Message, state: FSMContext, db: Database, i18n: Translator
+) -> None:
     await state.clear()
     user = message.from_user
     if not user:
@@ -310,107 +424,202 @@ async def topup_custom_cancel(message: Message, state: FSMContext, db: Database)
     await db.add_or_update_user(user.id, user.username or "", user.full_name)
     user_row = await db.get_user(user.id)
     order_count = await db.count_orders(user.id)
-    await message.answer(texts.profile_text(user_row, order_count), reply_markup=profile_kb())
+    await message.answer(
+        texts.profile_text(i18n, user_row, order_count), reply_markup=profile_kb(i18n)
+    )
 
 
 @router.message(TopupInput.amount)
 async def topup_custom_amount(
-    message: Message, state: FSMContext, db: Database, crypto: CryptoPayAPI
+    message: Message, state: FSMContext, db: Database, crypto: CryptoPayAPI, i18n: Translator
 ) -> None:
     try:
         amount_cents = parse_amount_to_cents(message.text or "")
     except ValueError:
-        await message.answer("⚠️ Не понял сумму. Пример: 1.25")
+        await message.answer(i18n("profile.bad_amount"))
         return
 
     if amount_cents < MIN_TOPUP_CENTS:
-        await message.answer("⚠️ Минимум 0.05 USDT")
+        await message.answer(i18n("profile.topup_minimum"))
         return
 
     await state.clear()
 
     try:
-        text, kb = await _create_topup_invoice(message.from_user.id, amount_cents, db, crypto)
+        text, kb = await _create_topup_invoice(
+            message.from_user.id, amount_cents, db, crypto, i18n
+        )
     except CryptoPayError:
-        await message.answer("❌ Не удалось создать счет")
+        await message.answer(i18n("payment.invoice_failed"))
         return
 
     await message.answer(text, reply_markup=kb)
 
 
 @router.callback_query(F.data == "back_profile")
-async def back_profile(callback: CallbackQuery, db: Database) -> None:
+async def back_profile(callback: CallbackQuery, db: Database, i18n: Translator) -> None:
     user = await db.get_user(callback.from_user.id)
     if not user:
         await callback.answer()
         return
     order_count = await db.count_orders(callback.from_user.id)
-    await _safe_edit(callback.message, texts.profile_text(user, order_count), reply_markup=profile_kb())
+    await _safe_edit(
+        callback.message,
+        texts.profile_text(i18n, user, order_count),
+        reply_markup=profile_kb(i18n),
+    )
     await callback.answer()
 
 
 @router.callback_query(F.data == "my_orders")
-async def my_orders(callback: CallbackQuery, db: Database) -> None:
-    await _render_my_orders(callback.message, callback.from_user.id, db, edit=True)
+async def my_orders(callback: CallbackQuery, db: Database, i18n: Translator) -> None:
+    await _render_my_orders(callback.message, callback.from_user.id, db, i18n, edit=True)
     await callback.answer()
 
 
-@router.message(F.text.in_(["🧾 Мои покупки", "Мои покупки"]))
-async def my_orders_message(message: Message, db: Database) -> None:
+@router.callback_query(OrdersPageCb.filter())
+async def my_orders_page(
+    callback: CallbackQuery, callback_data: OrdersPageCb, db: Database, i18n: Translator
+) -> None:
+    await _render_my_orders(
+        callback.message,
+        callback.from_user.id,
+        db,
+        i18n,
+        edit=True,
+        before_id=callback_data.before_id,
+    )
+    await callback.answer()
+
+
+@router.message(MenuButton("my_orders"))
+async def my_orders_message(message: Message, db: Database, i18n: Translator) -> None:
     user = message.from_user
     if not user:
         return
-    await _render_my_orders(message, user.id, db, edit=False)
+    await _render_my_orders(message, user.id, db, i18n, edit=False)
+
+
+async def _notify_refund(
+    callback: CallbackQuery, db: Database, i18n: Translator, amount_cents: int
+) -> None:
+    user = await db.get_user(callback.from_user.id)
+    await callback.message.answer(
+        i18n(
+            "payment.expired_refunded",
+            amount=cents_to_amount(amount_cents),
+            balance=cents_to_amount(user.balance_cents if user else 0),
+        )
+    )
+    await callback.answer(i18n("payment.confirmed"))
+
 
+async def _settle_paid_order(db: Database, order_id: int, expired: bool) -> Optional[str]:
+    """Returns 'paid', 'refunded', or None if the order was already settled."""
+    if not expired:
+        if await db.set_order_paid(order_id):
+            return "paid"
+        # The reaper may have expired the order while the invoice was being fetched.
+        order = await db.get_order(order_id)
+        if order is None or order.status != "expired":
+            return None
+    return await db.settle_expired_order(order_id)
 
-@router.callback_query(CheckCb.filter())
+
+async def _settle_paid_checkout(db: Database, checkout_id: int, expired: bool) -> Optional[int]:
+    """Returns the refunded amount, or None if the checkout was already settled."""
+    if not expired:
+        if await db.settle_checkout(checkout_id):
+            return 0
+        checkout = await db.get_checkout(checkout_id)
+        if checkout is None or checkout.status != "expired":
+            return None
+    return await db.settle_expired_checkout(checkout_id)
+
+
+@router.callback_query(CheckCb.filter(), flags={"action_lock": "check"})
 async def check_invoice(
     callback: CallbackQuery,
     callback_data: CheckCb,
     db: Database,
     crypto: CryptoPayAPI,
+    i18n: Translator,
 ) -> None:
-    invoice = await crypto.get_invoice(callback_data.invoice_id)
+    if callback_data.kind == "order":
+        record = await db.get_order(callback_data.internal_id)
+        not_found = i18n("payment.order_not_found")
+        already_paid = i18n("payment.order_already_paid")
+    elif callback_data.kind == "topup":
+        record = await db.get_topup(callback_data.internal_id)
+        not_found = i18n("payment.topup_not_found")
+        already_paid = i18n("payment.topup_already_paid")
+    elif callback_data.kind == "checkout":
+        record = await db.get_checkout(callback_data.internal_id)
+        not_found = i18n("payment.checkout_not_found")
+        already_paid = i18n("payment.checkout_already_paid")
+    else:
+        await callback.answer(i18n("payment.unknown_kind"), show_alert=True)
+        return
+
+    if not record or record.user_id != callback.from_user.id:
+        await callback.answer(not_found, show_alert=True)
+        return
+    if record.status in ("paid", "refunded"):
+        await callback.answer(already_paid, show_alert=True)
+        return
+
+    # Expired records are checked too: the buyer may have paid just before the
+    # invoice ran out and pressed "check" only after the reaper took the unit back.
+    expired = record.status == "expired"
+    invoice = await crypto.get_invoice(record.crypto_invoice_id)
     if not invoice:
-        await callback.answer("❌ Счет не найден", show_alert=True)
+        await callback.answer(i18n("payment.invoice_not_found"), show_alert=True)
         return
 
     status = invoice.get("status")
     if status != "paid":
-        if status == "active":
-            await callback.answer("⏳ Платеж еще не подтвержден", show_alert=True)
+        if expired:
+            await callback.answer(i18n("payment.expired"), show_alert=True)
+        elif status == "active":
+            await callback.answer(i18n("payment.pending"), show_alert=True)
         else:
-            await callback.answer("❌ Счет не оплачен", show_alert=True)
+            await callback.answer(i18n("payment.not_paid"), show_alert=True)
         return
 
     if callback_data.kind == "order":
-        order = await db.get_order(callback_data.internal_id)
-        if not order or order["user_id"] != callback.from_user.id:
-            await callback.answer("❌ Заказ не найден", show_alert=True)
+        outcome = await _settle_paid_order(db, record.id, expired)
+        if outcome is None:
+            await callback.answer(already_paid, show_alert=True)
             return
-        if order["status"] == "paid":
-            await callback.answer("ℹ️ Заказ уже оплачен", show_alert=True)
+        if outcome == "refunded":
+            await _notify_refund(callback, db, i18n, record.amount_cents)
             return
-        await db.set_order_paid(order["id"])
-        product = await db.get_product(order["product_id"])
-        await callback.message.answer(texts.order_paid_text(product["title"], product["content"]))
-        await callback.answer("✅ Оплата подтверждена")
+        product = await db.get_product(record.product_id)
+        content = await db.get_order_content(record.id)
+        await callback.message.answer(texts.order_paid_text(i18n, product.title, content))
+        await callback.answer(i18n("payment.confirmed"))
         return
 
-    if callback_data.kind == "topup":
-        topup = await db.get_topup(callback_data.internal_id)
-        if not topup or topup["user_id"] != callback.from_user.id:
-            await callback.answer("❌ Пополнение не найдено", show_alert=True)
+    if callback_data.kind == "checkout":
+        refund = await _settle_paid_checkout(db, record.id, expired)
+        if refund is None:
+            await callback.answer(already_paid, show_alert=True)
             return
-        if topup["status"] == "paid":
-            await callback.answer("ℹ️ Баланс уже пополнен", show_alert=True)
+        items = await db.list_checkout_items(record.id)
+        if items:
+            header = i18n("payment.checkout_paid")
+            for chunk in texts.checkout_delivery_texts(i18n, header, items):
+                await callback.message.answer(chunk)
+        if refund:
+            await _notify_refund(callback, db, i18n, refund)
             return
-        await db.set_topup_paid(topup["id"])
-        await db.update_balance(callback.from_user.id, int(topup["amount_cents"]))
-        user = await db.get_user(callback.from_user.id)
-        balance = cents_to_amount(int(user["balance_cents"]))
-        await callback.message.answer(f"✅ Баланс пополнен. Текущий баланс: <b>{balance} USDT</b>")
-        await callback.answer("Готово")
+        await callback.answer(i18n("payment.confirmed"))
         return
 
-    await callback.answer("Неизвестный тип счета", show_alert=True)
+    if not await db.settle_topup(record.id):
+        await callback.answer(already_paid, show_alert=True)
+        return
+    user = await db.get_user(callback.from_user.id)
+    balance = cents_to_amount(user.balance_cents)
+    await callback.message.answer(i18n("payment.topup_done", balance=balance))
+    await callback.answer(i18n("common.done"))
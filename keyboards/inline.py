@@ -1,5 +1,9 @@
+from functools import lru_cache
+from typing import Optional
+
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
+from models import Product, User
 from utils.callbacks import (
     ProductCb,
     CatalogPageCb,
@@ -10,16 +14,20 @@ from utils.callbacks import (
     AdminProductCb,
     AdminUserPageCb,
     AdminUserActionCb,
+    BroadcastCb,
+    CartCb,
+    OrdersPageCb,
 )
-from utils.formatters import cents_to_amount
+from utils.i18n import Translator
 
 
-def product_buy_kb(product_id: int) -> InlineKeyboardMarkup:
+@lru_cache(maxsize=1024)
+def product_buy_kb(i18n: Translator, product_id: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
                 InlineKeyboardButton(
-                    text="🛒 Купить",
+                    text=i18n("buttons.buy"),
                     callback_data=ProductCb(action="buy", product_id=product_id).pack(),
                 )
             ]
@@ -27,37 +35,54 @@ def product_buy_kb(product_id: int) -> InlineKeyboardMarkup:
     )
 
 
-def product_view_kb(product_id: int, page: int) -> InlineKeyboardMarkup:
+@lru_cache(maxsize=1024)
+def product_link_kb(i18n: Translator, url: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[[InlineKeyboardButton(text=i18n("buttons.buy"), url=url)]]
+    )
+
+
+@lru_cache(maxsize=1024)
+def product_view_kb(
+    i18n: Translator, product_id: int, page: int, category_id: int = 0
+) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
                 InlineKeyboardButton(
-                    text="🛒 Купить",
+                    text=i18n("buttons.buy"),
                     callback_data=ProductCb(action="buy", product_id=product_id).pack(),
                 )
             ],
             [
                 InlineKeyboardButton(
-                    text="⬅️ Назад к списку",
-                    callback_data=CatalogPageCb(page=page).pack(),
+                    text=i18n("buttons.add_to_cart"),
+                    callback_data=CartCb(action="add", product_id=product_id).pack(),
+                )
+            ],
+            [
+                InlineKeyboardButton(
+                    text=i18n("buttons.back_to_list"),
+                    callback_data=CatalogPageCb(page=page, category_id=category_id).pack(),
                 )
             ],
         ]
     )
 
 
-def pay_methods_kb(product_id: int) -> InlineKeyboardMarkup:
+@lru_cache(maxsize=1024)
+def pay_methods_kb(i18n: Translator, product_id: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
                 InlineKeyboardButton(
-                    text="💎 CryptoBot",
+                    text=i18n("buttons.pay_crypto"),
                     callback_data=PayCb(method="crypto", product_id=product_id).pack(),
                 )
             ],
             [
                 InlineKeyboardButton(
-                    text="💰 С баланса",
+                    text=i18n("buttons.pay_balance"),
                     callback_data=PayCb(method="balance", product_id=product_id).pack(),
                 )
             ],
@@ -65,38 +90,52 @@ def pay_methods_kb(product_id: int) -> InlineKeyboardMarkup:
     )
 
 
-def invoice_kb(pay_url: str, kind: str, invoice_id: str, internal_id: int) -> InlineKeyboardMarkup:
+@lru_cache(maxsize=256)
+def invoice_kb(
+    i18n: Translator, pay_url: str, kind: str, internal_id: int
+) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="💳 Оплатить", url=pay_url)],
+            [InlineKeyboardButton(text=i18n("buttons.pay"), url=pay_url)],
             [
                 InlineKeyboardButton(
-                    text="✅ Проверить оплату",
-                    callback_data=CheckCb(
-                        kind=kind, invoice_id=str(invoice_id), internal_id=internal_id
-                    ).pack(),
+                    text=i18n("buttons.check_payment"),
+                    callback_data=CheckCb(kind=kind, internal_id=internal_id).pack(),
                 )
             ],
         ]
     )
 
 
-def profile_kb() -> InlineKeyboardMarkup:
+@lru_cache(maxsize=64)
+def profile_kb(i18n: Translator) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
-            [InlineKeyboardButton(text="💳 Пополнить баланс", callback_data="topup_menu")],
-            [InlineKeyboardButton(text="🧾 Мои покупки", callback_data="my_orders")],
+            [InlineKeyboardButton(text=i18n("buttons.topup"), callback_data="topup_menu")],
+            [InlineKeyboardButton(text=i18n("buttons.my_orders"), callback_data="my_orders")],
         ]
     )
 
 
-def topup_amounts_kb(amounts: list[int]) -> InlineKeyboardMarkup:
+def my_orders_kb(i18n: Translator, older_than: Optional[int] = None) -> InlineKeyboardMarkup:
+    markup = profile_kb(i18n)
+    if older_than is None:
+        return markup
+    older = InlineKeyboardButton(
+        text=i18n("buttons.next_page"),
+        callback_data=OrdersPageCb(before_id=older_than).pack(),
+    )
+    return InlineKeyboardMarkup(inline_keyboard=[[older], *markup.inline_keyboard])
+
+
+@lru_cache(maxsize=64)
+def topup_amounts_kb(i18n: Translator, amounts: tuple[int, ...]) -> InlineKeyboardMarkup:
     rows = []
     row = []
     for amount in amounts:
         row.append(
             InlineKeyboardButton(
-                text=f"💎 {amount} USDT",
+                text=i18n("buttons.topup_amount", amount=amount),
                 callback_data=TopupCb(amount=amount).pack(),
             )
         )
@@ -106,13 +145,16 @@ def topup_amounts_kb(amounts: list[int]) -> InlineKeyboardMarkup:
     if row:
         rows.append(row)
 
-    rows.append([InlineKeyboardButton(text="✍️ Ввести сумму", callback_data="topup_custom")])
-    rows.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="back_profile")])
+    rows.append(
+        [InlineKeyboardButton(text=i18n("buttons.topup_custom"), callback_data="topup_custom")]
+    )
+    rows.append([InlineKeyboardButton(text=i18n("buttons.back"), callback_data="back_profile")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def admin_product_kb(product_id: int, is_active: bool) -> InlineKeyboardMarkup:
-    title = "🚫 Отключить" if is_active else "✅ Включить"
+@lru_cache(maxsize=1024)
+def admin_product_kb(i18n: Translator, product_id: int, is_active: bool) -> InlineKeyboardMarkup:
+    title = i18n("buttons.product_disable" if is_active else "buttons.product_enable")
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
@@ -125,38 +167,44 @@ def admin_product_kb(product_id: int, is_active: bool) -> InlineKeyboardMarkup:
     )
 
 
-def admin_users_menu_kb() -> InlineKeyboardMarkup:
+@lru_cache(maxsize=64)
+def admin_users_menu_kb(i18n: Translator) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
                 InlineKeyboardButton(
-                    text="👥 Список пользователей", callback_data=AdminUserPageCb(page=0).pack()
+                    text=i18n("buttons.users_list"), callback_data=AdminUserPageCb(page=0).pack()
                 )
             ],
-            [InlineKeyboardButton(text="🔎 Поиск", callback_data="admin_users_search")],
-            [InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_users_back")],
+            [
+                InlineKeyboardButton(
+                    text=i18n("buttons.users_search"), callback_data="admin_users_search"
+                )
+            ],
+            [InlineKeyboardButton(text=i18n("buttons.back"), callback_data="admin_users_back")],
         ]
     )
 
 
+def _user_label(i18n: Translator, user: User) -> str:
+    username = user.username or ""
+    if username:
+        return f"{user.id} - @{username}"[:40]
+    return f"{user.id} - {user.full_name or i18n('buttons.no_name')}"[:40]
+
+
 def admin_users_list_kb(
-    users: list[dict], page: int, has_more: bool
+    i18n: Translator, users: list[User], page: int, has_more: bool
 ) -> InlineKeyboardMarkup:
     rows: list[list[InlineKeyboardButton]] = []
     for user in users:
-        username = user["username"] or ""
-        label = (
-            f"{user['id']} - @{username}"
-            if username
-            else f"{user['id']} - {user['full_name'] or 'без имени'}"
-        )
-        label = label[:40]
+        label = _user_label(i18n, user)
         rows.append(
             [
                 InlineKeyboardButton(
                     text=label,
                     callback_data=AdminUserActionCb(
-                        action="view", user_id=int(user["id"]), page=page
+                        action="view", user_id=user.id, page=page
                     ).pack(),
                 )
             ]
@@ -166,28 +214,29 @@ def admin_users_list_kb(
     if page > 0:
         nav_row.append(
             InlineKeyboardButton(
-                text="⬅️ Предыдущая", callback_data=AdminUserPageCb(page=page - 1).pack()
+                text=i18n("buttons.prev_page"), callback_data=AdminUserPageCb(page=page - 1).pack()
             )
         )
     if has_more:
         nav_row.append(
             InlineKeyboardButton(
-                text="➡️ Следующая", callback_data=AdminUserPageCb(page=page + 1).pack()
+                text=i18n("buttons.next_page"), callback_data=AdminUserPageCb(page=page + 1).pack()
             )
         )
     if nav_row:
         rows.append(nav_row)
 
-    rows.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_users_back")])
+    rows.append([InlineKeyboardButton(text=i18n("buttons.back"), callback_data="admin_users_back")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def admin_user_card_kb(user_id: int, page: int) -> InlineKeyboardMarkup:
+@lru_cache(maxsize=1024)
+def admin_user_card_kb(i18n: Translator, user_id: int, page: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
                 InlineKeyboardButton(
-                    text="➕ Пополнить баланс",
+                    text=i18n("buttons.balance_add"),
                     callback_data=AdminUserActionCb(
                         action="balance_add", user_id=user_id, page=page
                     ).pack(),
@@ -195,7 +244,7 @@ def admin_user_card_kb(user_id: int, page: int) -> InlineKeyboardMarkup:
             ],
             [
                 InlineKeyboardButton(
-                    text="➖ Списать с баланса",
+                    text=i18n("buttons.balance_sub"),
                     callback_data=AdminUserActionCb(
                         action="balance_sub", user_id=user_id, page=page
                     ).pack(),
@@ -203,7 +252,7 @@ def admin_user_card_kb(user_id: int, page: int) -> InlineKeyboardMarkup:
             ],
             [
                 InlineKeyboardButton(
-                    text="🧾 Установить баланс",
+                    text=i18n("buttons.balance_set"),
                     callback_data=AdminUserActionCb(
                         action="balance_set", user_id=user_id, page=page
                     ).pack(),
@@ -211,7 +260,7 @@ def admin_user_card_kb(user_id: int, page: int) -> InlineKeyboardMarkup:
             ],
             [
                 InlineKeyboardButton(
-                    text="🧾 Заказы",
+                    text=i18n("buttons.user_orders"),
                     callback_data=AdminUserActionCb(
                         action="orders", user_id=user_id, page=page
                     ).pack(),
@@ -219,7 +268,7 @@ def admin_user_card_kb(user_id: int, page: int) -> InlineKeyboardMarkup:
             ],
             [
                 InlineKeyboardButton(
-                    text="⬅️ Назад к списку",
+                    text=i18n("buttons.back_to_list"),
                     callback_data=AdminUserPageCb(page=page).pack(),
                 )
             ],
@@ -227,36 +276,31 @@ def admin_user_card_kb(user_id: int, page: int) -> InlineKeyboardMarkup:
     )
 
 
-def admin_user_search_results_kb(users: list[dict]) -> InlineKeyboardMarkup:
+def admin_user_search_results_kb(i18n: Translator, users: list[User]) -> InlineKeyboardMarkup:
     rows: list[list[InlineKeyboardButton]] = []
     for user in users:
-        username = user["username"] or ""
-        label = (
-            f"{user['id']} - @{username}"
-            if username
-            else f"{user['id']} - {user['full_name'] or 'без имени'}"
-        )
-        label = label[:40]
+        label = _user_label(i18n, user)
         rows.append(
             [
                 InlineKeyboardButton(
                     text=label,
                     callback_data=AdminUserActionCb(
-                        action="view", user_id=int(user["id"]), page=0
+                        action="view", user_id=user.id, page=0
                     ).pack(),
                 )
             ]
         )
-    rows.append([InlineKeyboardButton(text="⬅️ Назад", callback_data="admin_users_back")])
+    rows.append([InlineKeyboardButton(text=i18n("buttons.back"), callback_data="admin_users_back")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def admin_user_orders_kb(user_id: int, page: int) -> InlineKeyboardMarkup:
+@lru_cache(maxsize=1024)
+def admin_user_orders_kb(i18n: Translator, user_id: int, page: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
                 InlineKeyboardButton(
-                    text="⬅️ Назад к пользователю",
+                    text=i18n("buttons.back_to_user"),
                     callback_data=AdminUserActionCb(
                         action="view", user_id=user_id, page=page
                     ).pack(),
@@ -264,7 +308,7 @@ def admin_user_orders_kb(user_id: int, page: int) -> InlineKeyboardMarkup:
             ],
             [
                 InlineKeyboardButton(
-                    text="⬅️ Назад к списку",
+                    text=i18n("buttons.back_to_list"),
                     callback_data=AdminUserPageCb(page=page).pack(),
                 )
             ],
@@ -272,21 +316,41 @@ def admin_user_orders_kb(user_id: int, page: int) -> InlineKeyboardMarkup:
     )
 
 
+def _product_label(i18n: Translator, product: Product) -> str:
+    stock = product.stock
+    if stock is None:
+        return product.button_label
+    if stock <= 0:
+        return i18n("buttons.product_sold_out", label=product.button_label)[:64]
+    return i18n("buttons.product_stock", label=product.button_label, count=stock)[:64]
+
+
 def catalog_list_kb(
-    products: list[dict], page: int, has_more: bool
+    i18n: Translator,
+    products: list[Product],
+    page: int,
+    has_more: bool,
+    category_id: int = 0,
+    subcategories: tuple[tuple[int, str, int], ...] = (),
+    parent_id: Optional[int] = None,
 ) -> InlineKeyboardMarkup:
     rows: list[list[InlineKeyboardButton]] = []
+    for child_id, title, count in subcategories:
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text=i18n("buttons.category", title=title, count=count)[:64],
+                    callback_data=CatalogPageCb(page=0, category_id=child_id).pack(),
+                )
+            ]
+        )
     for product in products:
-        title = product["title"]
-        price = cents_to_amount(int(product["price_cents"]))
-        label = f"🛍️ {title} - {price} USDT"
-        label = label[:50]
         rows.append(
             [
                 InlineKeyboardButton(
-                    text=label,
+                    text=_product_label(i18n, product),
                     callback_data=CatalogItemCb(
-                        product_id=int(product["id"]), page=page
+                        product_id=product.id, page=page, category_id=category_id
                     ).pack(),
                 )
             ]
@@ -296,16 +360,80 @@ def catalog_list_kb(
     if page > 0:
         nav_row.append(
             InlineKeyboardButton(
-                text="⬅️ Предыдущая", callback_data=CatalogPageCb(page=page - 1).pack()
+                text=i18n("buttons.prev_page"),
+                callback_data=CatalogPageCb(page=page - 1, category_id=category_id).pack(),
             )
         )
     if has_more:
         nav_row.append(
             InlineKeyboardButton(
-                text="➡️ Следующая", callback_data=CatalogPageCb(page=page + 1).pack()
+                text=i18n("buttons.next_page"),
+                callback_data=CatalogPageCb(page=page + 1, category_id=category_id).pack(),
             )
         )
     if nav_row:
         rows.append(nav_row)
 
+    if parent_id is not None:
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text=i18n("buttons.back"),
+                    callback_data=CatalogPageCb(page=0, category_id=parent_id).pack(),
+                )
+            ]
+        )
+
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
+@lru_cache(maxsize=1024)
+def broadcast_progress_kb(i18n: Translator, broadcast_id: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text=i18n("buttons.broadcast_stop"),
+                    callback_data=BroadcastCb(action="cancel", broadcast_id=broadcast_id).pack(),
+                )
+            ]
+        ]
+    )
+
+
+def cart_kb(i18n: Translator, items: list[tuple[int, str]]) -> InlineKeyboardMarkup:
+    rows: list[list[InlineKeyboardButton]] = [
+        [
+            InlineKeyboardButton(
+                text=i18n("buttons.cart_remove", title=title)[:64],
+                callback_data=CartCb(action="remove", product_id=product_id).pack(),
+            )
+        ]
+        for product_id, title in items
+    ]
+    if items:
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text=i18n("buttons.cart_pay_crypto"),
+                    callback_data=CartCb(action="pay_crypto").pack(),
+                )
+            ]
+        )
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text=i18n("buttons.cart_pay_balance"),
+                    callback_data=CartCb(action="pay_balance").pack(),
+                )
+            ]
+        )
+        rows.append(
+            [
+                InlineKeyboardButton(
+                    text=i18n("buttons.cart_clear"),
+                    callback_data=CartCb(action="clear").pack(),
+                )
+            ]
+        )
     return InlineKeyboardMarkup(inline_keyboard=rows)
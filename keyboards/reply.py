@@ -1,28 +1,36 @@
-﻿from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
+﻿from functools import lru_cache
 
+from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 
-def main_menu(is_admin: bool) -> ReplyKeyboardMarkup:
+from utils.i18n import Translator
+
+
+@lru_cache(maxsize=64)
+def main_menu(i18n: Translator, is_admin: bool) -> ReplyKeyboardMarkup:
     buttons = [
-        [KeyboardButton(text="🛍️ Каталог"), KeyboardButton(text="👤 Личный кабинет")],
-        [KeyboardButton(text="ℹ️ Помощь")],
+        [KeyboardButton(text=i18n("menu.catalog")), KeyboardButton(text=i18n("menu.profile"))],
+        [KeyboardButton(text=i18n("menu.cart")), KeyboardButton(text=i18n("menu.help"))],
     ]
     if is_admin:
-        buttons.append([KeyboardButton(text="🛠️ Админ панель")])
+        buttons.append([KeyboardButton(text=i18n("menu.admin"))])
     return ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
 
 
-def admin_menu() -> ReplyKeyboardMarkup:
+@lru_cache(maxsize=64)
+def admin_menu(i18n: Translator) -> ReplyKeyboardMarkup:
     buttons = [
-        [KeyboardButton(text="➕ Добавить товар")],
-        [KeyboardButton(text="📦 Товары"), KeyboardButton(text="🧾 Заказы")],
-        [KeyboardButton(text="👥 Пользователи")],
-        [KeyboardButton(text="💰 Начислить баланс")],
-        [KeyboardButton(text="⬅️ Назад")],
+        [KeyboardButton(text=i18n("menu.add_product"))],
+        [KeyboardButton(text=i18n("menu.products")), KeyboardButton(text=i18n("menu.orders"))],
+        [KeyboardButton(text=i18n("menu.users")), KeyboardButton(text=i18n("menu.stats"))],
+        [KeyboardButton(text=i18n("menu.topup"))],
+        [KeyboardButton(text=i18n("menu.broadcast"))],
+        [KeyboardButton(text=i18n("menu.back"))],
     ]
     return ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True)
 
 
-def cancel_menu() -> ReplyKeyboardMarkup:
+@lru_cache(maxsize=64)
+def cancel_menu(i18n: Translator) -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text="✖️ Отмена")]], resize_keyboard=True
-    )
+        keyboard=[[KeyboardButton(text=i18n("menu.cancel"))]], resize_keyboard=True
+    )
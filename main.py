@@ -1,5 +1,6 @@
 import asyncio
 import logging
+from contextlib import AsyncExitStack
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
@@ -8,8 +9,28 @@ from aiogram.fsm.storage.memory import MemoryStorage
 from config import load_config
 from db import Database
 from crypto_pay import CryptoPayAPI
-from middlewares import DbMiddleware, ConfigMiddleware, CryptoMiddleware
-from handlers import common, user, admin
+from middlewares import (
+    DbMiddleware,
+    ConfigMiddleware,
+    CryptoMiddleware,
+    I18nMiddleware,
+    InFlightMiddleware,
+    ActionLockMiddleware,
+    MetricsMiddleware,
+)
+from handlers import common, user, cart, admin, inline
+from services import metrics
+from services.archive import archive_old_rows
+from services.audit import AuditLog
+from services.backup import Backups
+from services.broadcast import Broadcaster
+from services.inventory import reap_reservations
+from services.ledger import verify_ledger
+from services.lifecycle import Lifecycle
+from services.maintenance import maintain_database
+from services.sender import SendScheduler
+from utils.i18n import locales
+from utils.locks import KeyedLocks
 
 
 async def main() -> None:
@@ -17,40 +38,128 @@ async def main() -> None:
 
     config = load_config()
 
-    db = Database(config.db_path)
-    await db.connect()
-    await db.init()
-
-    crypto = CryptoPayAPI(
-        token=config.crypto_token,
-        base_url=config.crypto_api_url,
-        asset=config.crypto_asset,
-    )
-    await crypto.start()
-
-    bot = Bot(
-        token=config.bot_token,
-        default=DefaultBotProperties(parse_mode="HTML"),
-    )
-    dp = Dispatcher(storage=MemoryStorage())
-
-    dp.message.middleware(DbMiddleware(db))
-    dp.callback_query.middleware(DbMiddleware(db))
-    dp.message.middleware(ConfigMiddleware(config))
-    dp.callback_query.middleware(ConfigMiddleware(config))
-    dp.message.middleware(CryptoMiddleware(crypto))
-    dp.callback_query.middleware(CryptoMiddleware(crypto))
-
-    dp.include_router(common.router)
-    dp.include_router(user.router)
-    dp.include_router(admin.router)
-
-    try:
-        await dp.start_polling(bot)
-    finally:
-        await db.close()
-        await crypto.close()
-        await bot.session.close()
+    async with AsyncExitStack() as stack:
+        db = Database(config.db_path, pragmas=config.sqlite_pragmas)
+        await db.connect()
+        stack.push_async_callback(db.close)
+        await db.init()
+        settings = await db.pragma_report()
+        logging.info(
+            "SQLite profile %s: %s",
+            config.sqlite_profile,
+            ", ".join(f"{name}={value}" for name, value in settings.items()),
+        )
+
+        crypto = CryptoPayAPI(
+            token=config.crypto_token,
+            base_url=config.crypto_api_url,
+            asset=config.crypto_asset,
+        )
+        stack.push_async_callback(crypto.close)
+        await crypto.start()
+
+        bot = Bot(
+            token=config.bot_token,
+            default=DefaultBotProperties(parse_mode="HTML"),
+        )
+        stack.push_async_callback(bot.session.close)
+        scheduler = SendScheduler(
+            global_rate=config.send_global_rate, chat_rate=config.send_chat_rate
+        )
+        bot.session.middleware(scheduler)
+        storage = MemoryStorage()
+        dp = Dispatcher(storage=storage)
+        lifecycle = Lifecycle(drain_timeout=config.shutdown_timeout)
+        lifecycle.on_flush("sender", scheduler.close)
+        # Polling has stopped: refuse updates that were fetched but not started yet.
+        dp.shutdown.register(lifecycle.stop_intake)
+        broadcaster = Broadcaster(bot, db, lifecycle)
+        audit = AuditLog(db)
+        lifecycle.on_flush("audit", audit.flush)
+        backups = Backups(
+            db, config.backup_dir, keep=config.backup_keep, compress=config.backup_compress
+        )
+
+        metrics.instrument_methods(
+            db,
+            metrics.db_query_seconds,
+            metrics.db_errors_total,
+            exclude=(
+                "connect",
+                "close",
+                "init",
+                "pragma_report",
+                "wal_size",
+                "checkpoint",
+                "optimize",
+                "backup",
+            ),
+        )
+        metrics.instrument_methods(
+            crypto,
+            metrics.crypto_request_seconds,
+            metrics.crypto_errors_total,
+            names=("create_invoice", "get_invoice"),
+        )
+        metrics.watch_fsm_states(storage)
+
+        dp.update.outer_middleware(InFlightMiddleware(lifecycle))
+        for event_name, observer in (
+            ("message", dp.message),
+            ("callback_query", dp.callback_query),
+            ("inline_query", dp.inline_query),
+        ):
+            observer.middleware(DbMiddleware(db))
+            observer.middleware(ConfigMiddleware(config))
+            observer.middleware(CryptoMiddleware(crypto))
+            observer.middleware(I18nMiddleware(locales))
+            observer.middleware(MetricsMiddleware(event_name))
+        dp.callback_query.middleware(ActionLockMiddleware(KeyedLocks()))
+
+        dp.include_router(inline.router)
+        dp.include_router(common.router)
+        dp.include_router(user.router)
+        dp.include_router(cart.router)
+        dp.include_router(admin.router)
+
+        if config.metrics_port:
+            metrics_runner = await metrics.start_metrics_server(
+                config.metrics_host, config.metrics_port
+            )
+            stack.push_async_callback(metrics_runner.cleanup)
+        # Registered last so it runs first: the drain still needs the db and the bot.
+        stack.push_async_callback(lifecycle.shutdown)
+        if config.metrics_port:
+            lifecycle.spawn(metrics.monitor_loop_lag(lifecycle), name="loop-lag")
+
+        await broadcaster.resume()
+        lifecycle.spawn(reap_reservations(db, lifecycle), name="reservation-reaper")
+        lifecycle.spawn(verify_ledger(db, lifecycle), name="ledger-verifier")
+        lifecycle.spawn(audit.run(lifecycle), name="audit-writer")
+        lifecycle.spawn(
+            maintain_database(
+                db,
+                lifecycle,
+                checkpoint_interval=config.checkpoint_interval,
+                checkpoint_wal_bytes=config.checkpoint_wal_bytes,
+            ),
+            name="db-maintenance",
+        )
+        if config.archive_after_days > 0:
+            lifecycle.spawn(
+                archive_old_rows(db, lifecycle, config.archive_after_days), name="archiver"
+            )
+        if config.backup_interval > 0:
+            lifecycle.spawn(backups.run(lifecycle, config.backup_interval), name="backups")
+
+        await dp.start_polling(
+            bot,
+            close_bot_session=False,
+            lifecycle=lifecycle,
+            broadcaster=broadcaster,
+            audit=audit,
+            backups=backups,
+        )
 
 
 if __name__ == "__main__":
@@ -1,6 +1,10 @@
-﻿from aiogram import BaseMiddleware
+﻿import time
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
 from typing import Callable, Awaitable, Dict, Any
 
+from services import metrics
+
 
 class DbMiddleware(BaseMiddleware):
     def __init__(self, db):
@@ -20,6 +24,64 @@ class ConfigMiddleware(BaseMiddleware):
         return await handler(event, data)
 
 
+class InFlightMiddleware(BaseMiddleware):
+    def __init__(self, lifecycle):
+        self.lifecycle = lifecycle
+
+    async def __call__(self, handler: Callable, event: Any, data: Dict[str, Any]):
+        if not self.lifecycle.accepting:
+            return None
+        async with self.lifecycle.track():
+            return await handler(event, data)
+
+
+class MetricsMiddleware(BaseMiddleware):
+    def __init__(self, event: str):
+        self.event = event
+
+    async def __call__(self, handler: Callable, event: Any, data: Dict[str, Any]):
+        handler_obj = data.get("handler")
+        name = getattr(getattr(handler_obj, "callback", None), "__name__", "unknown")
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            metrics.update_errors_total.inc(self.event, name)
+            raise
+        finally:
+            metrics.updates_total.inc(self.event, name)
+            metrics.update_seconds.observe(time.perf_counter() - started, self.event, name)
+
+
+class ActionLockMiddleware(BaseMiddleware):
+    def __init__(self, locks):
+        self.locks = locks
+
+    async def __call__(self, handler: Callable, event: Any, data: Dict[str, Any]):
+        action = get_flag(data, "action_lock")
+        user = data.get("event_from_user")
+        if not action or user is None:
+            return await handler(event, data)
+        async with self.locks.hold((user.id, action), wait=False) as acquired:
+            if not acquired:
+                await event.answer(data["i18n"]("common.busy"))
+                return None
+            return await handler(event, data)
+
+
+class I18nMiddleware(BaseMiddleware):
+    def __init__(self, locales):
+        self.locales = locales
+
+    async def __call__(self, handler: Callable, event: Any, data: Dict[str, Any]):
+        user = data.get("event_from_user")
+        if user is None:
+            data["i18n"] = self.locales.default
+        else:
+            data["i18n"] = self.locales.for_user(user.id, user.language_code)
+        return await handler(event, data)
+
+
 class CryptoMiddleware(BaseMiddleware):
     def __init__(self, crypto_api):
         self.crypto_api = crypto_api
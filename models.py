@@ -0,0 +1,99 @@
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Optional, TypeVar
+
+R = TypeVar("R")
+
+
+@dataclass(frozen=True, slots=True)
+class User:
+    id: int
+    username: Optional[str]
+    full_name: Optional[str]
+    balance_cents: int
+    created_at: int
+
+
+@dataclass(frozen=True, slots=True)
+class Product:
+    id: int
+    title: str
+    description: str
+    price_cents: int
+    content: str
+    is_active: bool
+    created_at: int
+    card_html: Optional[str]
+    button_label: Optional[str]
+    category_id: Optional[int]
+    # None: no units, the product delivers its static content.
+    stock: Optional[int]
+
+
+@dataclass(frozen=True, slots=True)
+class Order:
+    id: int
+    user_id: int
+    product_id: int
+    amount_cents: int
+    status: str
+    payment_method: str
+    crypto_invoice_id: Optional[str]
+    crypto_pay_url: Optional[str]
+    created_at: int
+    paid_at: Optional[int]
+    checkout_id: Optional[int]
+    # products.title, filled only by queries that join it in.
+    title: Optional[str] = field(default=None, metadata={"joined": True})
+
+
+@dataclass(frozen=True, slots=True)
+class Checkout:
+    id: int
+    user_id: int
+    amount_cents: int
+    item_count: int
+    status: str
+    payment_method: str
+    crypto_invoice_id: Optional[str]
+    crypto_pay_url: Optional[str]
+    created_at: int
+    paid_at: Optional[int]
+
+
+@dataclass(frozen=True, slots=True)
+class Topup:
+    id: int
+    user_id: int
+    amount_cents: int
+    status: str
+    crypto_invoice_id: Optional[str]
+    crypto_pay_url: Optional[str]
+    created_at: int
+    paid_at: Optional[int]
+
+
+def columns(record: type, alias: str = "") -> str:
+    """SELECT list of the record's stored columns, in field order."""
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(
+        prefix + item.name for item in fields(record) if not item.metadata.get("joined")
+    )
+
+
+def row_factory(record: type[R]) -> Callable[[Any, tuple], R]:
+    """sqlite3 row factory that builds ``record`` positionally.
+
+    The query must select exactly the record's fields in order (see columns()).
+    Flags stored as 0/1 are converted to bool here, once per row.
+    """
+    flags = [i for i, item in enumerate(fields(record)) if item.type is bool]
+    if not flags:
+        return lambda cursor, row: record(*row)
+
+    def build(cursor: Any, row: tuple) -> R:
+        values = list(row)
+        for i in flags:
+            values[i] = bool(values[i])
+        return record(*values)
+
+    return build
@@ -0,0 +1,19 @@
+import logging
+
+from db import Database, after_ms
+from services.lifecycle import Lifecycle
+
+logger = logging.getLogger(__name__)
+
+
+async def archive_old_rows(
+    db: Database, lifecycle: Lifecycle, max_age_days: int, interval: float = 3600.0
+) -> None:
+    while await lifecycle.sleep(interval):
+        try:
+            orders, topups = await db.archive_settled(after_ms(-max_age_days * 86400))
+        except Exception:
+            logger.exception("Failed to archive settled orders")
+            continue
+        if orders or topups:
+            logger.info("Archived %d order(s) and %d top-up(s)", orders, topups)
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import logging
+from typing import Any
+
+from db import Database, now_ms
+from services.lifecycle import Lifecycle
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog:
+    """Collects admin actions in memory; a background task writes them in batches.
+
+    Handlers only append to a list, so auditing never waits on a commit.
+    """
+
+    BATCH_SIZE = 200
+    FLUSH_INTERVAL = 5.0
+    # If the database keeps failing, drop the oldest entries beyond this.
+    MAX_BUFFER = 10_000
+
+    def __init__(self, db: Database):
+        self.db = db
+        self._buffer: list[tuple] = []
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def record(
+        self,
+        admin_id: int,
+        action: str,
+        target_type: str,
+        target_id: int,
+        before: Any = None,
+        after: Any = None,
+    ) -> None:
+        self._buffer.append(
+            (
+                admin_id,
+                action,
+                target_type,
+                target_id,
+                None if before is None else json.dumps(before),
+                None if after is None else json.dumps(after),
+                now_ms(),
+            )
+        )
+        if len(self._buffer) >= self.BATCH_SIZE:
+            self._full.set()
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            written = 0
+            while self._buffer:
+                batch = self._buffer[: self.BATCH_SIZE]
+                del self._buffer[: self.BATCH_SIZE]
+                try:
+                    written += await self.db.insert_audit_entries(batch)
+                except BaseException:
+                    self._buffer[:0] = batch
+                    overflow = len(self._buffer) - self.MAX_BUFFER
+                    if overflow > 0:
+                        del self._buffer[:overflow]
+                        logger.error("Dropped %d audit entries", overflow)
+                    raise
+            return written
+
+    async def run(self, lifecycle: Lifecycle) -> None:
+        while lifecycle.accepting:
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to write audit entries")
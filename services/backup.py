@@ -0,0 +1,89 @@
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from db import Database
+from services.lifecycle import Lifecycle
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BackupResult:
+    path: Path
+    size: int
+    seconds: float
+
+
+def _compress(source: Path, target: Path) -> None:
+    with source.open("rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+class Backups:
+    """Timestamped online backups of the database with retention."""
+
+    def __init__(self, db: Database, directory: str, keep: int = 7, compress: bool = True):
+        self.db = db
+        self.directory = Path(directory)
+        self.keep = keep
+        self.compress = compress
+        self.prefix = Path(db.path).stem
+        self._lock = asyncio.Lock()
+
+    def existing(self) -> list[Path]:
+        files = [
+            *self.directory.glob(f"{self.prefix}-*.db"),
+            *self.directory.glob(f"{self.prefix}-*.db.gz"),
+        ]
+        # The timestamp in the name sorts chronologically.
+        return sorted(files, key=lambda path: path.name)
+
+    def _rotate(self) -> list[Path]:
+        removed = self.existing()[: -self.keep] if self.keep > 0 else []
+        for path in removed:
+            path.unlink(missing_ok=True)
+        return removed
+
+    async def create(self) -> BackupResult:
+        async with self._lock:
+            started = time.perf_counter()
+            await asyncio.to_thread(self.directory.mkdir, parents=True, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+            path = self.directory / f"{self.prefix}-{stamp}.db"
+            partial = path.with_name(path.name + ".partial")
+            try:
+                await self.db.backup(str(partial))
+                if self.compress:
+                    path = path.with_name(path.name + ".gz")
+                    packed = path.with_name(path.name + ".partial")
+                    try:
+                        await asyncio.to_thread(_compress, partial, packed)
+                    except BaseException:
+                        packed.unlink(missing_ok=True)
+                        raise
+                    os.replace(packed, path)
+                else:
+                    os.replace(partial, path)
+            finally:
+                partial.unlink(missing_ok=True)
+            for removed in await asyncio.to_thread(self._rotate):
+                logger.info("Removed old backup %s", removed.name)
+            result = BackupResult(path, path.stat().st_size, time.perf_counter() - started)
+        logger.info(
+            "Backup %s written: %d bytes in %.2fs", path.name, result.size, result.seconds
+        )
+        return result
+
+    async def run(self, lifecycle: Lifecycle, interval: float) -> None:
+        while await lifecycle.sleep(interval):
+            try:
+                await self.create()
+            except Exception:
+                logger.exception("Scheduled backup failed")
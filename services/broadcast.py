@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest, TelegramForbiddenError
+
+from db import Database
+from keyboards.inline import broadcast_progress_kb
+from services.lifecycle import Lifecycle
+from services.sender import bulk_sends
+from utils import texts
+from utils.i18n import locales
+
+logger = logging.getLogger(__name__)
+
+BLOCKED = "blocked"
+
+
+class Broadcaster:
+    BATCH_SIZE = 100
+    CONCURRENCY = 10
+    PROGRESS_INTERVAL = 5.0
+
+    def __init__(self, bot: Bot, db: Database, lifecycle: Lifecycle):
+        self.bot = bot
+        self.db = db
+        self.lifecycle = lifecycle
+        self._running: set[int] = set()
+        self._cancelled: set[int] = set()
+
+    @property
+    def active(self) -> int:
+        return len(self._running)
+
+    async def start(self, admin_id: int, chat_id: int, text: str) -> int:
+        total = await self.db.count_users()
+        broadcast_id = await self.db.create_broadcast(admin_id, chat_id, text, total)
+        i18n = locales.for_user(admin_id)
+        message = await self.bot.send_message(
+            chat_id,
+            texts.broadcast_progress_text(i18n, broadcast_id, "running", total, 0, 0, 0),
+            reply_markup=broadcast_progress_kb(i18n, broadcast_id),
+        )
+        await self.db.set_broadcast_message(broadcast_id, message.message_id)
+        self._spawn(broadcast_id)
+        return broadcast_id
+
+    async def resume(self) -> int:
+        rows = await self.db.list_running_broadcasts()
+        for row in rows:
+            logger.info("Resuming broadcast #%d after user %d", row["id"], row["last_user_id"])
+            self._spawn(int(row["id"]))
+        return len(rows)
+
+    async def cancel(self, broadcast_id: int) -> None:
+        if broadcast_id in self._running:
+            self._cancelled.add(broadcast_id)
+            return
+        await self.db.finish_broadcast(broadcast_id, "cancelled")
+
+    def _spawn(self, broadcast_id: int) -> None:
+        if broadcast_id in self._running:
+            return
+        self._running.add(broadcast_id)
+        self.lifecycle.spawn(self._run(broadcast_id), name=f"broadcast-{broadcast_id}")
+
+    async def _run(self, broadcast_id: int) -> None:
+        try:
+            await self._deliver(broadcast_id)
+        finally:
+            self._running.discard(broadcast_id)
+            self._cancelled.discard(broadcast_id)
+
+    async def _deliver(self, broadcast_id: int) -> None:
+        row = await self.db.get_broadcast(broadcast_id)
+        if not row or row["status"] != "running":
+            return
+        text = row["text"]
+        cursor = int(row["last_user_id"])
+        sent = int(row["sent_count"])
+        failed = int(row["failed_count"])
+        blocked = int(row["blocked_count"])
+        semaphore = asyncio.Semaphore(self.CONCURRENCY)
+        last_report = time.monotonic()
+
+        status: Optional[str] = None
+        while not self.lifecycle.stopping.is_set():
+            if broadcast_id in self._cancelled:
+                status = "cancelled"
+                break
+            user_ids = await self.db.list_user_ids_after(cursor, self.BATCH_SIZE)
+            if not user_ids:
+                status = "done"
+                break
+
+            with bulk_sends():
+                results = await asyncio.gather(
+                    *(self._send(user_id, text, semaphore) for user_id in user_ids)
+                )
+
+            failures: list[tuple[int, str]] = []
+            for user_id, reason in zip(user_ids, results):
+                if reason is None:
+                    sent += 1
+                    continue
+                if reason == BLOCKED:
+                    blocked += 1
+                else:
+                    failed += 1
+                failures.append((user_id, reason))
+            cursor = user_ids[-1]
+            await self.db.save_broadcast_progress(
+                broadcast_id, cursor, sent, failed, blocked, failures
+            )
+
+            if time.monotonic() - last_report >= self.PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                await self._report(row, "running", sent, blocked, failed)
+
+        if status is None:
+            logger.info("Broadcast #%d paused at user %d, will resume on restart", broadcast_id, cursor)
+            return
+        await self.db.finish_broadcast(broadcast_id, status)
+        await self._report(row, status, sent, blocked, failed)
+
+    async def _send(self, user_id: int, text: str, semaphore: asyncio.Semaphore) -> Optional[str]:
+        async with semaphore:
+            try:
+                await self.bot.send_message(user_id, text)
+            except TelegramForbiddenError:
+                return BLOCKED
+            except TelegramAPIError as exc:
+                return str(exc)[:200]
+        return None
+
+    async def _report(self, row, status: str, sent: int, blocked: int, failed: int) -> None:
+        if not row["message_id"]:
+            return
+        i18n = locales.for_user(int(row["admin_id"]))
+        text = texts.broadcast_progress_text(
+            i18n, int(row["id"]), status, int(row["total"]), sent, blocked, failed
+        )
+        markup = broadcast_progress_kb(i18n, int(row["id"])) if status == "running" else None
+        try:
+            await self.bot.edit_message_text(
+                text, chat_id=row["chat_id"], message_id=row["message_id"], reply_markup=markup
+            )
+        except TelegramBadRequest as exc:
+            if "message is not modified" not in str(exc):
+                logger.warning("Could not update broadcast progress: %s", exc)
@@ -0,0 +1,192 @@
+import asyncio
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, BinaryIO, Iterator, Optional
+
+from db import Database
+from services.exports import write_csv
+from utils.formatters import (
+    cents_to_amount,
+    parse_amount_to_cents,
+    render_product_card,
+    render_product_label,
+)
+
+PRODUCT_FIELDS = ("title", "description", "price", "content", "category_id", "is_active")
+IMPORT_FORMATS = ("csv", "jsonl")
+CHUNK_SIZE = 2000
+MAX_REPORTED_ERRORS = 20
+
+_TRUE = {"1", "true", "yes", "y", "да"}
+_FALSE = {"0", "false", "no", "n", "нет"}
+
+
+class RowError(ValueError):
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    failed: int = 0
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+    def add_error(self, line: int, code: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, code))
+
+
+def import_format(filename: Optional[str]) -> Optional[str]:
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension == "json":
+        extension = "jsonl"
+    return extension if extension in IMPORT_FORMATS else None
+
+
+def _text(record: dict[str, Any], name: str) -> str:
+    value = record.get(name)
+    text = "" if value is None else str(value).strip()
+    if not text:
+        raise RowError(name)
+    return text
+
+
+def _product_row(record: dict[str, Any], categories: set[int]) -> tuple:
+    title = _text(record, "title")
+    description = _text(record, "description")
+    content = _text(record, "content")
+    try:
+        price_cents = parse_amount_to_cents(str(record.get("price") or ""))
+    except ValueError:
+        raise RowError("price") from None
+
+    category_id = None
+    raw_category = str(record.get("category_id") or "").strip()
+    if raw_category and raw_category != "0":
+        if not raw_category.isdigit() or int(raw_category) not in categories:
+            raise RowError("category_id")
+        category_id = int(raw_category)
+
+    raw_active = record.get("is_active")
+    raw_active = "" if raw_active is None else str(raw_active).strip().lower()
+    if raw_active in _TRUE or raw_active == "":
+        is_active = 1
+    elif raw_active in _FALSE:
+        is_active = 0
+    else:
+        raise RowError("is_active")
+
+    return (
+        title,
+        description,
+        price_cents,
+        content,
+        is_active,
+        category_id,
+        render_product_card(title, description),
+        render_product_label(title, price_cents),
+    )
+
+
+def _decoded_lines(file: BinaryIO) -> Iterator[str]:
+    # Decoded line by line rather than through TextIOWrapper, so a file in the
+    # wrong encoding fails on the line that has the bad bytes, not on a whole
+    # read-ahead block.
+    for line_no, line in enumerate(file, start=1):
+        yield line.decode("utf-8-sig" if line_no == 1 else "utf-8")
+
+
+def _records(file: BinaryIO, fmt: str) -> Iterator[tuple[int, Any]]:
+    """Yield (line, record or RowError) for every row of the file.
+
+    Undecodable bytes and malformed CSV end the file with a single
+    "encoding" / "csv" error: the rows before it are still imported.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(_decoded_lines(file))
+        try:
+            missing = {"title", "description", "price", "content"} - set(reader.fieldnames or ())
+            if missing:
+                yield 1, RowError("header")
+                return
+            for record in reader:
+                yield reader.line_num, record
+        # DictReader.line_num only moves on success; the inner reader's counts
+        # the lines it has consumed, including the one that failed to parse.
+        except UnicodeDecodeError:
+            yield reader.reader.line_num + 1, RowError("encoding")
+        except csv.Error:
+            yield reader.reader.line_num, RowError("csv")
+        return
+    line_no = 0
+    try:
+        for line_no, line in enumerate(_decoded_lines(file), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_no, RowError("json")
+                continue
+            yield line_no, record if isinstance(record, dict) else RowError("json")
+    except UnicodeDecodeError:
+        yield line_no + 1, RowError("encoding")
+
+
+def iter_product_chunks(
+    file: BinaryIO, fmt: str, categories: set[int], chunk_size: int = CHUNK_SIZE
+) -> Iterator[tuple[list[tuple], list[tuple[int, str]]]]:
+    """Parse, validate and render products, yielding (rows, errors) per chunk.
+
+    Runs in a worker thread: every step here is CPU or file bound.
+    """
+    rows: list[tuple] = []
+    errors: list[tuple[int, str]] = []
+    for line_no, record in _records(file, fmt):
+        try:
+            if isinstance(record, RowError):
+                raise record
+            rows.append(_product_row(record, categories))
+        except RowError as exc:
+            errors.append((line_no, exc.code))
+        if len(rows) + len(errors) >= chunk_size:
+            yield rows, errors
+            rows, errors = [], []
+    if rows or errors:
+        yield rows, errors
+
+
+async def import_products(db: Database, file: BinaryIO, fmt: str) -> ImportReport:
+    report = ImportReport()
+    categories = {int(row["id"]) for row in await db.list_categories()}
+    chunks = iter_product_chunks(file, fmt, categories)
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            break
+        rows, errors = chunk
+        for line_no, code in errors:
+            report.add_error(line_no, code)
+        if rows:
+            report.imported += await db.insert_products(rows)
+    return report
+
+
+async def _product_records(db: Database) -> AsyncIterator[tuple]:
+    async for product in db.iter_products():
+        yield (
+            product.title,
+            product.description,
+            cents_to_amount(product.price_cents),
+            product.content,
+            product.category_id or "",
+            int(product.is_active),
+        )
+
+
+async def export_products(db: Database) -> tuple[BinaryIO, int]:
+    return await write_csv(PRODUCT_FIELDS, _product_records(db))
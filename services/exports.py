@@ -0,0 +1,121 @@
+import asyncio
+import csv
+import io
+from tempfile import SpooledTemporaryFile
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    BinaryIO,
+    Optional,
+    Sequence,
+)
+
+from aiogram import Bot
+from aiogram.types.input_file import DEFAULT_CHUNK_SIZE, InputFile
+
+from db import Database
+from utils.formatters import cents_to_amount, format_timestamp
+
+# Exports stay in memory up to this size and roll over to a temp file after it.
+SPOOL_SIZE = 4 * 1024 * 1024
+FLUSH_SIZE = 256 * 1024
+
+
+class SpooledInputFile(InputFile):
+    """Uploads an already written (possibly on-disk) spooled file chunk by chunk."""
+
+    def __init__(self, file: BinaryIO, filename: str, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__(filename=filename, chunk_size=chunk_size)
+        self.file = file
+
+    async def read(self, bot: Bot) -> AsyncGenerator[bytes, None]:
+        await asyncio.to_thread(self.file.seek, 0)
+        while chunk := await asyncio.to_thread(self.file.read, self.chunk_size):
+            yield chunk
+
+
+async def write_csv(
+    header: Sequence[str], rows: AsyncIterable[Sequence[Any]]
+) -> tuple[BinaryIO, int]:
+    """Encode rows into a spooled temp file; returns the file and the row count."""
+    spool = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    count = 0
+    try:
+        async for row in rows:
+            writer.writerow(row)
+            count += 1
+            if buffer.tell() >= FLUSH_SIZE:
+                await asyncio.to_thread(spool.write, buffer.getvalue().encode("utf-8"))
+                buffer.seek(0)
+                buffer.truncate()
+        await asyncio.to_thread(spool.write, buffer.getvalue().encode("utf-8"))
+    except BaseException:
+        spool.close()
+        raise
+    return spool, count
+
+
+# name -> (CSV header, query); *_cents columns are exported as amounts and *_at
+# columns as UTC date-times.
+EXPORTS: dict[str, tuple[tuple[str, ...], str]] = {
+    "orders": (
+        (
+            "id",
+            "user_id",
+            "product_id",
+            "title",
+            "amount",
+            "status",
+            "payment_method",
+            "crypto_invoice_id",
+            "checkout_id",
+            "created_at",
+            "paid_at",
+        ),
+        """
+        SELECT o.id, o.user_id, o.product_id, p.title, o.amount_cents, o.status,
+               o.payment_method, o.crypto_invoice_id, o.checkout_id, o.created_at, o.paid_at
+        FROM orders_all o
+        LEFT JOIN products p ON p.id = o.product_id
+        ORDER BY o.id
+        """,
+    ),
+    "topups": (
+        ("id", "user_id", "amount", "status", "crypto_invoice_id", "created_at", "paid_at"),
+        """
+        SELECT id, user_id, amount_cents, status, crypto_invoice_id, created_at, paid_at
+        FROM topups_all
+        ORDER BY id
+        """,
+    ),
+    "users": (
+        ("id", "username", "full_name", "balance", "created_at"),
+        "SELECT id, username, full_name, balance_cents, created_at FROM users ORDER BY id",
+    ),
+}
+
+
+async def _records(db: Database, sql: str) -> AsyncIterator[list[Any]]:
+    amount_columns: Optional[list[int]] = None
+    time_columns: list[int] = []
+    async for row in db.stream_rows(sql):
+        if amount_columns is None:
+            names = row.keys()
+            amount_columns = [i for i, name in enumerate(names) if name.endswith("_cents")]
+            time_columns = [i for i, name in enumerate(names) if name.endswith("_at")]
+        record = list(row)
+        for i in amount_columns:
+            record[i] = cents_to_amount(int(record[i]))
+        for i in time_columns:
+            record[i] = format_timestamp(record[i])
+        yield record
+
+
+async def export_table(db: Database, name: str) -> tuple[BinaryIO, int]:
+    header, sql = EXPORTS[name]
+    return await write_csv(header, _records(db, sql))
@@ -0,0 +1,21 @@
+import logging
+
+from db import Database
+from services.lifecycle import Lifecycle
+
+logger = logging.getLogger(__name__)
+
+# Crypto invoices expire this much earlier than their reservation, so an invoice
+# can no longer be paid by the time the reaper hands its unit to someone else.
+RESERVATION_GRACE = 60
+
+
+async def reap_reservations(db: Database, lifecycle: Lifecycle, interval: float = 30.0) -> None:
+    while await lifecycle.sleep(interval):
+        try:
+            released = await db.release_expired_reservations()
+        except Exception:
+            logger.exception("Failed to release expired reservations")
+            continue
+        if released:
+            logger.info("Released %d expired reservation(s)", released)
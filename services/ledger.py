@@ -0,0 +1,36 @@
+import logging
+import time
+
+from db import Database
+from services import metrics
+from services.lifecycle import Lifecycle
+
+logger = logging.getLogger(__name__)
+
+
+async def verify_ledger(
+    db: Database, lifecycle: Lifecycle, interval: float = 600.0, full_interval: float = 86400.0
+) -> None:
+    # The first pass is a full one and runs right away, so a restart after a bad
+    # deploy shows up quickly; later passes only check new ledger entries, with a
+    # full scan (which also sees writes that bypassed the ledger) every full_interval.
+    next_full = 0.0
+    drifted: set[int] = set()
+    while True:
+        full = time.monotonic() >= next_full
+        try:
+            mismatches = await db.verify_balance_ledger(full=full)
+        except Exception:
+            logger.exception("Failed to verify the balance ledger")
+        else:
+            found = {user_id for user_id, _, _ in mismatches}
+            if full:
+                next_full = time.monotonic() + full_interval
+                drifted = found
+            metrics.ledger_mismatches.set(len(drifted | found))
+            for user_id, expected, actual in mismatches:
+                logger.error(
+                    "Balance of user %d is %d, ledger says %d", user_id, actual, expected
+                )
+        if not await lifecycle.sleep(interval):
+            return
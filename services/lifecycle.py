@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Coroutine, Any
+
+logger = logging.getLogger(__name__)
+
+
+class Lifecycle:
+    """Tracks in-flight updates and background tasks so shutdown can drain them."""
+
+    def __init__(self, drain_timeout: float = 30.0):
+        self.drain_timeout = drain_timeout
+        self.stopping = asyncio.Event()
+        self._inflight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks: set[asyncio.Task] = set()
+        self._flushers: list[tuple[str, Callable[[], Awaitable[None]]]] = []
+
+    @property
+    def accepting(self) -> bool:
+        return not self.stopping.is_set()
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @asynccontextmanager
+    async def track(self) -> AsyncIterator[None]:
+        self._inflight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._inflight -= 1
+            if self._inflight == 0:
+                self._idle.set()
+
+    def spawn(self, coro: Coroutine[Any, Any, None], name: str) -> asyncio.Task:
+        task = asyncio.create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background task %s failed", task.get_name(), exc_info=task.exception())
+
+    def on_flush(self, name: str, callback: Callable[[], Awaitable[None]]) -> None:
+        self._flushers.append((name, callback))
+
+    async def stop_intake(self) -> None:
+        """Refuse new updates without waiting for the drain (a dispatcher shutdown hook)."""
+        self.stopping.set()
+
+    async def sleep(self, seconds: float) -> bool:
+        """Sleep unless shutdown starts first. Returns False once stopping."""
+        try:
+            await asyncio.wait_for(self.stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            return True
+        return False
+
+    async def shutdown(self) -> None:
+        await self.stop_intake()
+        deadline = time.monotonic() + self.drain_timeout
+
+        if self._inflight:
+            logger.info("Waiting for %d in-flight update(s)", self._inflight)
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Drain deadline exceeded, %d update(s) still running", self._inflight)
+
+        tasks = list(self._tasks)
+        if tasks:
+            remaining = max(0.0, deadline - time.monotonic())
+            _, pending = await asyncio.wait(tasks, timeout=remaining)
+            for task in pending:
+                logger.warning("Cancelling background task %s", task.get_name())
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        for name, callback in self._flushers:
+            try:
+                await callback()
+            except Exception:
+                logger.exception("Flush %s failed", name)
@@ -0,0 +1,69 @@
+import logging
+import time
+
+from db import Database
+from services import metrics
+from services.lifecycle import Lifecycle
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 5.0
+# A checkpoint waits for this much write silence before it runs...
+QUIET_SECONDS = 2.0
+# ...unless the WAL has grown this many times past the threshold.
+FORCE_FACTOR = 4
+OPTIMIZE_INTERVAL = 6 * 3600.0
+
+
+async def run_checkpoint(db: Database, mode: str) -> None:
+    started = time.perf_counter()
+    busy, wal_pages, checkpointed = await db.checkpoint(mode)
+    elapsed = time.perf_counter() - started
+    metrics.db_checkpoint_seconds.observe(elapsed, mode)
+    logger.info(
+        "WAL checkpoint %s: %d/%d pages in %.3fs%s",
+        mode,
+        checkpointed,
+        wal_pages,
+        elapsed,
+        " (busy)" if busy else "",
+    )
+
+
+async def maintain_database(
+    db: Database,
+    lifecycle: Lifecycle,
+    checkpoint_interval: float = 300.0,
+    checkpoint_wal_bytes: int = 4 * 1024 * 1024,
+    poll_interval: float = POLL_INTERVAL,
+) -> None:
+    """Checkpoint the WAL and refresh planner statistics while the bot is idle.
+
+    Without this, SQLite's auto-checkpoint runs inside whichever write happens
+    to cross its threshold, and that handler pays for the whole WAL.
+    """
+    last_checkpoint = last_optimize = time.monotonic()
+    while await lifecycle.sleep(poll_interval):
+        wal_bytes = db.wal_size()
+        metrics.db_wal_bytes.set(wal_bytes)
+        now = time.monotonic()
+        quiet = db.idle_seconds >= QUIET_SECONDS
+        try:
+            if wal_bytes and (
+                wal_bytes >= checkpoint_wal_bytes or now - last_checkpoint >= checkpoint_interval
+            ):
+                if quiet:
+                    # Nobody is writing: also shrink the file back to zero.
+                    await run_checkpoint(db, "TRUNCATE")
+                    last_checkpoint = now
+                elif wal_bytes >= checkpoint_wal_bytes * FORCE_FACTOR:
+                    await run_checkpoint(db, "PASSIVE")
+                    last_checkpoint = now
+            if quiet and now - last_optimize >= OPTIMIZE_INTERVAL:
+                started = time.perf_counter()
+                await db.optimize()
+                last_optimize = now
+                logger.info("PRAGMA optimize took %.3fs", time.perf_counter() - started)
+        except Exception:
+            logger.exception("Database maintenance failed")
+        metrics.db_wal_bytes.set(db.wal_size())
@@ -0,0 +1,286 @@
+import asyncio
+import bisect
+import functools
+import inspect
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import Counter as _Tally
+from typing import Any, Callable, Iterable, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[Any, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: tuple[Any, ...]) -> tuple[Any, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return labels
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[Any, ...], float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        collect: Optional[Callable[[], dict[tuple[Any, ...], float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[Any, ...], float] = {}
+        self._collect = collect
+
+    def set(self, value: float, *labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+    def set_collector(self, collect: Callable[[], dict[tuple[Any, ...], float]]) -> None:
+        self._collect = collect
+
+    def value(self, *labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        values = self._values
+        if self._collect is not None:
+            try:
+                values = self._collect()
+            except Exception:
+                logger.exception("Collector for %s failed", self.name)
+                values = {}
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: dict[tuple[Any, ...], list[int]] = {}
+        self._sums: dict[tuple[Any, ...], float] = {}
+
+    def observe(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * len(self.buckets)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def count(self, *labels: Any) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def samples(self) -> list[str]:
+        lines: list[str] = []
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+updates_total = REGISTRY.register(
+    Counter("bot_updates_total", "Handled updates by event type and handler.", ("event", "handler"))
+)
+update_errors_total = REGISTRY.register(
+    Counter("bot_update_errors_total", "Handler exceptions by handler.", ("event", "handler"))
+)
+update_seconds = REGISTRY.register(
+    Histogram("bot_update_seconds", "Handler latency in seconds.", ("event", "handler"))
+)
+db_query_seconds = REGISTRY.register(
+    Histogram("bot_db_query_seconds", "Database method latency in seconds.", ("method",))
+)
+db_errors_total = REGISTRY.register(
+    Counter("bot_db_errors_total", "Database method exceptions.", ("method",))
+)
+crypto_request_seconds = REGISTRY.register(
+    Histogram("bot_crypto_request_seconds", "Crypto Pay API call latency in seconds.", ("method",))
+)
+crypto_errors_total = REGISTRY.register(
+    Counter("bot_crypto_errors_total", "Crypto Pay API call failures.", ("method",))
+)
+loop_lag_seconds = REGISTRY.register(
+    Gauge("bot_event_loop_lag_seconds", "Last measured event loop scheduling delay.")
+)
+fsm_states = REGISTRY.register(
+    Gauge("bot_fsm_states", "Users currently in each FSM state.", ("state",))
+)
+db_wal_bytes = REGISTRY.register(
+    Gauge("bot_db_wal_bytes", "Size of the SQLite write-ahead log file.")
+)
+db_checkpoint_seconds = REGISTRY.register(
+    Histogram("bot_db_checkpoint_seconds", "WAL checkpoint duration in seconds.", ("mode",))
+)
+ledger_mismatches = REGISTRY.register(
+    Gauge("bot_ledger_mismatches", "Users whose balance disagrees with the ledger.")
+)
+
+
+def instrument_methods(
+    obj: Any,
+    histogram: Histogram,
+    errors: Counter,
+    names: Optional[Iterable[str]] = None,
+    exclude: Iterable[str] = (),
+) -> None:
+    """Wrap public coroutine methods of ``obj`` (or only ``names``) with timing.
+
+    Methods in ``exclude`` are left alone, e.g. connection management and
+    maintenance that would skew a per-query histogram.
+    """
+    wanted = set(names) if names is not None else None
+    skipped = set(exclude)
+    for name, method in inspect.getmembers(obj, inspect.iscoroutinefunction):
+        if name.startswith("_") or name in skipped or (wanted is not None and name not in wanted):
+            continue
+        setattr(obj, name, _timed(method, name, histogram, errors))
+
+
+def _timed(method: Callable, name: str, histogram: Histogram, errors: Counter) -> Callable:
+    @functools.wraps(method)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        except Exception:
+            errors.inc(name)
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - started, name)
+
+    return wrapper
+
+
+def watch_fsm_states(storage: Any) -> None:
+    records = getattr(storage, "storage", None)
+    if records is None:
+        return
+
+    def collect() -> dict[tuple[Any, ...], float]:
+        tally = _Tally(record.state for record in records.values() if record.state)
+        return {(state,): float(count) for state, count in tally.items()}
+
+    fsm_states.set_collector(collect)
+
+
+async def monitor_loop_lag(lifecycle: Any, interval: float = 1.0) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        if not await lifecycle.sleep(interval):
+            return
+        loop_lag_seconds.set(max(0.0, loop.time() - expected))
+
+
+async def start_metrics_server(host: str, port: int, registry: Registry = REGISTRY) -> web.AppRunner:
+    async def handle(_: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Metrics available at http://%s:%d/metrics", host, port)
+    return runner
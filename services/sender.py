@@ -0,0 +1,172 @@
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+BULK = 1
+
+_priority: ContextVar[int] = ContextVar("send_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def bulk_sends() -> Iterator[None]:
+    """Mark Bot calls made inside the block as bulk, so interactive replies go first."""
+    token = _priority.set(BULK)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _Bucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class SendScheduler(BaseRequestMiddleware):
+    """Paces chat-bound Bot API calls with a global and a per-chat token bucket."""
+
+    MAX_TRACKED_CHATS = 10_000
+
+    def __init__(
+        self,
+        global_rate: float = 25.0,
+        chat_rate: float = 1.0,
+        chat_burst: float = 3.0,
+        max_retries: int = 3,
+    ):
+        now = time.monotonic()
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._global = _Bucket(global_rate, max(1.0, global_rate), now)
+        self._chats: dict[Any, _Bucket] = {}
+        self._waiters: list[tuple[int, int, Any, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._pump: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self._closed = False
+
+    @property
+    def pending(self) -> int:
+        return len(self._waiters)
+
+    def pause(self, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, chat_id: Any, priority: int = INTERACTIVE) -> None:
+        if self._closed:
+            raise RuntimeError("Send scheduler is closed")
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((priority, next(self._seq), chat_id, future))
+        self._wakeup.set()
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.create_task(self._run(), name="send-scheduler")
+        await future
+
+    async def close(self) -> None:
+        """Stop the pump and fail sends still queued, so their callers don't hang."""
+        self._closed = True
+        if self._pump is not None and not self._pump.done():
+            self._pump.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._pump
+        waiters, self._waiters = self._waiters, []
+        for *_, future in waiters:
+            if not future.done():
+                future.set_exception(RuntimeError("Send scheduler is closed"))
+        if waiters:
+            logger.warning("Dropped %d queued send(s) on shutdown", len(waiters))
+
+    def _chat_bucket(self, chat_id: Any, now: float) -> _Bucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self.MAX_TRACKED_CHATS:
+                self._prune(now)
+            bucket = self._chats[chat_id] = _Bucket(self.chat_rate, self.chat_burst, now)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        for chat_id, bucket in list(self._chats.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self._chats[chat_id]
+
+    async def _run(self) -> None:
+        while self._waiters:
+            self._wakeup.clear()
+            now = time.monotonic()
+            delay = self._paused_until - now
+            if delay <= 0:
+                delay = self._global.wait_time(now)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            self._waiters = [entry for entry in self._waiters if not entry[3].done()]
+            chosen = None
+            soonest = float("inf")
+            for entry in sorted(self._waiters):
+                wait = self._chat_bucket(entry[2], now).wait_time(now)
+                if wait <= 0:
+                    chosen = entry
+                    break
+                soonest = min(soonest, wait)
+
+            if chosen is None:
+                if not self._waiters:
+                    break
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=soonest)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._waiters.remove(chosen)
+            self._global.tokens -= 1
+            self._chats[chosen[2]].tokens -= 1
+            chosen[3].set_result(None)
+
+    async def __call__(self, make_request, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        attempt = 0
+        while True:
+            await self.acquire(chat_id, _priority.get())
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as exc:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                logger.warning(
+                    "Flood control on %s, retrying in %ss", type(method).__name__, exc.retry_after
+                )
+                self.pause(exc.retry_after)
@@ -1,6 +1,28 @@
 import sys
 from pathlib import Path
+from typing import Awaitable, Callable
+
+import pytest
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+from db import Database  # noqa: E402
+
+
+@pytest.fixture
+def open_db(tmp_path) -> Callable[..., Awaitable[Database]]:
+    """Connects and initialises ``tmp_path / "bot.db"``.
+
+    Tests drive their own event loop with asyncio.run(), so this returns a
+    coroutine function to await inside it rather than an open database.
+    """
+
+    async def open_db(**kwargs) -> Database:
+        db = Database(str(tmp_path / "bot.db"), **kwargs)
+        await db.connect()
+        await db.init()
+        return db
+
+    return open_db
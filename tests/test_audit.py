@@ -0,0 +1,72 @@
+import asyncio
+
+from services.audit import AuditLog
+from services.lifecycle import Lifecycle
+
+
+def test_audit_entries_are_buffered_until_flush(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        audit = AuditLog(db)
+        audit.record(1, "balance_set", "user", 10, 500, 100)
+        audit.record(1, "product_toggle", "product", 3, {"is_active": True}, {"is_active": False})
+        audit.record(2, "balance_add", "user", 10, 100, 300)
+        audit.record(2, "balance_add", "user", 11, 0, 50)
+        before_flush = await db.list_audit()
+        written = await audit.flush()
+        by_admin = await db.list_audit(admin_id=1)
+        by_user = await db.list_audit(user_id=10)
+        await db.close()
+        return before_flush, written, by_admin, by_user, audit.pending
+
+    before_flush, written, by_admin, by_user, pending = asyncio.run(scenario())
+    assert before_flush == []
+    assert written == 4
+    assert pending == 0
+    assert [row["action"] for row in by_admin] == ["product_toggle", "balance_set"]
+    assert [(row["admin_id"], row["before_value"], row["after_value"]) for row in by_user] == [
+        (2, "100", "300"),
+        (1, "500", "100"),
+    ]
+
+
+def test_full_buffer_wakes_the_writer(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        audit = AuditLog(db)
+        audit.BATCH_SIZE = 3
+        audit.FLUSH_INTERVAL = 0.5
+        lifecycle = Lifecycle(drain_timeout=1.0)
+        lifecycle.on_flush("audit", audit.flush)
+        lifecycle.spawn(audit.run(lifecycle), name="audit-writer")
+        for target in range(5):
+            audit.record(1, "balance_add", "user", target, 0, 1)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        flushed_early = len(await db.list_audit())
+        await lifecycle.shutdown()
+        total = len(await db.list_audit())
+        await db.close()
+        return flushed_early, total
+
+    flushed_early, total = asyncio.run(scenario())
+    assert flushed_early >= 3
+    assert total == 5
+
+
+def test_failed_flush_keeps_entries(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        audit = AuditLog(db)
+        audit.record(1, "balance_add", "user", 10, 0, 1)
+        await db.conn.execute("DROP TABLE admin_audit")
+        try:
+            await audit.flush()
+        except Exception:
+            failed = True
+        else:
+            failed = False
+        await db.close()
+        return failed, audit.pending
+
+    assert asyncio.run(scenario()) == (True, 1)
@@ -0,0 +1,65 @@
+import asyncio
+import gzip
+import sqlite3
+
+from services.backup import Backups
+
+
+def test_backup_is_consistent_while_writes_continue(tmp_path, open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        await db.update_balance(1, 5)
+        rows = [(f"Item {n}", "x" * 500, 100, "secret", 1, None, "c", "l") for n in range(3000)]
+        await db.insert_products(rows)
+        backups = Backups(db, str(tmp_path / "backups"), compress=False)
+        stop = asyncio.Event()
+
+        async def writer() -> int:
+            count = 0
+            while not stop.is_set():
+                await db.update_balance(1, 1)
+                count += 1
+                await asyncio.sleep(0)
+            return count
+
+        writes = asyncio.create_task(writer())
+        result = await backups.create()
+        stop.set()
+        await writes
+        await db.close()
+        return result
+
+    result = asyncio.run(scenario())
+    conn = sqlite3.connect(result.path)
+    try:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        assert conn.execute("SELECT COUNT(1) FROM products").fetchone()[0] == 3000
+        (balance,) = conn.execute("SELECT balance_cents FROM users WHERE id = 1").fetchone()
+        (ledger,) = conn.execute("SELECT SUM(delta_cents) FROM balance_ledger").fetchone()
+    finally:
+        conn.close()
+    assert balance == ledger
+    assert result.size == result.path.stat().st_size
+
+
+def test_compressed_backups_are_rotated(tmp_path, open_db) -> None:
+    directory = tmp_path / "backups"
+    directory.mkdir()
+    for name in ("bot-20200101-000000.db.gz", "bot-20200102-000000.db", "other.db"):
+        (directory / name).write_bytes(b"old")
+
+    async def scenario():
+        db = await open_db()
+        backups = Backups(db, str(directory), keep=2, compress=True)
+        result = await backups.create()
+        names = [path.name for path in backups.existing()]
+        await db.close()
+        return result, names
+
+    result, names = asyncio.run(scenario())
+    assert names == ["bot-20200102-000000.db", result.path.name]
+    assert result.path.name.endswith(".db.gz")
+    assert sorted(path.name for path in directory.iterdir()) == sorted([*names, "other.db"])
+    with gzip.open(result.path) as packed:
+        assert packed.read(16) == b"SQLite format 3\x00"
@@ -0,0 +1,57 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+
+from services.broadcast import Broadcaster
+from services.lifecycle import Lifecycle
+
+
+class FakeBot:
+    def __init__(self, blocked: set[int]):
+        self.blocked = blocked
+        self.delivered: list[int] = []
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        if chat_id in self.blocked:
+            raise TelegramForbiddenError(
+                method=SendMessage(chat_id=chat_id, text=text), message="blocked"
+            )
+        self.delivered.append(chat_id)
+        return SimpleNamespace(message_id=1)
+
+    async def edit_message_text(self, *args, **kwargs):
+        return None
+
+
+def test_broadcast_resumes_from_cursor_and_records_blocked(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        for user_id in range(1, 6):
+            await db.add_or_update_user(user_id, f"u{user_id}", "User")
+
+        broadcast_id = await db.create_broadcast(admin_id=1, chat_id=1, text="hi", total=5)
+        await db.save_broadcast_progress(broadcast_id, 2, sent=2, failed=0, blocked=0, failures=[])
+
+        bot = FakeBot(blocked={4})
+        lifecycle = Lifecycle()
+        broadcaster = Broadcaster(bot, db, lifecycle)
+        assert await broadcaster.resume() == 1
+        while broadcaster.active:
+            await asyncio.sleep(0.01)
+
+        row = await db.get_broadcast(broadcast_id)
+        cur = await db.conn.execute(
+            "SELECT user_id, reason FROM broadcast_failures WHERE broadcast_id = ?",
+            (broadcast_id,),
+        )
+        failures = [tuple(r) for r in await cur.fetchall()]
+        await db.close()
+        return bot.delivered, row, failures
+
+    delivered, row, failures = asyncio.run(scenario())
+    assert sorted(delivered) == [3, 5]
+    assert row["status"] == "done"
+    assert (row["sent_count"], row["blocked_count"], row["last_user_id"]) == (4, 1, 5)
+    assert failures == [(4, "blocked")]
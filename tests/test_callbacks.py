@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from aiogram import F
+from aiogram.types import CallbackQuery, User
+
+from utils.callbacks import AdminUserActionCb, CheckCb, PayCb, ProductCb, decode
+
+
+def _query(data: str) -> CallbackQuery:
+    user = User(id=1, is_bot=False, first_name="Test")
+    return CallbackQuery(id="1", from_user=user, chat_instance="c", data=data)
+
+
+def test_pack_round_trip_is_compact() -> None:
+    cb = AdminUserActionCb(action="balance_set", user_id=7_000_000_000, page=12)
+    data = cb.pack()
+    assert decode(data) == cb
+    assert AdminUserActionCb.unpack(data) == cb
+    assert len(data) < 20
+    assert len(CheckCb(kind="topup", internal_id=10**9).pack()) < 12
+
+
+def test_unknown_choice_is_rejected() -> None:
+    with pytest.raises(KeyError):
+        PayCb(method="card", product_id=1).pack()
+
+
+def test_garbage_and_foreign_data_do_not_decode() -> None:
+    assert decode("prod:buy:5") is None
+    assert decode("1:zz:5") is None
+    packed = CheckCb(kind="checkout", internal_id=7).pack()
+    assert decode(packed.replace(":2:", ":-1:")) is None
+    assert decode(packed.replace(":2:", ":3:")) is None
+    with pytest.raises(ValueError):
+        ProductCb.unpack(PayCb(method="crypto", product_id=1).pack())
+
+
+def test_filter_injects_decoded_data_and_applies_rule() -> None:
+    data = PayCb(method="balance", product_id=42).pack()
+    balance = PayCb.filter(F.method == "balance")
+    crypto = PayCb.filter(F.method == "crypto")
+
+    result = asyncio.run(balance(_query(data)))
+    assert result == {"callback_data": PayCb(method="balance", product_id=42)}
+    assert asyncio.run(crypto(_query(data))) is False
+    assert asyncio.run(ProductCb.filter()(_query(data))) is False
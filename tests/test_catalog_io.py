@@ -0,0 +1,123 @@
+import asyncio
+import io
+
+from services.catalog_io import export_products, import_format, import_products
+from services.exports import export_table
+
+
+CSV = (
+    "title,description,price,content,category_id,is_active\n"
+    "Key,Desc,1.50,secret,,1\n"
+    ",Desc,1,secret,,\n"
+    "Guide,\"Line, with comma\",2,pdf,7,\n"
+    "Hidden,Desc,oops,x,,\n"
+    "Off,Desc,3,x,,0\n"
+)
+
+
+def test_import_reports_row_errors_and_round_trips(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        report = await import_products(db, io.BytesIO(CSV.encode()), "csv")
+        file, count = await export_products(db)
+        with file:
+            file.seek(0)
+            exported = file.read().decode()
+        search = await db.search_products("key")
+        await db.close()
+        return report, count, exported, search
+
+    report, count, exported, search = asyncio.run(scenario())
+    assert report.imported == 2
+    assert report.errors == [(3, "title"), (4, "category_id"), (5, "price")]
+    assert count == 2
+    assert exported.splitlines() == [
+        "title,description,price,content,category_id,is_active",
+        "Key,Desc,1.50,secret,,1",
+        "Off,Desc,3.00,x,,0",
+    ]
+    assert [row.title for row in search] == ["Key"]
+
+
+def test_jsonl_import_skips_broken_lines(open_db) -> None:
+    data = (
+        '{"title": "A", "description": "d", "price": 1, "content": "c"}\n'
+        "not json\n"
+        "\n"
+        '{"title": "B", "description": "d", "price": "2.5", "content": "c", "is_active": false}\n'
+    )
+
+    async def scenario():
+        db = await open_db()
+        report = await import_products(db, io.BytesIO(data.encode()), "jsonl")
+        products = await db.list_all_products()
+        await db.close()
+        return report, products
+
+    report, products = asyncio.run(scenario())
+    assert report.errors == [(2, "json")]
+    assert sorted((p.title, p.price_cents, p.is_active) for p in products) == [
+        ("A", 100, True),
+        ("B", 250, False),
+    ]
+
+
+def test_undecodable_and_malformed_files_keep_the_rows_before_them(open_db) -> None:
+    cp1251 = (
+        "title,description,price,content\n"
+        "Key,Desc,1,secret\n"
+        "Ключ,Описание,2,секрет\n"
+        "Other,Desc,3,secret\n"
+    ).encode("cp1251")
+    oversized = (
+        "title,description,price,content\n"
+        "Key,Desc,1,secret\n"
+        f"Big,{'x' * 200_000},2,secret\n"
+    ).encode()
+
+    async def scenario():
+        db = await open_db()
+        encoding = await import_products(db, io.BytesIO(cp1251), "csv")
+        jsonl = await import_products(db, io.BytesIO('{"title": "Ключ"}\n'.encode("cp1251")), "jsonl")
+        malformed = await import_products(db, io.BytesIO(oversized), "csv")
+        await db.close()
+        return encoding, jsonl, malformed
+
+    encoding, jsonl, malformed = asyncio.run(scenario())
+    assert (encoding.imported, encoding.errors) == (1, [(3, "encoding")])
+    assert (jsonl.imported, jsonl.errors) == (0, [(1, "encoding")])
+    assert (malformed.imported, malformed.errors) == (1, [(3, "csv")])
+
+
+def test_import_format_by_extension() -> None:
+    assert import_format("goods.CSV") == "csv"
+    assert import_format("goods.json") == "jsonl"
+    assert import_format("goods.xlsx") is None
+    assert import_format(None) is None
+
+
+def test_table_export_streams_from_a_separate_connection(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "alice", "Alice, Smith")
+        await db.update_balance(1, 1234)
+        await db.create_topup(1, 500, "inv-1", "https://pay")
+        product_id = await db.create_product("Key", "Desc", 199, "secret")
+        for _ in range(1200):
+            await db.create_order(1, product_id, 199, "crypto", "inv", "https://pay")
+        orders, order_count = await export_table(db, "orders")
+        users, user_count = await export_table(db, "users")
+        with orders, users:
+            orders.seek(0)
+            users.seek(0)
+            order_lines = orders.read().decode().splitlines()
+            user_lines = users.read().decode().splitlines()
+        await db.close()
+        return order_count, order_lines, user_count, user_lines
+
+    order_count, order_lines, user_count, user_lines = asyncio.run(scenario())
+    assert order_count == 1200
+    assert len(order_lines) == 1201
+    assert order_lines[1].startswith("1,1,1,Key,1.99,pending,crypto,inv,,")
+    assert user_count == 1
+    assert user_lines[1].startswith('1,alice,"Alice, Smith",12.34,')
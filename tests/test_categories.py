@@ -0,0 +1,24 @@
+from utils.categories import ROOT, CategoryTree
+
+
+def _tree() -> CategoryTree:
+    categories = [
+        {"id": 1, "parent_id": None, "title": "Games"},
+        {"id": 2, "parent_id": 1, "title": "Steam"},
+        {"id": 3, "parent_id": None, "title": "Empty"},
+    ]
+    return CategoryTree(categories, {None: 1, 1: 2, 2: 3})
+
+
+def test_counts_roll_up_into_ancestors() -> None:
+    tree = _tree()
+    assert tree.totals == {ROOT: 6, 1: 5, 2: 3, 3: 0}
+
+
+def test_navigation_hides_empty_categories() -> None:
+    tree = _tree()
+    assert tree.visible_children(ROOT) == ((1, "Games", 5),)
+    assert tree.parent(2) == 1
+    assert tree.parent(1) == ROOT
+    assert tree.parent(ROOT) is None
+    assert [category_id for _, category_id in tree.walk()] == [1, 2, 3]
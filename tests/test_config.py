@@ -1,4 +1,6 @@
-from config import _parse_admin_ids
+import pytest
+
+from config import _parse_admin_ids, _parse_pragmas, load_config
 
 
 def test_parse_admin_ids_skips_invalid_values() -> None:
@@ -7,3 +9,27 @@ def test_parse_admin_ids_skips_invalid_values() -> None:
 
 def test_parse_admin_ids_empty() -> None:
     assert _parse_admin_ids("") == set()
+
+
+def test_parse_pragmas_applies_overrides_to_profile() -> None:
+    pragmas = _parse_pragmas("durable", "cache_size=-32000, temp_store=memory")
+    assert pragmas["synchronous"] == "FULL"
+    assert pragmas["cache_size"] == -32000
+    assert pragmas["temp_store"] == "MEMORY"
+
+
+def test_parse_pragmas_rejects_unknown_settings() -> None:
+    cases = [("turbo", ""), ("fast", "journal_mode=DELETE"), ("fast", "cache_size=1;x")]
+    for profile, overrides in cases:
+        with pytest.raises(RuntimeError):
+            _parse_pragmas(profile, overrides)
+
+
+def test_send_rates_are_clamped_to_positive(monkeypatch) -> None:
+    monkeypatch.setenv("BOT_TOKEN", "x")
+    monkeypatch.setenv("CRYPTO_BOT_TOKEN", "y")
+    monkeypatch.setenv("SEND_GLOBAL_RATE", "0")
+    monkeypatch.setenv("SEND_CHAT_RATE", "-3")
+    config = load_config()
+    assert config.send_global_rate > 0
+    assert config.send_chat_rate > 0
@@ -0,0 +1,504 @@
+import asyncio
+import sqlite3
+
+from db import OutOfStockError
+
+
+def test_settle_topup_credits_balance_once(open_db) -> None:
+    async def scenario() -> tuple[list[bool], int]:
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        topup_id = await db.create_topup(1, 500, "inv-1", "https://pay")
+        results = list(await asyncio.gather(db.settle_topup(topup_id), db.settle_topup(topup_id)))
+        user = await db.get_user(1)
+        await db.close()
+        return results, user.balance_cents
+
+    results, balance = asyncio.run(scenario())
+    assert sorted(results) == [False, True]
+    assert balance == 500
+
+
+def test_purchase_with_balance_never_overdraws(open_db) -> None:
+    async def scenario() -> tuple[list, int]:
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        await db.update_balance(1, 150)
+        product_id = await db.create_product("Item", "Desc", 100, "secret")
+        results = await asyncio.gather(
+            db.purchase_with_balance(1, product_id, 100),
+            db.purchase_with_balance(1, product_id, 100),
+        )
+        user = await db.get_user(1)
+        await db.close()
+        return list(results), user.balance_cents
+
+    results, balance = asyncio.run(scenario())
+    assert results.count(None) == 1
+    assert balance == 50
+
+
+def test_product_render_is_stored_and_backfilled(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        product_id = await db.create_product("<Key>", "a & b", 199, "secret")
+        legacy_id = await db.create_product("Old", "d", 100, "x")
+        await db.conn.execute(
+            "UPDATE products SET card_html = NULL, button_label = NULL WHERE id = ?", (product_id,)
+        )
+        await db.conn.execute(
+            "UPDATE products SET card_html = ? WHERE id = ?",
+            ("🛍️ <b>Old</b>\n📝 d\n💎 Цена: <b>1.00 USDT</b>", legacy_id),
+        )
+        await db.conn.commit()
+        await db.init()
+        product = await db.get_product(product_id)
+        legacy = await db.get_product(legacy_id)
+        await db.close()
+        return product, legacy
+
+    product, legacy = asyncio.run(scenario())
+    assert product.card_html == "🛍️ <b>&lt;Key&gt;</b>\n📝 a &amp; b"
+    assert product.button_label == "🛍️ <Key> - 1.99 USDT"
+    assert legacy.card_html == "🛍️ <b>Old</b>\n📝 d"
+
+
+def test_category_products_use_composite_index(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        games = await db.create_category("Games")
+        steam = await db.create_category("Steam", parent_id=games)
+        first = await db.create_product("A", "d", 100, "c")
+        second = await db.create_product("B", "d", 100, "c")
+        await db.create_product("C", "d", 100, "c")
+        await db.set_product_category(first, steam)
+        await db.set_product_category(second, steam)
+        listed = [row.id for row in await db.list_category_products(steam)]
+        root = [row.id for row in await db.list_category_products(None)]
+        counts = await db.count_active_products_by_category()
+        cur = await db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM products "
+            "WHERE category_id IS ? AND is_active = 1 ORDER BY id DESC LIMIT 8",
+            (steam,),
+        )
+        plan = " ".join(row[3] for row in await cur.fetchall())
+        await db.close()
+        return listed, root, counts, plan, (first, second)
+
+    listed, root, counts, plan, (first, second) = asyncio.run(scenario())
+    assert listed == [second, first]
+    assert len(root) == 1
+    assert counts[None] == 1 and sum(counts.values()) == 3
+    assert "idx_products_category_active_id" in plan
+
+
+def test_product_search_follows_fts_triggers(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        steam = await db.create_product("Steam Gift Card", "Ключ активации", 500, "c")
+        await db.create_product("Netflix", "Подписка на месяц", 900, "c")
+        prefix = [row.id for row in await db.search_products("ste")]
+        cyrillic = [row.id for row in await db.search_products("ключ")]
+        await db.conn.execute("UPDATE products SET title = 'Epic' WHERE id = ?", (steam,))
+        await db.toggle_product(steam, True)
+        renamed = [row.id for row in await db.search_products("steam")]
+        await db.toggle_product(steam, False)
+        hidden = [row.id for row in await db.search_products("epic")]
+        await db.close()
+        return steam, prefix, cyrillic, renamed, hidden
+
+    steam, prefix, cyrillic, renamed, hidden = asyncio.run(scenario())
+    assert prefix == [steam]
+    assert cyrillic == [steam]
+    assert renamed == []
+    assert hidden == []
+
+
+def test_checkout_settles_all_items_once(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        first = await db.create_product("One", "Desc", 100, "one")
+        second = await db.create_product("Two", "Desc", 250, "two")
+        quantities = [await db.add_to_cart(1, first, 2) for _ in range(3)]
+        await db.add_to_cart(1, second, 2)
+        items = [(first, 100), (first, 100), (second, 250)]
+        checkout_id = await db.create_checkout(1, items, "inv-1", "https://pay")
+        cart = await db.get_cart(1)
+        results = await asyncio.gather(
+            db.settle_checkout(checkout_id), db.settle_checkout(checkout_id)
+        )
+        checkout = await db.get_checkout(checkout_id)
+        delivered = await db.list_checkout_items(checkout_id)
+        orders = await db.list_user_orders(1, limit=10)
+        await db.close()
+        return quantities, cart, list(results), checkout, delivered, orders
+
+    quantities, cart, results, checkout, delivered, orders = asyncio.run(scenario())
+    assert quantities == [1, 2, None]
+    assert cart == []
+    assert sorted(results) == [False, True]
+    assert checkout.amount_cents == 450
+    assert checkout.item_count == 3
+    assert [item["content"] for item in delivered] == ["one", "one", "two"]
+    assert {order.status for order in orders} == {"paid"}
+
+
+def test_checkout_with_balance_never_overdraws(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        await db.update_balance(1, 300)
+        product_id = await db.create_product("Item", "Desc", 100, "secret")
+        items = [(product_id, 100), (product_id, 100)]
+        results = await asyncio.gather(
+            db.checkout_with_balance(1, items), db.checkout_with_balance(1, items)
+        )
+        user = await db.get_user(1)
+        await db.close()
+        return list(results), user.balance_cents
+
+    results, balance = asyncio.run(scenario())
+    assert results.count(None) == 1
+    assert balance == 100
+
+
+def test_units_are_claimed_once_under_contention(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        product_id = await db.create_product("Key", "Desc", 100, "static")
+        static_id = await db.create_product("Guide", "Desc", 100, "guide")
+        await db.add_product_units(product_id, [f"KEY-{n}" for n in range(5)])
+        for user_id in range(1, 201):
+            await db.add_or_update_user(user_id, "", "User")
+            await db.update_balance(user_id, 100)
+        results = await asyncio.gather(
+            *(db.purchase_with_balance(user_id, product_id, 100) for user_id in range(1, 201)),
+            return_exceptions=True,
+        )
+        order_ids = [result for result in results if isinstance(result, int)]
+        contents = [await db.get_order_content(order_id) for order_id in order_ids]
+        product = await db.get_product(product_id)
+        cur = await db.conn.execute("SELECT SUM(balance_cents) AS total FROM users")
+        total = (await cur.fetchone())["total"]
+        await db.update_balance(1, 100)
+        static_order = await db.purchase_with_balance(1, static_id, 100)
+        static_content = await db.get_order_content(static_order)
+        await db.close()
+        return results, contents, product.stock, total, static_content
+
+    results, contents, stock, total, static_content = asyncio.run(scenario())
+    assert sum(isinstance(result, OutOfStockError) for result in results) == 195
+    assert sorted(contents) == [f"KEY-{n}" for n in range(5)]
+    assert stock == 0
+    assert total == 195 * 100
+    assert static_content == "guide"
+
+
+def test_expired_reservations_return_units_to_stock(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        product_id = await db.create_product("Key", "Desc", 100, "static")
+        await db.add_product_units(product_id, ["KEY-1"])
+        order_id = await db.create_order(1, product_id, 100, "crypto", "inv-1", "https://pay")
+        reserved = (await db.get_product(product_id)).stock
+        try:
+            await db.create_order(1, product_id, 100, "crypto", "inv-2", "https://pay")
+        except OutOfStockError:
+            sold_out = True
+        released = await db.release_expired_reservations()
+        order = await db.get_order(order_id)
+        product = await db.get_product(product_id)
+        await db.close()
+        return reserved, sold_out, released, order.status, product.stock
+
+    assert asyncio.run(scenario()) == (0, True, 1, "expired", 1)
+
+
+def test_daily_stats_follow_settlements_and_match_rebuild(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        await db.update_balance(1, 1000)
+        first = await db.create_product("One", "Desc", 100, "one")
+        second = await db.create_product("Two", "Desc", 300, "two")
+        await db.purchase_with_balance(1, first, 100)
+        order_id = await db.create_order(1, second, 300, "crypto", "inv-1", "https://pay")
+        await db.set_order_paid(order_id)
+        await db.set_order_paid(order_id)
+        await db.create_order(1, first, 100, "crypto", "inv-2", "https://pay")
+        checkout_id = await db.create_checkout(1, [(first, 100), (second, 300)], "inv-3", "x")
+        await db.settle_checkout(checkout_id)
+        topup_id = await db.create_topup(1, 500, "inv-4", "https://pay")
+        await db.settle_topup(topup_id)
+
+        live = dict(await db.sum_daily_stats("2000-01-01"))
+        live_top = [dict(row) for row in await db.top_products("2000-01-01")]
+        pending = await db.count_pending_orders()
+        await db.rebuild_daily_stats()
+        rebuilt = dict(await db.sum_daily_stats("2000-01-01"))
+        rebuilt_top = [dict(row) for row in await db.top_products("2000-01-01")]
+        await db.close()
+        return live, live_top, pending, rebuilt, rebuilt_top
+
+    live, live_top, pending, rebuilt, rebuilt_top = asyncio.run(scenario())
+    assert live == {
+        "orders_created": 5,
+        "orders_paid": 4,
+        "revenue_cents": 800,
+        "topups_created": 1,
+        "topups_paid": 1,
+        "topup_cents": 500,
+    }
+    assert [(row["title"], row["sold"], row["revenue_cents"]) for row in live_top] == [
+        ("Two", 2, 600),
+        ("One", 2, 200),
+    ]
+    assert pending == 1
+    assert rebuilt == live
+    assert rebuilt_top == live_top
+
+
+def test_iso_timestamps_are_migrated_to_epoch_ms(tmp_path, open_db) -> None:
+    path = tmp_path / "bot.db"
+    legacy = sqlite3.connect(path)
+    legacy.executescript(
+        """
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY, username TEXT, full_name TEXT,
+            balance_cents INTEGER NOT NULL DEFAULT 0, created_at TEXT NOT NULL
+        );
+        CREATE TABLE products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL,
+            description TEXT NOT NULL, price_cents INTEGER NOT NULL, content TEXT NOT NULL,
+            is_active INTEGER NOT NULL DEFAULT 1, created_at TEXT NOT NULL
+        );
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL, amount_cents INTEGER NOT NULL, status TEXT NOT NULL,
+            payment_method TEXT NOT NULL, crypto_invoice_id TEXT, crypto_pay_url TEXT,
+            created_at TEXT NOT NULL, paid_at TEXT,
+            FOREIGN KEY(user_id) REFERENCES users(id),
+            FOREIGN KEY(product_id) REFERENCES products(id)
+        );
+        INSERT INTO users VALUES (1, 'u', 'User', 0, '2024-05-01T12:34:56.123456+00:00');
+        INSERT INTO products VALUES (1, 'Key', 'Desc', 100, 'c', 1, '2024-05-01T00:00:00+00:00');
+        INSERT INTO orders VALUES
+            (1, 1, 1, 100, 'paid', 'balance', NULL, NULL,
+             '2024-05-01T10:00:00+00:00', '2024-05-01T10:00:01.500000+00:00'),
+            (7, 1, 1, 100, 'pending', 'crypto', 'inv', 'url', '2024-05-02T10:00:00+00:00', NULL);
+        DELETE FROM orders WHERE id = 7;
+        """
+    )
+    legacy.commit()
+    legacy.close()
+
+    async def scenario():
+        db = await open_db()
+        user = await db.get_user(1)
+        order = await db.get_order(1)
+        next_order = await db.create_order(1, 1, 100, "crypto", "inv", "url")
+        paid = await db.list_orders_paid_between(1714557600000, 1714557602000)
+        stats = dict(await db.sum_daily_stats("2024-05-01"))
+        await db.close()
+        return user, order, next_order, paid, stats
+
+    user, order, next_order, paid, stats = asyncio.run(scenario())
+    assert user.created_at == 1714566896123
+    assert order.created_at == 1714557600000
+    assert order.paid_at == 1714557601500
+    assert next_order == 8
+    assert [row.id for row in paid] == [1]
+    assert stats["revenue_cents"] == 100
+
+
+def test_paid_range_queries_use_paid_at_index(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        product_id = await db.create_product("Item", "Desc", 100, "secret")
+        first = await db.create_order(1, product_id, 100, "crypto", "inv-1", "url")
+        await db.set_order_paid(first)
+        await db.conn.execute("UPDATE orders SET paid_at = 1000 WHERE id = ?", (first,))
+        second = await db.create_order(1, product_id, 250, "crypto", "inv-2", "url")
+        await db.set_order_paid(second)
+        await db.conn.execute("UPDATE orders SET paid_at = 5000 WHERE id = ?", (second,))
+        await db.conn.commit()
+        in_range = await db.sum_orders_paid_between(0, 2000)
+        everything = await db.sum_orders_paid_between(0, 10_000)
+        cur = await db.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT COUNT(1) FROM orders WHERE paid_at >= 0 AND paid_at < 2000"
+        )
+        plan = " ".join(row["detail"] for row in await cur.fetchall())
+        await db.close()
+        return in_range, everything, plan
+
+    in_range, everything, plan = asyncio.run(scenario())
+    assert in_range == (1, 100)
+    assert everything == (2, 350)
+    assert "idx_orders_paid_at" in plan
+
+
+def test_balance_ledger_follows_every_balance_change(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        product_id = await db.create_product("Item", "Desc", 100, "secret")
+        topup_id = await db.create_topup(1, 500, "inv-1", "url")
+        await db.settle_topup(topup_id)
+        order_id = await db.purchase_with_balance(1, product_id, 100)
+        checkout_id = await db.checkout_with_balance(1, [(product_id, 100), (product_id, 100)])
+        await db.update_balance(1, 50, "admin_add", actor_id=7)
+        await db.set_balance(1, 1000, actor_id=7)
+        entries = await db.list_balance_ledger(1)
+        first = await db.verify_balance_ledger()
+        # Bypass the ledger entirely: no new entries, so only the full scan notices.
+        await db.conn.execute("UPDATE users SET balance_cents = 5 WHERE id = 1")
+        await db.conn.commit()
+        incremental = await db.verify_balance_ledger()
+        second = await db.verify_balance_ledger(full=True)
+        await db.update_balance(1, 10)
+        third = await db.verify_balance_ledger()
+        await db.close()
+        return order_id, checkout_id, topup_id, entries, first, incremental, second, third
+
+    order_id, checkout_id, topup_id, entries, first, incremental, second, third = asyncio.run(
+        scenario()
+    )
+    entries = list(reversed(entries))
+    assert [(e["reason"], e["delta_cents"], e["balance_after_cents"]) for e in entries] == [
+        ("topup", 500, 500),
+        ("purchase", -100, 400),
+        ("checkout", -200, 200),
+        ("admin_add", 50, 250),
+        ("admin_set", 750, 1000),
+    ]
+    assert [e["ref_id"] for e in entries[:3]] == [topup_id, order_id, checkout_id]
+    assert entries[-1]["actor_id"] == 7
+    assert first == []
+    assert incremental == []
+    assert second == [(1, 1000, 5)]
+    assert third == [(1, 1010, 15)]
+
+
+def test_existing_balances_get_opening_ledger_entries(tmp_path, open_db) -> None:
+    path = tmp_path / "bot.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY,
+            username TEXT,
+            full_name TEXT,
+            balance_cents INTEGER NOT NULL DEFAULT 0,
+            created_at INTEGER NOT NULL
+        );
+        INSERT INTO users VALUES (1, 'a', 'A', 700, 0), (2, 'b', 'B', 0, 0);
+        """
+    )
+    conn.close()
+
+    async def scenario():
+        db = await open_db()
+        entries = await db.list_balance_ledger(1)
+        empty = await db.list_balance_ledger(2)
+        mismatches = await db.verify_balance_ledger(full=True)
+        await db.close()
+        return entries, empty, mismatches
+
+    entries, empty, mismatches = asyncio.run(scenario())
+    assert [(e["reason"], e["delta_cents"]) for e in entries] == [("opening", 700)]
+    assert empty == []
+    assert mismatches == []
+
+
+def test_truncate_checkpoint_empties_the_wal(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        for n in range(50):
+            await db.update_balance(1, n + 1)
+        grown = db.wal_size()
+        busy, wal_pages, checkpointed = await db.checkpoint("TRUNCATE")
+        after = db.wal_size()
+        await db.optimize()
+        user = await db.get_user(1)
+        await db.close()
+        return grown, busy, wal_pages, checkpointed, after, user.balance_cents
+
+    grown, busy, wal_pages, checkpointed, after, balance = asyncio.run(scenario())
+    assert grown > 0
+    assert (busy, wal_pages, checkpointed) == (0, 0, 0)
+    assert after == 0
+    assert balance == sum(range(1, 51))
+
+
+def test_pragma_profile_applies_to_every_connection(open_db) -> None:
+    pragmas = {"synchronous": "NORMAL", "cache_size": -8000, "temp_store": "MEMORY"}
+
+    async def scenario():
+        db = await open_db(pragmas=pragmas)
+        report = await db.pragma_report()
+        async with db.reader() as conn:
+            cur = await conn.execute("PRAGMA cache_size")
+            reader_cache = (await cur.fetchone())[0]
+        await db.close()
+        return report, reader_cache
+
+    report, reader_cache = asyncio.run(scenario())
+    assert report["journal_mode"] == "wal"
+    assert report["synchronous"] == 1
+    assert report["cache_size"] == -8000
+    assert report["temp_store"] == 2
+    assert reader_cache == -8000
+
+
+def test_archived_rows_stay_visible_in_history(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        await db.update_balance(1, 10_000)
+        static = await db.create_product("Static", "Desc", 100, "static")
+        unit = await db.create_product("Unit", "Desc", 100, "")
+        await db.add_product_units(unit, ["k1", "k2", "k3"])
+        ids = [await db.purchase_with_balance(1, static, 100) for _ in range(4)]
+        ids.append(await db.purchase_with_balance(1, unit, 100))
+        pending = await db.create_order(1, unit, 100, "crypto", "inv", "url", reservation_ttl=600)
+        topup = await db.create_topup(1, 500, "inv-t", "url")
+        await db.settle_topup(topup)
+        ids.append(await db.purchase_with_balance(1, static, 100))
+        # Everything but the last order is old enough to archive.
+        await db.conn.execute("UPDATE orders SET created_at = 1000 WHERE id != ?", (ids[-1],))
+        await db.conn.execute("UPDATE topups SET created_at = 1000")
+        await db.conn.commit()
+        moved = await db.archive_settled(before_ms=5000, batch_size=2)
+        cur = await db.conn.execute("SELECT id FROM orders ORDER BY id")
+        hot = [row["id"] for row in await cur.fetchall()]
+        first = await db.list_user_orders(1, limit=3)
+        second = await db.list_user_orders(1, limit=3, before_id=first[-1].id)
+        content = await db.get_order_content(ids[4])
+        count = await db.count_orders(1)
+        stock = (await db.get_product(unit)).stock
+        topups = await db.list_user_topups(1)
+        paid = await db.sum_orders_paid_between(0, 2**62)
+        await db.rebuild_daily_stats()
+        stats = await db.sum_daily_stats("1970-01-01")
+        await db.close()
+        return ids, pending, moved, hot, first, second, content, count, stock, topups, paid, stats
+
+    ids, pending, moved, hot, first, second, content, count, stock, topups, paid, stats = (
+        asyncio.run(scenario())
+    )
+    assert moved == (5, 1)
+    assert hot == sorted([pending, ids[-1]])
+    all_ids = sorted([*ids, pending], reverse=True)
+    assert [row.id for row in first] == all_ids[:3]
+    assert [row.id for row in second] == all_ids[3:6]
+    assert content == "k1"
+    assert count == 6
+    assert stock == 1
+    assert [row.status for row in topups] == ["paid"]
+    assert paid == (6, 600)
+    assert stats["orders_paid"] == 6
+    assert stats["topups_paid"] == 1
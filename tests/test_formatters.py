@@ -1,6 +1,26 @@
 import pytest
 
+from models import Product
 from utils.formatters import cents_to_amount, parse_amount_to_cents, format_product
+from utils.i18n import locales
+
+
+def _product(**fields) -> Product:
+    values = dict(
+        id=1,
+        title="x",
+        description="y",
+        price_cents=1,
+        content="c",
+        is_active=True,
+        created_at=0,
+        card_html=None,
+        button_label=None,
+        category_id=None,
+        stock=None,
+    )
+    values.update(fields)
+    return Product(**values)
 
 
 def test_parse_amount_to_cents_accepts_comma_and_rounds() -> None:
@@ -17,12 +37,18 @@ def test_cents_to_amount_formats_two_digits() -> None:
 
 
 def test_format_product_escapes_html() -> None:
-    product = {
-        "title": "<script>",
-        "description": "desc & more",
-        "price_cents": 199,
-    }
-    text = format_product(product)
+    product = _product(title="<script>", description="desc & more", price_cents=199)
+    text = format_product(product, locales.get("ru"))
     assert "&lt;script&gt;" in text
     assert "desc &amp; more" in text
-    assert "1.99 USDT" in text
+    assert "Цена: <b>1.99 USDT</b>" in text
+
+
+def test_cents_to_amount_is_exact_for_large_and_negative_values() -> None:
+    assert cents_to_amount(123456789012345678) == "1234567890123456.78"
+    assert cents_to_amount(-5) == "-0.05"
+
+
+def test_format_product_prefers_stored_card() -> None:
+    product = _product(card_html="<b>ready</b>", price_cents=250)
+    assert format_product(product, locales.get("en")) == "<b>ready</b>\n💎 Price: <b>2.50 USDT</b>"
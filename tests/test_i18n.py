@@ -0,0 +1,47 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from utils.i18n import Locales, MenuButton, compile_template, locales
+
+
+def test_compiled_template_formats_fields_and_escaped_braces() -> None:
+    assert compile_template("{{x}} {name}: {value:>3}")(name="a", value=7) == "{x} a:   7"
+    static = compile_template("plain")
+    assert static() == "plain"
+
+
+def test_all_locales_define_the_same_keys() -> None:
+    base = set(locales.default._templates)
+    for translator in locales.translators.values():
+        assert set(translator._templates) == base
+
+
+def test_language_code_resolution_and_user_cache() -> None:
+    assert locales.get("en-US").locale == "en"
+    assert locales.get("de").locale == "ru"
+    assert locales.for_user(1, "en").locale == "en"
+    assert locales.for_user(1).locale == "en"
+    assert locales.for_user(2).locale == "ru"
+
+
+def test_menu_button_matches_every_locale_and_alias() -> None:
+    button = MenuButton("catalog")
+
+    def matches(text: str) -> bool:
+        return asyncio.run(button(SimpleNamespace(text=text)))
+
+    assert matches("🛍️ Каталог")
+    assert matches("Каталог")
+    assert matches(locales.get("en")("menu.catalog"))
+    assert not matches("👤 Личный кабинет")
+
+
+def test_duplicate_menu_text_is_rejected(tmp_path) -> None:
+    (tmp_path / "ru.json").write_text(
+        json.dumps({"menu": {"a": "X", "b": "X"}}), encoding="utf-8"
+    )
+    with pytest.raises(RuntimeError):
+        Locales(tmp_path)
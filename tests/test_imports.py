@@ -6,9 +6,27 @@ def test_entrypoint_and_packages_importable() -> None:
         "main",
         "handlers.common",
         "handlers.user",
+        "handlers.cart",
         "handlers.admin",
+        "handlers.inline",
         "keyboards.inline",
         "utils.texts",
+        "services.lifecycle",
+        "services.metrics",
+        "services.sender",
+        "services.broadcast",
+        "services.inventory",
+        "services.exports",
+        "services.catalog_io",
+        "services.ledger",
+        "services.audit",
+        "services.maintenance",
+        "services.backup",
+        "services.archive",
+        "utils.locks",
+        "utils.render_cache",
+        "utils.i18n",
+        "utils.categories",
     ]
     for module_name in modules:
         importlib.import_module(module_name)
@@ -0,0 +1,36 @@
+import asyncio
+
+from handlers.inline import inline_results, normalize_query
+from utils.i18n import locales
+
+
+def test_normalize_query_collapses_case_and_whitespace() -> None:
+    assert normalize_query("  Steam   GIFT ") == "steam gift"
+
+
+def test_inline_results_are_cached_per_catalog_version(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.create_product("Steam", "Gift card", 500, "c")
+        calls = 0
+        search = db.search_products
+
+        async def counting_search(query, limit=20):
+            nonlocal calls
+            calls += 1
+            return await search(query, limit)
+
+        db.search_products = counting_search
+        i18n = locales.default
+        first = await inline_results(db, i18n, "shop_bot", "steam")
+        second = await inline_results(db, i18n, "shop_bot", " STEAM ")
+        await db.create_product("Steam 2", "Gift card", 700, "c")
+        third = await inline_results(db, i18n, "shop_bot", "steam")
+        await db.close()
+        return calls, first, second, third
+
+    calls, first, second, third = asyncio.run(scenario())
+    assert second is first
+    assert calls == 2
+    assert len(third) == 2
+    assert first[0].reply_markup.inline_keyboard[0][0].url == "https://t.me/shop_bot?start=p1"
@@ -0,0 +1,23 @@
+from keyboards.inline import product_view_kb, profile_kb, topup_amounts_kb
+from keyboards.reply import main_menu
+from utils.i18n import locales
+
+RU = locales.get("ru")
+EN = locales.get("en")
+
+
+def test_static_keyboards_are_built_once() -> None:
+    assert profile_kb(RU) is profile_kb(RU)
+    assert topup_amounts_kb(RU, (5, 10)) is topup_amounts_kb(RU, (5, 10))
+    assert main_menu(RU, True) is main_menu(RU, True)
+    assert main_menu(RU, True) is not main_menu(RU, False)
+
+
+def test_parameterized_keyboards_are_cached_per_arguments() -> None:
+    assert product_view_kb(RU, 1, 0) is product_view_kb(RU, 1, 0)
+    assert product_view_kb(RU, 1, 0) is not product_view_kb(RU, 2, 0)
+
+
+def test_keyboards_are_cached_per_locale() -> None:
+    assert main_menu(EN, False) is main_menu(EN, False)
+    assert main_menu(EN, False).keyboard[0][0].text != main_menu(RU, False).keyboard[0][0].text
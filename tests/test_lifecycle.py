@@ -0,0 +1,72 @@
+import asyncio
+
+from aiogram import Dispatcher
+
+from middlewares import InFlightMiddleware
+from services.lifecycle import Lifecycle
+
+
+def test_shutdown_waits_for_inflight_and_runs_flushers_last() -> None:
+    events: list[str] = []
+
+    async def scenario() -> None:
+        lifecycle = Lifecycle(drain_timeout=1.0)
+
+        async def handler() -> None:
+            async with lifecycle.track():
+                await asyncio.sleep(0.05)
+                events.append("handler")
+
+        async def flush() -> None:
+            events.append("flush")
+
+        lifecycle.on_flush("test", flush)
+        task = asyncio.create_task(handler())
+        await asyncio.sleep(0)
+        await lifecycle.shutdown()
+        await task
+        assert not lifecycle.accepting
+
+    asyncio.run(scenario())
+    assert events == ["handler", "flush"]
+
+
+def test_shutdown_cancels_background_tasks_after_deadline() -> None:
+    async def scenario() -> bool:
+        lifecycle = Lifecycle(drain_timeout=0.05)
+        task = lifecycle.spawn(asyncio.sleep(10), name="stuck")
+        await lifecycle.shutdown()
+        return task.cancelled()
+
+    assert asyncio.run(scenario())
+
+
+def test_sleep_returns_false_once_stopping() -> None:
+    async def scenario() -> list[bool]:
+        lifecycle = Lifecycle()
+        first = await lifecycle.sleep(0)
+        lifecycle.stopping.set()
+        second = await lifecycle.sleep(10)
+        return [first, second]
+
+    assert asyncio.run(scenario()) == [True, False]
+
+
+def test_dispatcher_shutdown_stops_intake_before_the_drain() -> None:
+    handled: list[str] = []
+
+    async def handler(event, data) -> None:
+        handled.append(event)
+
+    async def scenario() -> None:
+        lifecycle = Lifecycle()
+        middleware = InFlightMiddleware(lifecycle)
+        dp = Dispatcher()
+        dp.shutdown.register(lifecycle.stop_intake)
+        await middleware(handler, "before", {})
+        await dp.emit_shutdown()
+        await middleware(handler, "after", {})
+        assert not lifecycle.accepting
+
+    asyncio.run(scenario())
+    assert handled == ["before"]
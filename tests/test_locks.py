@@ -0,0 +1,45 @@
+import asyncio
+
+from utils.locks import KeyedLocks
+
+
+def test_duplicate_holder_is_rejected_without_waiting() -> None:
+    async def scenario() -> list[bool]:
+        locks = KeyedLocks()
+        results: list[bool] = []
+        release = asyncio.Event()
+
+        async def first() -> None:
+            async with locks.hold((1, "pay"), wait=False) as acquired:
+                results.append(acquired)
+                await release.wait()
+
+        task = asyncio.create_task(first())
+        await asyncio.sleep(0)
+        async with locks.hold((1, "pay"), wait=False) as acquired:
+            results.append(acquired)
+        async with locks.hold((2, "pay"), wait=False) as acquired:
+            results.append(acquired)
+        release.set()
+        await task
+        assert len(locks) == 0
+        return results
+
+    assert asyncio.run(scenario()) == [True, False, True]
+
+
+def test_waiting_holders_are_serialized() -> None:
+    async def scenario() -> list[str]:
+        locks = KeyedLocks()
+        events: list[str] = []
+
+        async def worker(name: str) -> None:
+            async with locks.hold("key"):
+                events.append(f"{name}:in")
+                await asyncio.sleep(0.01)
+                events.append(f"{name}:out")
+
+        await asyncio.gather(worker("a"), worker("b"))
+        return events
+
+    assert asyncio.run(scenario()) == ["a:in", "a:out", "b:in", "b:out"]
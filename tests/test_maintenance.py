@@ -0,0 +1,28 @@
+import asyncio
+
+from services import metrics
+from services.lifecycle import Lifecycle
+from services.maintenance import maintain_database
+
+
+def test_maintenance_checkpoints_once_writes_go_quiet(open_db, monkeypatch) -> None:
+    monkeypatch.setattr("services.maintenance.QUIET_SECONDS", 0.05)
+
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "user", "User")
+        lifecycle = Lifecycle(drain_timeout=1.0)
+        lifecycle.spawn(
+            maintain_database(db, lifecycle, checkpoint_wal_bytes=1, poll_interval=0.02),
+            name="db-maintenance",
+        )
+        await asyncio.sleep(0.2)
+        wal_after = db.wal_size()
+        await lifecycle.shutdown()
+        await db.close()
+        return wal_after
+
+    checkpoints_before = metrics.db_checkpoint_seconds.count("TRUNCATE")
+    assert asyncio.run(scenario()) == 0
+    assert metrics.db_checkpoint_seconds.count("TRUNCATE") > checkpoints_before
+    assert metrics.db_wal_bytes.value() == 0
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from services.metrics import Counter, Histogram, Registry, instrument_methods
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    registry = Registry()
+    hist = registry.register(Histogram("op_seconds", "Op latency.", ("op",), buckets=(0.1, 1.0)))
+    hist.observe(0.05, "read")
+    hist.observe(0.5, "read")
+    hist.observe(5, "read")
+
+    text = registry.render()
+    assert 'op_seconds_bucket{op="read",le="0.1"} 1' in text
+    assert 'op_seconds_bucket{op="read",le="1"} 2' in text
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 3' in text
+    assert 'op_seconds_count{op="read"} 3' in text
+
+
+def test_instrument_methods_times_calls_and_counts_errors() -> None:
+    class Service:
+        async def ok(self) -> int:
+            return 1
+
+        async def fail(self) -> None:
+            raise RuntimeError("boom")
+
+    hist = Histogram("svc_seconds", "Service latency.", ("method",))
+    errors = Counter("svc_errors_total", "Service errors.", ("method",))
+    service = Service()
+    instrument_methods(service, hist, errors)
+
+    assert asyncio.run(service.ok()) == 1
+    with pytest.raises(RuntimeError):
+        asyncio.run(service.fail())
+
+    assert hist.count("ok") == 1
+    assert hist.count("fail") == 1
+    assert errors.value("fail") == 1
+    assert errors.value("ok") == 0
+
+
+def test_instrument_methods_leaves_excluded_methods_alone() -> None:
+    class Service:
+        async def query(self) -> None:
+            pass
+
+        async def close(self) -> None:
+            pass
+
+    hist = Histogram("svc_seconds", "Service latency.", ("method",))
+    errors = Counter("svc_errors_total", "Service errors.", ("method",))
+    service = Service()
+    instrument_methods(service, hist, errors, exclude=("close",))
+    asyncio.run(service.query())
+    asyncio.run(service.close())
+
+    assert hist.count("query") == 1
+    assert hist.count("close") == 0
@@ -0,0 +1,31 @@
+import dataclasses
+import sqlite3
+
+import pytest
+
+from models import Order, Product, columns, row_factory
+
+
+def test_row_factory_builds_typed_records() -> None:
+    conn = sqlite3.connect(":memory:")
+    conn.execute(
+        "CREATE TABLE products (id INTEGER PRIMARY KEY, title TEXT, description TEXT, "
+        "price_cents INTEGER, content TEXT, is_active INTEGER, created_at INTEGER, "
+        "card_html TEXT, button_label TEXT, category_id INTEGER, stock INTEGER)"
+    )
+    conn.execute("INSERT INTO products VALUES (7, 't', 'd', 150, 'c', 0, 1, NULL, 'l', NULL, 3)")
+    conn.row_factory = row_factory(Product)
+    product = conn.execute(f"SELECT {columns(Product)} FROM products").fetchone()
+    conn.close()
+
+    assert product.id == 7
+    assert product.is_active is False
+    assert product.stock == 3
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        product.stock = 2
+    assert not hasattr(product, "__dict__")
+
+
+def test_columns_skip_joined_fields() -> None:
+    assert columns(Order, "o").startswith("o.id, o.user_id, ")
+    assert "title" not in columns(Order)
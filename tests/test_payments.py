@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+from handlers.user import check_invoice
+from utils.callbacks import CheckCb
+from utils.i18n import locales
+
+
+class FakeCallback:
+    def __init__(self, user_id: int):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.message = SimpleNamespace(answer=self._send)
+        self.sent: list[str] = []
+        self.answers: list[str] = []
+
+    async def _send(self, text, **kwargs):
+        self.sent.append(text)
+
+    async def answer(self, text=None, **kwargs):
+        self.answers.append(text)
+
+
+class PaidInvoices:
+    async def get_invoice(self, invoice_id):
+        return {"invoice_id": invoice_id, "status": "paid"}
+
+
+class ReapedWhileFetching(PaidInvoices):
+    """The reaper runs while the invoice request is in flight."""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def get_invoice(self, invoice_id):
+        await self.db.release_expired_reservations()
+        return await super().get_invoice(invoice_id)
+
+
+async def _check(db, kind: str, internal_id: int, crypto=None) -> FakeCallback:
+    callback = FakeCallback(1)
+    await check_invoice(
+        callback,
+        CheckCb(kind=kind, internal_id=internal_id),
+        db,
+        crypto or PaidInvoices(),
+        locales.get("en"),
+    )
+    return callback
+
+
+def test_paid_orders_reaped_before_the_check_are_still_settled(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        for user_id in (1, 2):
+            await db.add_or_update_user(user_id, f"u{user_id}", "User")
+        await db.update_balance(2, 1000)
+        restocked = await db.create_product("Key", "d", 100, "static")
+        await db.add_product_units(restocked, ["KEY-1"])
+        sold_out = await db.create_product("Rare", "d", 300, "static")
+        await db.add_product_units(sold_out, ["RARE-1", "RARE-2"])
+
+        # Paid just before the invoice expired, checked after the reaper ran.
+        delivered = await db.create_order(1, restocked, 100, "crypto", "inv-1", "url")
+        refunded = await db.create_order(1, sold_out, 300, "crypto", "inv-2", "url")
+        checkout = await db.create_checkout(1, [(sold_out, 300)], "inv-3", "url")
+        await db.release_expired_reservations()
+        # Meanwhile someone else buys every unit of the second product.
+        await db.purchase_with_balance(2, sold_out, 300)
+        await db.purchase_with_balance(2, sold_out, 300)
+
+        first = await _check(db, "order", delivered)
+        second = await _check(db, "order", refunded)
+        third = await _check(db, "checkout", checkout)
+        again = await _check(db, "order", refunded)
+        statuses = [(await db.get_order(order_id)).status for order_id in (delivered, refunded)]
+        balance = (await db.get_user(1)).balance_cents
+        ledger = [(e["reason"], e["delta_cents"]) for e in await db.list_balance_ledger(1)]
+        mismatches = await db.verify_balance_ledger(full=True)
+        await db.close()
+        return first, second, third, again, statuses, balance, ledger, mismatches
+
+    first, second, third, again, statuses, balance, ledger, mismatches = asyncio.run(scenario())
+    assert "KEY-1" in first.sent[0]
+    assert "3.00 USDT" in second.sent[0]
+    assert "3.00 USDT" in third.sent[0] and "6.00 USDT" in third.sent[0]
+    assert again.sent == [] and again.answers == [locales.get("en")("payment.order_already_paid")]
+    assert statuses == ["paid", "refunded"]
+    assert balance == 600
+    assert ledger == [("checkout_refund", 300), ("refund", 300)]
+    assert mismatches == []
+
+
+def test_orders_reaped_during_the_invoice_request_are_settled(open_db) -> None:
+    async def scenario():
+        db = await open_db()
+        await db.add_or_update_user(1, "u1", "User")
+        product_id = await db.create_product("Key", "d", 100, "static")
+        await db.add_product_units(product_id, ["KEY-1", "KEY-2"])
+        order_id = await db.create_order(1, product_id, 100, "crypto", "inv-1", "url")
+        checkout_id = await db.create_checkout(1, [(product_id, 100)], "inv-2", "url")
+        order = await _check(db, "order", order_id, ReapedWhileFetching(db))
+        checkout = await _check(db, "checkout", checkout_id, ReapedWhileFetching(db))
+        status = (await db.get_order(order_id)).status
+        await db.close()
+        return order, checkout, status
+
+    order, checkout, status = asyncio.run(scenario())
+    assert "KEY-" in order.sent[0]
+    assert "KEY-" in checkout.sent[0]
+    assert order.answers == checkout.answers == [locales.get("en")("payment.confirmed")]
+    assert status == "paid"
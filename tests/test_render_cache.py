@@ -0,0 +1,22 @@
+from utils.render_cache import RenderCache
+
+
+def test_version_bump_invalidates_and_stale_puts_are_ignored() -> None:
+    cache = RenderCache()
+    cache.put(("page", 0), 1, "v1")
+    assert cache.get(("page", 0), 1) == "v1"
+
+    assert cache.get(("page", 0), 2) is None
+    cache.put(("page", 0), 1, "stale")
+    assert cache.get(("page", 0), 2) is None
+
+
+def test_cache_is_bounded_lru() -> None:
+    cache = RenderCache(maxsize=2)
+    cache.put("a", 0, 1)
+    cache.put("b", 0, 2)
+    cache.get("a", 0)
+    cache.put("c", 0, 3)
+    assert cache.get("a", 0) == 1
+    assert cache.get("b", 0) is None
+    assert len(cache) == 2
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from services.sender import BULK, INTERACTIVE, SendScheduler, bulk_sends
+
+
+def test_interactive_sends_jump_ahead_of_bulk() -> None:
+    async def scenario() -> list[str]:
+        scheduler = SendScheduler(global_rate=50.0, chat_rate=100.0, chat_burst=100.0)
+        scheduler._global.tokens = 0
+        order: list[str] = []
+
+        async def send(name: str, priority: int) -> None:
+            await scheduler.acquire(hash(name), priority)
+            order.append(name)
+
+        tasks = [asyncio.create_task(send(f"bulk{i}", BULK)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(send("reply", INTERACTIVE)))
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario())[0] == "reply"
+
+
+def test_per_chat_budget_spaces_sends() -> None:
+    async def scenario() -> float:
+        scheduler = SendScheduler(global_rate=1000.0, chat_rate=20.0, chat_burst=1.0)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(3):
+            await scheduler.acquire(42)
+        return loop.time() - started
+
+    assert asyncio.run(scenario()) >= 0.09
+
+
+def test_retry_after_is_honored() -> None:
+    calls: list[float] = []
+
+    async def scenario() -> str:
+        scheduler = SendScheduler(global_rate=1000.0, chat_rate=1000.0)
+        method = SendMessage(chat_id=1, text="hi")
+        loop = asyncio.get_running_loop()
+
+        async def make_request(bot, m):
+            calls.append(loop.time())
+            if len(calls) == 1:
+                raise TelegramRetryAfter(method=m, message="flood", retry_after=0.05)
+            return "ok"
+
+        with bulk_sends():
+            return await scheduler(make_request, None, method)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.04
+
+
+def test_close_fails_queued_sends() -> None:
+    async def scenario() -> tuple[list, int]:
+        scheduler = SendScheduler(global_rate=1000.0, chat_rate=1000.0)
+        scheduler.pause(60)
+        queued = [asyncio.create_task(scheduler.acquire(chat)) for chat in (1, 2)]
+        await asyncio.sleep(0)
+        await scheduler.close()
+        results = await asyncio.gather(*queued, return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await scheduler.acquire(3)
+        return results, scheduler.pending
+
+    results, pending = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert pending == 0
@@ -1,45 +1,231 @@
-﻿from aiogram.filters.callback_data import CallbackData
-
-
-class ProductCb(CallbackData, prefix="prod"):
-    action: str
-    product_id: int
-
-
-class CatalogPageCb(CallbackData, prefix="cat"):
-    page: int
-
-
-class CatalogItemCb(CallbackData, prefix="cati"):
-    product_id: int
-    page: int
-
-
-class PayCb(CallbackData, prefix="pay"):
-    method: str
-    product_id: int
-
-
-class CheckCb(CallbackData, prefix="check"):
-    kind: str  # order | topup
-    invoice_id: str
+﻿from functools import lru_cache
+from typing import Any, Callable, Literal, Optional, get_args, get_origin, get_type_hints
+
+from aiogram.filters import Filter
+from aiogram.types import CallbackQuery
+from magic_filter import MagicFilter
+
+SEP = ":"
+MAX_BYTES = 64
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+_REGISTRY: dict[str, type["CompactCallback"]] = {}
+
+
+def to_base36(value: int) -> str:
+    if value < 0:
+        return "-" + to_base36(-value)
+    if value < 36:
+        return _DIGITS[value]
+    chars = []
+    while value:
+        value, rest = divmod(value, 36)
+        chars.append(_DIGITS[rest])
+    return "".join(reversed(chars))
+
+
+def _codec(annotation: Any) -> tuple[Callable[[Any], str], Callable[[str], Any]]:
+    if annotation is int:
+        return (lambda value: to_base36(int(value))), (lambda raw: int(raw, 36))
+    if get_origin(annotation) is Literal:
+        choices = get_args(annotation)
+        index = {choice: to_base36(i) for i, choice in enumerate(choices)}
+
+        def decode(raw: str) -> Any:
+            position = int(raw, 36)
+            # choices[-1] would silently accept a forged negative index.
+            if not 0 <= position < len(choices):
+                raise ValueError(f"Unknown choice index {raw!r}")
+            return choices[position]
+
+        return index.__getitem__, decode
+    if annotation is str:
+        def encode(value: str) -> str:
+            if SEP in value:
+                raise ValueError(f"Separator {SEP!r} is not allowed in callback values")
+            return value
+
+        return encode, str
+    raise TypeError(f"Unsupported callback field type: {annotation!r}")
+
+
+class _CompactMeta(type):
+    def __new__(mcs, name, bases, namespace, tag: Optional[int] = None):
+        if tag is None:
+            namespace.setdefault("__slots__", ())
+            return super().__new__(mcs, name, bases, namespace)
+
+        fields = tuple(namespace.get("__annotations__", {}))
+        defaults = {field: namespace.pop(field) for field in fields if field in namespace}
+        namespace["__slots__"] = fields
+        cls = super().__new__(mcs, name, bases, namespace)
+
+        hints = get_type_hints(cls)
+        codecs = [_codec(hints[field]) for field in fields]
+        cls._fields = fields
+        cls._defaults = defaults
+        cls._encoders = tuple(encode for encode, _ in codecs)
+        cls._decoders = tuple(decode for _, decode in codecs)
+        cls._tag = to_base36(tag)
+        cls._prefix = cls._tag + SEP
+        if cls._tag in _REGISTRY:
+            raise ValueError(f"Callback tag {tag} is already used by {_REGISTRY[cls._tag].__name__}")
+        _REGISTRY[cls._tag] = cls
+        return cls
+
+    def __init__(cls, name, bases, namespace, tag: Optional[int] = None):
+        super().__init__(name, bases, namespace)
+
+
+class CompactCallback(metaclass=_CompactMeta):
+    """Callback data packed as ``tag:field:field`` with base-36 numbers and enum indexes."""
+
+    _fields = ()
+    _defaults = {}
+    _encoders = ()
+    _decoders = ()
+    _tag = ""
+    _prefix = ""
+
+    def __init__(self, **values: Any):
+        for field in self._fields:
+            if field in values:
+                value = values.pop(field)
+            elif field in self._defaults:
+                value = self._defaults[field]
+            else:
+                raise TypeError(f"{type(self).__name__} requires {field!r}")
+            object.__setattr__(self, field, value)
+        if values:
+            raise TypeError(f"Unknown fields for {type(self).__name__}: {', '.join(values)}")
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __eq__(self, other: object) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, field) == getattr(other, field) for field in self._fields
+        )
+
+    def __hash__(self) -> int:
+        return hash((self._tag, *(getattr(self, field) for field in self._fields)))
+
+    def __repr__(self) -> str:
+        args = ", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields)
+        return f"{type(self).__name__}({args})"
+
+    def pack(self) -> str:
+        parts = [self._tag]
+        for field, encode in zip(self._fields, self._encoders):
+            parts.append(encode(getattr(self, field)))
+        data = SEP.join(parts)
+        if len(data.encode()) > MAX_BYTES:
+            raise ValueError(f"Callback data is longer than {MAX_BYTES} bytes: {data!r}")
+        return data
+
+    @classmethod
+    def unpack(cls, data: str) -> "CompactCallback":
+        decoded = decode(data)
+        if type(decoded) is not cls:
+            raise ValueError(f"{data!r} is not {cls.__name__} callback data")
+        return decoded
+
+    @classmethod
+    def filter(cls, rule: Optional[MagicFilter] = None) -> "CompactCallbackFilter":
+        return CompactCallbackFilter(cls, rule)
+
+
+@lru_cache(maxsize=4096)
+def decode(data: str) -> Optional[CompactCallback]:
+    tag, _, rest = data.partition(SEP)
+    cls = _REGISTRY.get(tag)
+    if cls is None:
+        return None
+    raw = rest.split(SEP) if rest else []
+    if len(raw) != len(cls._fields):
+        return None
+    obj = object.__new__(cls)
+    try:
+        for field, decoder, value in zip(cls._fields, cls._decoders, raw):
+            object.__setattr__(obj, field, decoder(value))
+    except (ValueError, IndexError):
+        return None
+    return obj
+
+
+class CompactCallbackFilter(Filter):
+    __slots__ = ("callback_cls", "rule", "prefix")
+
+    def __init__(self, callback_cls: type[CompactCallback], rule: Optional[MagicFilter] = None):
+        self.callback_cls = callback_cls
+        self.rule = rule
+        self.prefix = callback_cls._prefix
+
+    async def __call__(self, query: CallbackQuery) -> bool | dict[str, Any]:
+        data = query.data
+        if not data or not data.startswith(self.prefix):
+            return False
+        callback_data = decode(data)
+        if type(callback_data) is not self.callback_cls:
+            return False
+        if self.rule is not None and not self.rule.resolve(callback_data):
+            return False
+        return {"callback_data": callback_data}
+
+
+class ProductCb(CompactCallback, tag=1):
+    action: Literal["buy"]
+    product_id: int
+
+
+class CatalogPageCb(CompactCallback, tag=2):
+    page: int
+    category_id: int = 0
+
+
+class CatalogItemCb(CompactCallback, tag=3):
+    product_id: int
+    page: int
+    category_id: int = 0
+
+
+class PayCb(CompactCallback, tag=4):
+    method: Literal["crypto", "balance"]
+    product_id: int
+
+
+class CheckCb(CompactCallback, tag=5):
+    kind: Literal["order", "topup", "checkout"]
     internal_id: int
 
 
-class TopupCb(CallbackData, prefix="topup"):
+class TopupCb(CompactCallback, tag=6):
     amount: int
 
 
-class AdminProductCb(CallbackData, prefix="ap"):
-    action: str  # toggle
-    product_id: int
-
-
-class AdminUserPageCb(CallbackData, prefix="aup"):
-    page: int
-
-
-class AdminUserActionCb(CallbackData, prefix="aua"):
-    action: str  # view | balance_add | balance_sub | balance_set | orders
-    user_id: int
-    page: int = 0
+class AdminProductCb(CompactCallback, tag=7):
+    action: Literal["toggle"]
+    product_id: int
+
+
+class AdminUserPageCb(CompactCallback, tag=8):
+    page: int
+
+
+class BroadcastCb(CompactCallback, tag=9):
+    action: Literal["cancel"]
+    broadcast_id: int
+
+
+class AdminUserActionCb(CompactCallback, tag=10):
+    action: Literal["view", "balance_add", "balance_sub", "balance_set", "orders"]
+    user_id: int
+    page: int = 0
+
+
+class CartCb(CompactCallback, tag=11):
+    action: Literal["add", "remove", "clear", "view", "pay_crypto", "pay_balance"]
+    product_id: int = 0
+
+
+class OrdersPageCb(CompactCallback, tag=12):
+    before_id: int
@@ -0,0 +1,52 @@
+from typing import Iterator, Optional
+
+ROOT = 0
+
+
+class CategoryTree:
+    """Category hierarchy with active product counts rolled up into every ancestor."""
+
+    __slots__ = ("categories", "children", "totals")
+
+    def __init__(self, categories, counts: dict[Optional[int], int]):
+        self.categories = {int(row["id"]): row for row in categories}
+        self.children: dict[int, list[int]] = {}
+        for row in categories:
+            self.children.setdefault(row["parent_id"] or ROOT, []).append(int(row["id"]))
+
+        direct = {category_id or ROOT: count for category_id, count in counts.items()}
+        self.totals: dict[int, int] = {}
+        stack = [(ROOT, False)]
+        while stack:
+            category_id, expanded = stack.pop()
+            children = self.children.get(category_id, ())
+            if not expanded:
+                stack.append((category_id, True))
+                stack.extend((child, False) for child in children)
+                continue
+            self.totals[category_id] = direct.get(category_id, 0) + sum(
+                self.totals[child] for child in children
+            )
+
+    def __contains__(self, category_id: int) -> bool:
+        return category_id == ROOT or category_id in self.categories
+
+    def title(self, category_id: int) -> str:
+        return self.categories[category_id]["title"]
+
+    def parent(self, category_id: int) -> Optional[int]:
+        if category_id == ROOT:
+            return None
+        return self.categories[category_id]["parent_id"] or ROOT
+
+    def visible_children(self, category_id: int) -> tuple[tuple[int, str, int], ...]:
+        return tuple(
+            (child, self.title(child), self.totals[child])
+            for child in self.children.get(category_id, ())
+            if self.totals[child]
+        )
+
+    def walk(self, category_id: int = ROOT, depth: int = 0) -> Iterator[tuple[int, int]]:
+        for child in self.children.get(category_id, ()):
+            yield depth, child
+            yield from self.walk(child, depth + 1)
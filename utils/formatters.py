@@ -1,5 +1,10 @@
 ﻿from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 import html
+from datetime import datetime, timezone
+from typing import Optional
+
+from models import Product
+from utils.i18n import Translator
 
 
 def parse_amount_to_cents(text: str) -> int:
@@ -17,22 +22,30 @@ def parse_amount_to_cents(text: str) -> int:
 
 
 def cents_to_amount(cents: int) -> str:
-    return f"{cents / 100:.2f}"
+    units, rest = divmod(abs(cents), 100)
+    sign = "-" if cents < 0 else ""
+    return f"{sign}{units}.{rest:02d}"
+
+
+def format_timestamp(ms: Optional[int]) -> str:
+    if ms is None:
+        return ""
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
 
 def escape(text: str) -> str:
     return html.escape(text or "")
 
 
-def format_product(product: dict | object) -> str:
-    title = escape(getattr(product, "title", None) or product["title"])
-    description = escape(getattr(product, "description", None) or product["description"])
-    price_cents = getattr(product, "price_cents", None)
-    if price_cents is None:
-        price_cents = product["price_cents"]
+def render_product_card(title: str, description: str) -> str:
+    # Language-neutral part of the card; format_product adds the translated price line.
+    return f"🛍️ <b>{escape(title)}</b>\n📝 {escape(description)}"
+
+
+def render_product_label(title: str, price_cents: int) -> str:
+    return f"🛍️ {title} - {cents_to_amount(price_cents)} USDT"[:50]
+
 
-    return (
-        f"🛍️ <b>{title}</b>\n"
-        f"📝 {description}\n"
-        f"💎 Цена: <b>{cents_to_amount(int(price_cents))} USDT</b>"
-    )
+def format_product(product: Product, i18n: Translator) -> str:
+    card = product.card_html or render_product_card(product.title, product.description)
+    return card + "\n" + i18n("catalog.price", price=cents_to_amount(product.price_cents))
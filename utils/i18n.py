@@ -0,0 +1,140 @@
+import json
+from collections import OrderedDict
+from pathlib import Path
+from string import Formatter
+from typing import Callable, Optional
+
+from aiogram.filters import BaseFilter
+from aiogram.types import Message
+
+LOCALES_DIR = Path(__file__).resolve().parent.parent / "locales"
+DEFAULT_LOCALE = "ru"
+MENU_PREFIX = "menu."
+
+Template = Callable[..., str]
+
+
+def compile_template(source: str) -> Template:
+    parts: list = []
+    for literal, field, spec, _conversion in Formatter().parse(source):
+        if literal:
+            parts.append(literal)
+        if field is not None:
+            parts.append((field, spec or ""))
+
+    if all(isinstance(part, str) for part in parts):
+        text = "".join(parts)
+        return lambda **_: text
+
+    def render(**kwargs) -> str:
+        return "".join(
+            part if isinstance(part, str) else format(kwargs[part[0]], part[1])
+            for part in parts
+        )
+
+    return render
+
+
+def _flatten(tree: dict, prefix: str = "") -> dict[str, object]:
+    flat: dict[str, object] = {}
+    for key, value in tree.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+class Translator:
+    __slots__ = ("locale", "_templates")
+
+    def __init__(self, locale: str, templates: dict[str, Template]):
+        self.locale = locale
+        self._templates = templates
+
+    def __call__(self, key: str, **kwargs) -> str:
+        return self._templates[key](**kwargs)
+
+    def __repr__(self) -> str:
+        return f"Translator({self.locale!r})"
+
+
+class Locales:
+    """Locale catalogs compiled once into template functions, plus a reverse menu lookup."""
+
+    def __init__(
+        self,
+        directory: Path = LOCALES_DIR,
+        default: str = DEFAULT_LOCALE,
+        cache_size: int = 10_000,
+    ):
+        sources: dict[str, dict[str, object]] = {}
+        for path in sorted(directory.glob("*.json")):
+            sources[path.stem] = _flatten(json.loads(path.read_text(encoding="utf-8")))
+        if default not in sources:
+            raise RuntimeError(f"Default locale {default!r} not found in {directory}")
+
+        base = {
+            key: compile_template(value)
+            for key, value in sources[default].items()
+            if isinstance(value, str)
+        }
+        self.translators: dict[str, Translator] = {}
+        self.menu: dict[str, str] = {}
+        for locale, entries in sources.items():
+            templates = dict(base)
+            for key, value in entries.items():
+                if isinstance(value, str):
+                    templates[key] = compile_template(value)
+            self.translators[locale] = Translator(locale, templates)
+
+            for key, value in entries.items():
+                if key.startswith(MENU_PREFIX) and isinstance(value, str):
+                    self._add_menu_text(value, key)
+                elif key.startswith("aliases.") and isinstance(value, list):
+                    for text in value:
+                        self._add_menu_text(text, key[len("aliases."):])
+
+        self.default = self.translators[default]
+        self.cache_size = cache_size
+        self._users: OrderedDict[int, tuple[Optional[str], Translator]] = OrderedDict()
+
+    def _add_menu_text(self, text: str, key: str) -> None:
+        known = self.menu.setdefault(text, key)
+        if known != key:
+            raise RuntimeError(f"Menu text {text!r} is used by both {known} and {key}")
+
+    def get(self, language_code: Optional[str]) -> Translator:
+        if not language_code:
+            return self.default
+        translator = self.translators.get(language_code)
+        if translator is None:
+            translator = self.translators.get(language_code.split("-", 1)[0].lower(), self.default)
+        return translator
+
+    def for_user(self, user_id: int, language_code: Optional[str] = None) -> Translator:
+        cached = self._users.get(user_id)
+        if cached is not None and (language_code is None or cached[0] == language_code):
+            self._users.move_to_end(user_id)
+            return cached[1]
+        if language_code is None:
+            return self.default
+        translator = self.get(language_code)
+        self._users[user_id] = (language_code, translator)
+        if len(self._users) > self.cache_size:
+            self._users.popitem(last=False)
+        return translator
+
+    def menu_key(self, text: Optional[str]) -> Optional[str]:
+        return self.menu.get(text) if text else None
+
+
+locales = Locales()
+
+
+class MenuButton(BaseFilter):
+    def __init__(self, *keys: str):
+        self.keys = frozenset(f"{MENU_PREFIX}{key}" for key in keys)
+
+    async def __call__(self, message: Message) -> bool:
+        return locales.menu.get(message.text or "") in self.keys
@@ -0,0 +1,34 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable
+
+
+class KeyedLocks:
+    """Registry of asyncio locks created on demand and dropped when unused."""
+
+    def __init__(self):
+        self._locks: dict[Hashable, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def locked(self, key: Hashable) -> bool:
+        entry = self._locks.get(key)
+        return bool(entry and entry[0].locked())
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable, wait: bool = True) -> AsyncIterator[bool]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        if not wait and entry[0].locked():
+            yield False
+            return
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield True
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
@@ -0,0 +1,41 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class RenderCache:
+    """Bounded LRU of rendered views that is dropped whenever the catalog version moves."""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.version = -1
+        self._items: OrderedDict[Hashable, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _sync(self, version: int) -> bool:
+        if version == self.version:
+            return True
+        if version > self.version:
+            self._items.clear()
+            self.version = version
+            return True
+        return False
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        if not self._sync(version) or key not in self._items:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key: Hashable, version: int, value: Any) -> None:
+        if not self._sync(version):
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
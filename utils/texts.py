@@ -1,103 +1,242 @@
-from utils.formatters import cents_to_amount, escape
+import json
 
+from models import Order, User
+from utils.formatters import cents_to_amount, escape, format_timestamp
+from utils.i18n import Translator
 
-def welcome_text(full_name: str) -> str:
-    name = escape(full_name)
-    return (
-        f"👋 Привет, <b>{name}</b>!\n"
-        "Добро пожаловать в магазин.\n"
-        "Здесь можно купить товары за крипту или с баланса.\n"
-        "Выберите раздел ниже."
-    )
+MESSAGE_LIMIT = 4096
+
+
+def welcome_text(i18n: Translator, full_name: str) -> str:
+    return i18n("common.welcome", name=escape(full_name))
 
 
-def profile_text(user, order_count: int) -> str:
-    balance = cents_to_amount(int(user["balance_cents"]))
-    return (
-        "👤 <b>Личный кабинет</b>\n"
-        f"🆔 ID: <code>{user['id']}</code>\n"
-        f"💰 Баланс: <b>{balance} USDT</b>\n"
-        f"🧾 Покупок: <b>{order_count}</b>"
+def profile_text(i18n: Translator, user: User, order_count: int) -> str:
+    return i18n(
+        "profile.card",
+        id=user.id,
+        balance=cents_to_amount(user.balance_cents),
+        orders=order_count,
     )
 
 
-def topup_created_text(amount_cents: int) -> str:
-    amount = cents_to_amount(amount_cents)
-    return (
-        "💳 Счет на пополнение создан.\n"
-        f"💎 Сумма: <b>{amount} USDT</b>\n"
-        "Нажмите «Оплатить», затем «Проверить оплату»."
+def topup_created_text(i18n: Translator, amount_cents: int) -> str:
+    return i18n("payment.topup_created", amount=cents_to_amount(amount_cents))
+
+
+def order_created_text(i18n: Translator, title: str, amount_cents: int) -> str:
+    return i18n(
+        "payment.order_created", title=escape(title), amount=cents_to_amount(amount_cents)
     )
 
 
-def order_created_text(title: str, amount_cents: int) -> str:
-    amount = cents_to_amount(amount_cents)
-    title_safe = escape(title)
-    return (
-        f"🧾 Счет за товар «<b>{title_safe}</b>» создан.\n"
-        f"💎 Сумма: <b>{amount} USDT</b>\n"
-        "Нажмите «Оплатить», затем «Проверить оплату»."
+def order_paid_text(i18n: Translator, title: str, content: str) -> str:
+    return i18n("payment.order_paid", title=escape(title), content=escape(content))
+
+
+def balance_payment_text(
+    i18n: Translator, title: str, content: str, balance_left_cents: int
+) -> str:
+    return i18n(
+        "payment.balance_paid",
+        title=escape(title),
+        content=escape(content),
+        balance=cents_to_amount(balance_left_cents),
     )
 
 
-def order_paid_text(title: str, content: str) -> str:
-    return (
-        f"✅ Оплата получена. Товар «<b>{escape(title)}</b>» активирован.\n\n"
-        f"📦 <b>Ваш товар:</b>\n{escape(content)}"
+def not_enough_balance_text(i18n: Translator, price_cents: int, balance_cents: int) -> str:
+    return i18n(
+        "payment.not_enough_balance",
+        price=cents_to_amount(price_cents),
+        balance=cents_to_amount(balance_cents),
     )
 
 
-def balance_payment_text(title: str, content: str, balance_left_cents: int) -> str:
-    balance_left = cents_to_amount(balance_left_cents)
-    return (
-        f"✅ Покупка «<b>{escape(title)}</b>» оплачена с баланса.\n\n"
-        f"📦 <b>Ваш товар:</b>\n{escape(content)}\n\n"
-        f"💰 Остаток баланса: <b>{balance_left} USDT</b>"
+def _order_status(i18n: Translator, prefix: str, status: str) -> str:
+    if status not in ("paid", "expired", "refunded"):
+        status = "pending"
+    return i18n(f"{prefix}.status.{status}")
+
+
+def order_line_text(i18n: Translator, order: Order) -> str:
+    return i18n(
+        "orders.line",
+        id=order.id,
+        title=order.title,
+        amount=cents_to_amount(order.amount_cents),
+        status=_order_status(i18n, "orders", order.status),
     )
 
 
-def not_enough_balance_text(price_cents: int, balance_cents: int) -> str:
-    price = cents_to_amount(price_cents)
-    balance = cents_to_amount(balance_cents)
-    return (
-        "⚠️ Недостаточно средств на балансе.\n"
-        f"💎 Цена: <b>{price} USDT</b>\n"
-        f"💰 Баланс: <b>{balance} USDT</b>"
+def admin_order_line_text(i18n: Translator, order: Order, with_user: bool = False) -> str:
+    return i18n(
+        "admin.orders.line" if with_user else "admin.orders.user_line",
+        id=order.id,
+        title=order.title,
+        amount=cents_to_amount(order.amount_cents),
+        status=_order_status(i18n, "admin.orders", order.status),
+        user_id=order.user_id if with_user else None,
     )
 
 
-def admin_menu_text() -> str:
-    return "🛠️ <b>Админ-панель</b>\nВыберите действие."
+def admin_menu_text(i18n: Translator) -> str:
+    return i18n("admin.menu")
 
 
-def admin_users_menu_text(total: int) -> str:
-    return (
-        "👥 <b>Пользователи</b>\n"
-        f"Всего пользователей: <b>{total}</b>\n"
-        "Выберите действие."
-    )
+def admin_users_menu_text(i18n: Translator, total: int) -> str:
+    return i18n("admin.users.menu", total=total)
 
 
-def admin_user_card_text(user, order_count: int) -> str:
-    username = user["username"] or "-"
-    full_name = user["full_name"] or "-"
-    balance = cents_to_amount(int(user["balance_cents"]))
-    created_at = user["created_at"]
-    return (
-        "👤 <b>Карточка пользователя</b>\n"
-        f"🆔 ID: <code>{user['id']}</code>\n"
-        f"🔗 Username: <b>{escape(username)}</b>\n"
-        f"👤 Имя: <b>{escape(full_name)}</b>\n"
-        f"💰 Баланс: <b>{balance} USDT</b>\n"
-        f"🧾 Покупок: <b>{order_count}</b>\n"
-        f"🗓️ Создан: <code>{created_at}</code>"
+def admin_user_card_text(i18n: Translator, user: User, order_count: int) -> str:
+    return i18n(
+        "admin.users.card",
+        id=user.id,
+        username=escape(user.username or "-"),
+        full_name=escape(user.full_name or "-"),
+        balance=cents_to_amount(user.balance_cents),
+        orders=order_count,
+        created_at=format_timestamp(user.created_at),
     )
 
 
-def help_text() -> str:
-    return (
-        "ℹ️ <b>Помощь</b>\n"
-        "🛍️ Покупайте товары в разделе «Каталог».\n"
-        "💳 Пополняйте баланс в «Личном кабинете».\n"
-        "✉️ По вопросам напишите администратору."
+def broadcast_progress_text(
+    i18n: Translator,
+    broadcast_id: int,
+    status: str,
+    total: int,
+    sent: int,
+    blocked: int,
+    failed: int,
+) -> str:
+    return i18n(
+        "broadcast.progress",
+        id=broadcast_id,
+        status=i18n(f"broadcast.status.{status}"),
+        processed=sent + blocked + failed,
+        total=total,
+        sent=sent,
+        blocked=blocked,
+        failed=failed,
     )
+
+
+def help_text(i18n: Translator) -> str:
+    return i18n("common.help")
+
+
+def cart_text(i18n: Translator, items) -> str:
+    lines = [i18n("cart.title"), ""]
+    total = 0
+    for item in items:
+        amount = int(item["price_cents"]) * int(item["quantity"])
+        total += amount
+        lines.append(
+            i18n(
+                "cart.line",
+                title=escape(item["title"]),
+                quantity=item["quantity"],
+                amount=cents_to_amount(amount),
+            )
+        )
+    lines += ["", i18n("cart.total", amount=cents_to_amount(total)), i18n("cart.hint")]
+    return "\n".join(lines)
+
+
+def checkout_delivery_texts(
+    i18n: Translator, header: str, items, limit: int = MESSAGE_LIMIT
+) -> list[str]:
+    chunks = [header]
+    for item in items:
+        block = i18n(
+            "payment.delivery_item", title=escape(item["title"]), content=escape(item["content"])
+        )
+        if len(chunks[-1]) + len(block) + 2 > limit:
+            chunks.append(block)
+        else:
+            chunks[-1] += "\n\n" + block
+    return chunks
+
+
+def admin_ledger_text(i18n: Translator, user_id: int, entries) -> str:
+    lines = [i18n("admin.ledger.title", user_id=user_id), ""]
+    if not entries:
+        lines.append(i18n("admin.ledger.empty"))
+    for entry in entries:
+        delta = int(entry["delta_cents"])
+        lines.append(
+            i18n(
+                "admin.ledger.line",
+                date=format_timestamp(entry["created_at"]),
+                delta=("+" if delta > 0 else "") + cents_to_amount(delta),
+                balance=cents_to_amount(int(entry["balance_after_cents"])),
+                reason=i18n(f"admin.ledger.reasons.{entry['reason']}"),
+                ref=i18n("admin.ledger.ref", ref_id=entry["ref_id"]) if entry["ref_id"] else "",
+            )
+        )
+    return "\n".join(lines)
+
+
+def _audit_value(target_type: str, raw) -> str:
+    if raw is None:
+        return "—"
+    value = json.loads(raw)
+    if target_type == "user" and isinstance(value, int):
+        return cents_to_amount(value)
+    if isinstance(value, dict):
+        return ", ".join(f"{key}={item}" for key, item in value.items())
+    return escape(str(value))
+
+
+def admin_audit_text(i18n: Translator, entries) -> str:
+    lines = [i18n("admin.audit.title"), ""]
+    if not entries:
+        lines.append(i18n("admin.audit.empty"))
+    for entry in entries:
+        target_type = entry["target_type"]
+        lines.append(
+            i18n(
+                "admin.audit.line",
+                date=format_timestamp(entry["created_at"]),
+                admin_id=entry["admin_id"],
+                action=i18n(f"admin.audit.actions.{entry['action']}"),
+                target=i18n(f"admin.audit.targets.{target_type}"),
+                target_id=entry["target_id"],
+                before=_audit_value(target_type, entry["before_value"]),
+                after=_audit_value(target_type, entry["after_value"]),
+            )
+        )
+    return "\n".join(lines)
+
+
+def admin_stats_text(i18n: Translator, windows, pending: int, top) -> str:
+    lines = [i18n("admin.stats.title")]
+    for period, stats in windows:
+        created, paid = int(stats["orders_created"]), int(stats["orders_paid"])
+        lines += [
+            "",
+            i18n(
+                "admin.stats.window",
+                title=i18n(f"admin.stats.periods.{period}"),
+                revenue=cents_to_amount(int(stats["revenue_cents"])),
+                paid=paid,
+                created=created,
+                conversion=round(paid * 100 / created) if created else 0,
+                topups=cents_to_amount(int(stats["topup_cents"])),
+                topups_paid=stats["topups_paid"],
+            ),
+        ]
+    lines += ["", i18n("admin.stats.pending", count=pending), "", i18n("admin.stats.top_title")]
+    if not top:
+        lines.append(i18n("admin.stats.top_empty"))
+    for n, product in enumerate(top, start=1):
+        lines.append(
+            i18n(
+                "admin.stats.top_line",
+                n=n,
+                title=escape(product["title"]),
+                sold=product["sold"],
+                revenue=cents_to_amount(int(product["revenue_cents"])),
+            )
+        )
+    return "\n".join(lines)